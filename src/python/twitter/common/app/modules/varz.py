@@ -34,6 +34,7 @@ from twitter.common.metrics import (
   Observable,
   RootMetrics,
 )
+from twitter.common.metrics import compact
 from twitter.common.quantity import Amount, Time
 
 from .http import RootServer
@@ -129,9 +130,51 @@ class VarsEndpoint(object):
       else:
         HttpServer.abort(404, 'Unknown exported variable')
 
+  @classmethod
+  def _query_int(cls, name):
+    """
+      Return the integer passed as ?<name>=<value>, or None if not supplied.
+    """
+    value = HttpServer.request.GET.get(name)
+    if value is None:
+      return None
+    try:
+      return int(value)
+    except ValueError:
+      HttpServer.abort(400, '%s must be an integer' % name)
+
+  def _delta(self):
+    """
+      Return the delta since the ?since=<generation>&epoch=<epoch> of the request.  Clients should
+      always pass back the epoch of the response that the generation came from: if the process
+      has been restarted in the meantime, they are then sent the full sample instead.
+    """
+    return self._monitor.delta(self._query_int('since') or 0, self._query_int('epoch'))
+
   @HttpServer.route("/vars.json")
   def handle_vars_json(self, var=None, value=None):
-    return self._monitor.sample()
+    if self._query_int('since') is None:
+      return self._monitor.sample()
+    delta = self._delta()
+    return {
+      'epoch': delta.epoch,
+      'generation': delta.generation,
+      'full': delta.full,
+      'samples': delta.samples,
+      'removed': delta.removed,
+    }
+
+  @HttpServer.route("/vars.bin")
+  def handle_vars_bin(self):
+    """
+      Export vars in the compact encoding of twitter.common.metrics.compact.  With ?since=N&epoch=E
+      only the metrics that changed after generation N of epoch E (and the names not yet known at
+      N) are sent.
+    """
+    HttpServer.set_content_type('application/octet-stream')
+    delta = self._delta()
+    return compact.encode(delta.generation, delta.samples, delta.ids, new_ids=delta.new_ids,
+                          removed=delta.removed, epoch=delta.epoch, full=delta.full)
 
   def shutdown(self):
     self._monitor.shutdown()
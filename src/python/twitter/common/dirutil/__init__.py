@@ -200,10 +200,11 @@ def safe_mtime(filename):
 
 
 def du(directory):
-  size = 0
-  for root, _, files in os.walk(directory):
-    size += sum(safe_bsize(os.path.join(root, filename)) for filename in files)
-  return size
+  """
+    Return the space consumed on disk by the files under directory, as per safe_bsize.  Use
+    DiskUsage to scan large trees in parallel or to cache the usage of unchanged directories.
+  """
+  return DiskUsage(max_workers=1).du(directory)
 
 
 def chmod_plus_x(path):
@@ -306,6 +307,8 @@ def unlock_file(fp, close=False):
 from twitter.common.dirutil.lock import Lock
 from twitter.common.dirutil.tail import tail_f
 from twitter.common.dirutil.fileset import Fileset
+from twitter.common.dirutil.follower import FileFollower
+from twitter.common.dirutil.usage import DiskUsage
 
 __all__ = (
   'chmod_plus_x',
@@ -319,6 +322,8 @@ __all__ = (
   'safe_size',
   'tail_f',
   'unlock_file',
+  'DiskUsage',
+  'FileFollower',
   'Fileset',
   'Lock',
 
@@ -19,6 +19,8 @@ import fnmatch
 import glob
 import os
 import re
+import stat
+import time
 
 from twitter.common.lang import Compatibility
 
@@ -38,13 +40,13 @@ def fnmatch_translate_extended(pat):
     i += 1
     if c == '*':
       if pat[i:i+2] == '*/':
-        res += '([^/]+/)*'
+        res += '(?:[^/]+/)*'
         i += 2
       elif pat[i:i+1] == '*':
-        res += '([^/]+)'
+        res += '(?:[^/]+)'
         i += 1
       else:
-        res += '([^/]+)'
+        res += '(?:[^/]+)'
     elif c == '?':
       res += '.'
     elif c == '[':
@@ -70,13 +72,113 @@ def fnmatch_translate_extended(pat):
   return res + '\Z(?ms)'
 
 
+def _combined_matcher(patterns):
+  """
+    Compile a list of (no_hidden, regex) into a single function of a path that returns True if
+    any of the regexes match it.  Regexes with no_hidden set do not match paths whose basename
+    starts with '.'.
+  """
+  def combine(regexes):
+    if not regexes:
+      return None
+    # fnmatch.translate and fnmatch_translate_extended may end with global flags, which must be
+    # hoisted out of the alternation.
+    regexes = [regex[:-len('(?ms)')] if regex.endswith('(?ms)') else regex for regex in regexes]
+    return re.compile('|'.join('(?:%s)' % regex for regex in regexes), re.M | re.S).match
+
+  match_any = combine([regex for no_hidden, regex in patterns if not no_hidden])
+  match_visible = combine([regex for no_hidden, regex in patterns if no_hidden])
+
+  def matcher(path):
+    if match_any and match_any(path):
+      return True
+    return bool(match_visible and not os.path.basename(path).startswith('.')
+                and match_visible(path))
+  return matcher
+
+
+class WalkCache(object):
+  """
+    A snapshot of directory listings shared between walks of the filesystem.
+
+    Each listing is reused for as long as the mtime of its directory is unchanged, so walking an
+    unchanged tree again costs one stat per directory rather than a listdir and a stat per
+    entry.  Listings of directories modified within the last RACY_INTERVAL seconds are not
+    kept, since a change within the mtime resolution of the filesystem would go unnoticed.
+  """
+
+  RACY_INTERVAL = 2
+
+  def __init__(self, clock=time):
+    self._listings = {}  # directory => ((st_dev, st_ino, st_mtime), dirs, links, files)
+    self._clock = clock
+
+  def clear(self):
+    self._listings.clear()
+
+  def listdir(self, directory):
+    """
+      Return (dirs, links, files) for directory, classified as os.walk does: dirs are the entries
+      that are directories or symlinks to directories, links is the set of those that are
+      symlinks and files are all other entries.
+    """
+    st = os.stat(directory)
+    key = (st.st_dev, st.st_ino, st.st_mtime)
+    listing = self._listings.get(directory)
+    if listing and listing[0] == key:
+      return listing[1:]
+    dirs, links, files = [], set(), []
+    for name in os.listdir(directory):
+      path = os.path.join(directory, name)
+      try:
+        mode = os.lstat(path).st_mode
+      except OSError:
+        files.append(name)
+        continue
+      if stat.S_ISDIR(mode):
+        dirs.append(name)
+      elif stat.S_ISLNK(mode) and os.path.isdir(path):
+        dirs.append(name)
+        links.add(name)
+      else:
+        files.append(name)
+    if self._clock.time() - st.st_mtime >= self.RACY_INTERVAL:
+      self._listings[directory] = (key, dirs, links, files)
+    else:
+      self._listings.pop(directory, None)
+    return dirs, links, files
+
+  def walk(self, top, follow_links=False):
+    """
+      Like os.walk(top, followlinks=follow_links) but yields (relative, dirs, files), where
+      relative is the path of the directory relative to top, ending in os.sep, or '' for top
+      itself.  Directories that cannot be listed are skipped.
+    """
+    pending = [(os.path.abspath(top), '')]
+    while pending:
+      directory, relative = pending.pop()
+      try:
+        dirs, links, files = self.listdir(directory)
+      except OSError:
+        continue
+      yield relative, dirs, files
+      for dirname in dirs:
+        if follow_links or dirname not in links:
+          pending.append((os.path.join(directory, dirname), relative + dirname + os.sep))
+
+
 class Fileset(object):
   """
     An iterable, callable object that will gather up a set of files lazily when iterated over or
     called.  Supports unions with iterables, other Filesets and individual items using the ^ and +
     operators as well as set difference using the - operator.
+
+    Walks of the filesystem share the directory listings in WALK_CACHE, which may be set to None
+    to list directories afresh on every walk.
   """
 
+  WALK_CACHE = WalkCache()
+
   @classmethod
   def walk(cls, path=None, allow_dirs=False, follow_links=False):
     """Walk the directory tree starting at path, or os.curdir if None.  If
@@ -85,6 +187,15 @@ class Fileset(object):
        directories will be traversed.
     """
     path = path or os.curdir
+    if cls.WALK_CACHE is not None:
+      for relative, dirs, files in cls.WALK_CACHE.walk(path, follow_links=follow_links):
+        if allow_dirs:
+          for dirname in dirs:
+            yield relative + dirname
+            yield relative + dirname + os.sep
+        for filename in files:
+          yield relative + filename
+      return
     for root, dirs, files in os.walk(path, followlinks=follow_links):
       if allow_dirs:
         for dirname in dirs:
@@ -131,15 +242,9 @@ class Fileset(object):
        semantics of 'ls' without '-a'.
     """
     root = kw.pop('root', os.curdir)
-
-    def matcher(path):
-      for globspec in globspecs:
-        # Ignore hidden files when globbing wildcards.
-        if not (globspec.startswith('*') and os.path.basename(path).startswith('.')):
-          if fnmatch.fnmatch(path, globspec):
-            return True
-      return False
-
+    # Ignore hidden files when globbing wildcards.
+    matcher = _combined_matcher([(globspec.startswith('*'), fnmatch.translate(globspec))
+                                 for globspec in globspecs])
     return cls(lambda: set(cls._do_rglob(matcher, allow_dirs=False, root=root, **kw)))
 
   @classmethod
@@ -152,17 +257,9 @@ class Fileset(object):
        "*" does not, mirroring the semantics of 'ls' without '-a'.
     """
     root = kw.pop('root', os.curdir)
-    patterns = [(os.path.basename(spec).startswith('*'),
-                 re.compile(fnmatch_translate_extended(spec))) for spec in globspecs]
-
-    def matcher(path):
-      for no_hidden, pattern in patterns:
-        # Ignore hidden files when globbing wildcards.
-        if not (no_hidden and os.path.basename(path).startswith('.')):
-          if pattern.match(path):
-            return True
-      return False
-
+    # Ignore hidden files when globbing wildcards.
+    matcher = _combined_matcher([(os.path.basename(spec).startswith('*'),
+                                  fnmatch_translate_extended(spec)) for spec in globspecs])
     return cls(lambda: set(cls._do_rglob(matcher, allow_dirs=True, root=root, **kw)))
 
   def __init__(self, callable_):
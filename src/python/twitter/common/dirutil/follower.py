@@ -0,0 +1,349 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""Follow many growing files from a single thread.
+
+    >>> follower = FileFollower()
+    >>> for filename in glob.glob('/var/lib/tasks/*/stderr'):
+    ...   follower.follow(filename)
+    >>> for filename, lines in follower:
+    ...   process(filename, lines)
+
+On Linux, changes are noticed through inotify, watching the directories that hold the files.
+Elsewhere, or if inotify is not available, every file is checked each poll_interval seconds.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import io
+import os
+import select
+import struct
+import sys
+import time
+
+from twitter.common.lang import Compatibility
+
+
+class Inotify(object):
+  """
+    A minimal ctypes binding of the Linux inotify API.
+  """
+
+  class Error(Exception): pass
+
+  IN_MODIFY = 0x00000002
+  IN_ATTRIB = 0x00000004
+  IN_CLOSE_WRITE = 0x00000008
+  IN_MOVED_FROM = 0x00000040
+  IN_MOVED_TO = 0x00000080
+  IN_CREATE = 0x00000100
+  IN_DELETE = 0x00000200
+  IN_DELETE_SELF = 0x00000400
+  IN_MOVE_SELF = 0x00000800
+  IN_Q_OVERFLOW = 0x00004000
+  IN_IGNORED = 0x00008000
+  IN_ONLYDIR = 0x01000000
+
+  IN_NONBLOCK = os.O_NONBLOCK
+  IN_CLOEXEC = 0o2000000
+
+  EVENT = struct.Struct('iIII')
+  READ_SIZE = 64 * 1024
+
+  _LIBC = None
+
+  @classmethod
+  def _libc(cls):
+    if cls._LIBC is None:
+      cls._LIBC = False
+      if sys.platform.startswith('linux'):
+        try:
+          libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+          libc.inotify_init1, libc.inotify_add_watch, libc.inotify_rm_watch
+          cls._LIBC = libc
+        except (AttributeError, OSError):
+          pass
+    return cls._LIBC
+
+  @classmethod
+  def available(cls):
+    return bool(cls._libc())
+
+  @staticmethod
+  def _raise(message):
+    code = ctypes.get_errno()
+    raise Inotify.Error('%s: %s' % (message, os.strerror(code)))
+
+  def __init__(self):
+    libc = self._libc()
+    if not libc:
+      raise self.Error('inotify is not available on this platform.')
+    self._fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+    if self._fd < 0:
+      self._raise('Failed to initialize inotify')
+
+  def fileno(self):
+    return self._fd
+
+  def add_watch(self, path, mask):
+    """Watch path for the events in mask, returning the watch descriptor."""
+    if not isinstance(path, bytes):
+      path = path.encode(sys.getfilesystemencoding() or 'utf-8')
+    wd = self._libc().inotify_add_watch(self._fd, ctypes.c_char_p(path), ctypes.c_uint32(mask))
+    if wd < 0:
+      self._raise('Failed to watch %s' % path)
+    return wd
+
+  def rm_watch(self, wd):
+    self._libc().inotify_rm_watch(self._fd, wd)
+
+  def read(self, timeout=None):
+    """
+      Wait up to timeout seconds (forever if None) for events and return them as a list of
+      (watch descriptor, mask, cookie, name) tuples.
+    """
+    try:
+      readable, _, _ = select.select([self._fd], [], [], timeout)
+    except select.error as e:
+      if e.args[0] == errno.EINTR:
+        return []
+      raise
+    if not readable:
+      return []
+    events = []
+    while True:
+      try:
+        data = os.read(self._fd, self.READ_SIZE)
+      except OSError as e:
+        if e.errno in (errno.EAGAIN, errno.EINTR):
+          return events
+        raise
+      offset = 0
+      while offset < len(data):
+        wd, mask, cookie, length = self.EVENT.unpack_from(data, offset)
+        offset += self.EVENT.size
+        name = data[offset:offset + length].rstrip(b'\0')
+        offset += length
+        events.append((wd, mask, cookie, name.decode(sys.getfilesystemencoding() or 'utf-8')))
+
+  def close(self):
+    if self._fd >= 0:
+      os.close(self._fd)
+      self._fd = -1
+
+
+class FileFollower(object):
+  """
+    Follow a set of files, returning complete lines from each as they are appended.
+
+    Files are followed by name, as tail -F does: a followed file that is truncated is read again
+    from the start and one that is replaced (e.g. rotated) or deleted and recreated is read from
+    the start of the new file, after the rest of the old one.  As with tail, truncation is only
+    noticed if the file is shorter than what has been read of it.  Files need not exist when they
+    are followed.
+  """
+
+  POLL_INTERVAL = 1.0
+  DIRECTORY_MASK = (Inotify.IN_MODIFY | Inotify.IN_ATTRIB | Inotify.IN_CLOSE_WRITE |
+                    Inotify.IN_CREATE | Inotify.IN_DELETE | Inotify.IN_MOVED_FROM |
+                    Inotify.IN_MOVED_TO | Inotify.IN_ONLYDIR)
+
+  class _Followed(object):
+    def __init__(self, filename, from_end):
+      self.filename = filename
+      self.from_end = from_end
+      self.fp = None
+      self.identity = None
+      self.partial = b''
+
+  def __init__(self, poll_interval=POLL_INTERVAL, use_inotify=True, clock=time):
+    """
+      poll_interval: How often, in seconds, to check files that cannot be watched.
+      use_inotify: If False, always poll rather than using inotify.
+      clock: time-like object providing time() and sleep(), for testing.
+    """
+    self._poll_interval = poll_interval
+    self._clock = clock
+    self._inotify = Inotify() if use_inotify and Inotify.available() else None
+    self._followed = {}  # filename => _Followed
+    self._directories = {}  # directory => watch descriptor
+    self._watches = {}  # watch descriptor => {basename => _Followed}
+    self._unwatched = set()  # followed files whose directory is not watched
+    self._dirty = set()  # followed files to check on the next poll
+
+  def follow(self, filename, from_end=True):
+    """
+      Start following filename.  If from_end is True, only lines appended from now on are
+      returned, otherwise the file is read from the start.
+    """
+    filename = os.path.abspath(filename)
+    if filename in self._followed:
+      return
+    followed = self._followed[filename] = self._Followed(filename, from_end)
+    self._open(followed)
+    followed.from_end = False
+    self._unwatched.add(followed)
+    self._dirty.add(followed)
+
+  def unfollow(self, filename):
+    """Stop following filename."""
+    followed = self._followed.pop(os.path.abspath(filename), None)
+    if followed is None:
+      return
+    self._unwatched.discard(followed)
+    self._dirty.discard(followed)
+    if followed.fp:
+      followed.fp.close()
+    directory, basename = os.path.split(followed.filename)
+    wd = self._directories.get(directory)
+    if wd is not None:
+      watched = self._watches[wd]
+      watched.pop(basename, None)
+      if not watched and self._inotify:
+        del self._directories[directory], self._watches[wd]
+        self._inotify.rm_watch(wd)
+
+  def filenames(self):
+    return set(self._followed)
+
+  def close(self):
+    for filename in list(self._followed):
+      self.unfollow(filename)
+    if self._inotify:
+      self._inotify.close()
+
+  def _open(self, followed):
+    try:
+      # io rather than file objects, which under Python 2 may not read past a previous EOF.
+      fp = io.open(followed.filename, 'rb')
+    except (IOError, OSError):
+      return False
+    st = os.fstat(fp.fileno())
+    if followed.from_end:
+      fp.seek(0, os.SEEK_END)
+    followed.fp, followed.identity = fp, (st.st_dev, st.st_ino)
+    return True
+
+  @staticmethod
+  def _read(followed):
+    data = followed.fp.read()
+    if not data:
+      return []
+    lines = (followed.partial + data).split(b'\n')
+    followed.partial = lines.pop()
+    if Compatibility.PY3:
+      lines = [line.decode('utf-8', 'replace') for line in lines]
+    return lines
+
+  def _refresh(self, followed):
+    """Return the new complete lines of a followed file."""
+    if followed.fp is None and not self._open(followed):
+      return []
+    try:
+      st = os.stat(followed.filename)
+      identity = (st.st_dev, st.st_ino)
+    except OSError:
+      st, identity = None, None
+    if identity == followed.identity and st.st_size < followed.fp.tell():
+      followed.fp.seek(0)
+      followed.partial = b''
+    lines = self._read(followed)
+    if identity != followed.identity:
+      # Replaced or deleted: the old file has been read to its end, so continue with the new one.
+      if followed.partial:
+        partial, followed.partial = followed.partial, b''
+        lines.append(partial.decode('utf-8', 'replace') if Compatibility.PY3 else partial)
+      followed.fp.close()
+      followed.fp, followed.identity = None, None
+      if identity is not None and self._open(followed):
+        lines.extend(self._read(followed))
+    return lines
+
+  def _watch(self):
+    for followed in list(self._unwatched):
+      directory, basename = os.path.split(followed.filename)
+      wd = self._directories.get(directory)
+      if wd is None:
+        try:
+          wd = self._inotify.add_watch(directory, self.DIRECTORY_MASK)
+        except Inotify.Error:
+          continue
+        self._directories[directory] = wd
+        # Watch descriptors are reused if a directory is watched through another path.
+        self._watches.setdefault(wd, {})
+      self._watches[wd][basename] = followed
+      self._unwatched.discard(followed)
+      # Catch up on any changes made before the watch.
+      self._dirty.add(followed)
+
+  def _changed(self, timeout):
+    """Wait up to timeout seconds for changes and return the followed files that may have."""
+    if self._inotify is None:
+      if not self._dirty and timeout:
+        self._clock.sleep(timeout)
+      self._dirty.clear()
+      return set(self._followed.values())
+    self._watch()
+    if self._dirty:
+      timeout = 0
+    elif self._unwatched:
+      timeout = self._poll_interval if timeout is None else min(timeout, self._poll_interval)
+    changed, self._dirty = self._dirty | self._unwatched, set()
+    for wd, mask, _, name in self._inotify.read(timeout):
+      if mask & Inotify.IN_Q_OVERFLOW:
+        changed.update(self._followed.values())
+      elif mask & Inotify.IN_IGNORED:
+        # The directory was deleted or unmounted.
+        watched = self._watches.pop(wd, {})
+        for directory in [d for d, watch in self._directories.items() if watch == wd]:
+          del self._directories[directory]
+        self._unwatched.update(watched.values())
+        changed.update(watched.values())
+      else:
+        followed = self._watches.get(wd, {}).get(name)
+        if followed is not None:
+          changed.add(followed)
+    return changed
+
+  def poll(self, timeout=None):
+    """
+      Wait up to timeout seconds (forever if None) for lines to be appended to the followed
+      files and return a dictionary of filename => list of new lines, without their newlines.
+      Returns an empty dictionary if there were none.
+    """
+    deadline = None if timeout is None else self._clock.time() + timeout
+    while True:
+      if deadline is None:
+        wait = None if self._inotify else self._poll_interval
+      else:
+        wait = max(0, deadline - self._clock.time())
+        if self._inotify is None:
+          wait = min(wait, self._poll_interval)
+      batch = {}
+      for followed in self._changed(wait):
+        lines = self._refresh(followed)
+        if lines:
+          batch[followed.filename] = lines
+      if batch or (deadline is not None and self._clock.time() >= deadline):
+        return batch
+
+  def __iter__(self):
+    """Yield (filename, lines) for batches of new lines, forever."""
+    while True:
+      for filename, lines in self.poll().items():
+        yield filename, lines
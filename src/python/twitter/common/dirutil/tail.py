@@ -20,6 +20,8 @@ import os
 import errno
 import time
 
+from twitter.common.dirutil.follower import FileFollower, Inotify
+
 
 def _tail_lines(fd, linesback=10):
   if fd is None:
@@ -70,7 +72,32 @@ def tail(filename, lines=10):
       yield line
 
 
+def _change_waiter(filename, clock):
+  """
+    Return a function that waits up to a second for a change to filename, and a function that
+    releases its resources.  Changes are awaited with inotify where available, unless a clock
+    other than time is supplied.
+  """
+  if clock is time and Inotify.available():
+    try:
+      inotify = Inotify()
+      inotify.add_watch(os.path.dirname(os.path.abspath(filename)), FileFollower.DIRECTORY_MASK)
+      return lambda: inotify.read(timeout=1), inotify.close
+    except Inotify.Error:
+      pass
+  return lambda: clock.sleep(1), lambda: None
+
+
 def tail_f(filename, forever=True, include_last=False, clock=time):
+  wait, close = _change_waiter(filename, clock)
+  try:
+    for line in _tail_f(filename, forever, wait, clock):
+      yield line
+  finally:
+    close()
+
+
+def _tail_f(filename, forever, wait, clock):
   fd = wait_until_opened(filename, forever, clock)
 
   # wind back to near the end of the file...
@@ -114,5 +141,5 @@ def tail_f(filename, forever=True, include_last=False, clock=time):
         fd.seek(0)
       else:
         # our buffer has not yet caught up, wait.
-        clock.sleep(1)
+        wait()
         fd.seek(where)
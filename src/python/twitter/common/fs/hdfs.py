@@ -127,8 +127,8 @@ class HDFSHelper(object):
     file_list = []
     if ls_result is None:
       return file_list
-    lines = ls_result.splitlines()
-    for line in lines:
+    filenames, metadata_lines = [], []
+    for line in ls_result.splitlines():
       if line == "" or line.startswith("Found"):
         continue
 
@@ -136,16 +136,19 @@ class HDFSHelper(object):
       if len(seg) < 8:
         raise self.InternalError("Invalid hdfs -ls output. [%s]" % line)
 
-      filename = seg[-1]
-      try:
-        metadata = self.PARSER.parse(' '.join(seg[0:7]))
-      except ScanfParser.ParseError as e:
-        raise self.InternalError('Unable to parse hdfs output: %s' % e)
-      #seg[0] example: drwxrwx---
-      if metadata.mode.startswith('d') != is_dir:
+      filenames.append(seg[-1])
+      metadata_lines.append(' '.join(seg[0:7]))
+
+    try:
+      metadata = self.PARSER.parse_many(metadata_lines)
+    except ScanfParser.ParseError as e:
+      raise self.InternalError('Unable to parse hdfs output: %s' % e)
+    for filename, mode, filesize in zip(filenames, metadata.mode, metadata.filesize):
+      #mode example: drwxrwx---
+      if mode.startswith('d') != is_dir:
         continue
 
-      file_list.append([filename, metadata.filesize])
+      file_list.append([filename, filesize])
     return file_list
 
   def ls(self, path, is_dir=False):
@@ -17,14 +17,16 @@
 from .java_types import *
 from .class_flags import ClassFlags
 from .constant import (
-  Constant, LongConstant, DoubleConstant, ClassConstant,
+  Constant, ConstantBase, LongConstant, DoubleConstant, ClassConstant,
   FieldrefConstant, InterfaceMethodrefConstant, MethodrefConstant)
 from .field_info import FieldInfo
 from .method_info import MethodInfo
 from .attribute_info import Attribute
 from .signature_parser import PackageSpecifier
 
+from array import array
 from hashlib import md5
+import struct
 
 class ClassDecoders:
   @staticmethod
@@ -102,24 +104,26 @@ class ClassFile(object):
       c for c in self._constant_pool
       if isinstance(c, self._LINKAGE_CONSTANT_TYPES)]
 
+  def _linkage_references(self):
+    return [c(self._constant_pool) for c in self._linkage_constants()]
+
   def linkage_signature(self):
-    cs = [c(self._constant_pool) for c in self._linkage_constants()]
+    cs = self._linkage_references()
     m = md5()
     m.update('\n'.join(sorted(cs)))
     return m.hexdigest()
 
   def _track_dependencies(self):
-    self._external_references = set(
-      c(self._constant_pool) for c in self._linkage_constants())
+    self._external_references = set(self._linkage_references())
 
-  @staticmethod
-  def from_fp(fp):
-    return ClassFile(fp.read())
+  @classmethod
+  def from_fp(cls, fp):
+    return cls(fp.read())
 
-  @staticmethod
-  def from_file(filename):
+  @classmethod
+  def from_file(cls, filename):
     with open(filename, 'rb') as fp:
-      return ClassFile.from_fp(fp)
+      return cls.from_fp(fp)
 
   def _decode(self):
     data = self._data
@@ -188,6 +192,9 @@ class ClassFile(object):
   def access_flags(self):
     return self._access_flags
 
+  def external_references(self):
+    return self._external_references
+
   def __str__(self):
     const = self._constant_pool
     output = []
@@ -217,3 +224,247 @@ class ClassFile(object):
         output.append("  %s" % ref)
     output.append("linkage signature: \n  %s" % self.linkage_signature())
     return '\n'.join(output)
+
+
+class ConstantPool(object):
+  """The constant pool of a class file, as parallel arrays of tags and offsets into the class data.
+
+  Indexing returns the same Constant objects as ClassDecoders.decode_constant_pool, built on
+  first access.  utf8() and reference() resolve strings straight from the class data.
+  """
+
+  # Size of each constant (including its tag) by tag, or None if variable (Utf8).
+  _SIZES = {
+    Constant.CONSTANT_Utf8: None,
+    Constant.CONSTANT_Integer: 5,
+    Constant.CONSTANT_Float: 5,
+    Constant.CONSTANT_Long: 9,
+    Constant.CONSTANT_Double: 9,
+    Constant.CONSTANT_Class: 3,
+    Constant.CONSTANT_String: 3,
+    Constant.CONSTANT_Fieldref: 5,
+    Constant.CONSTANT_Methodref: 5,
+    Constant.CONSTANT_InterfaceMethodref: 5,
+    Constant.CONSTANT_NameAndType: 5,
+    15: 4,  # CONSTANT_MethodHandle
+    16: 3,  # CONSTANT_MethodType
+    17: 5,  # CONSTANT_Dynamic
+    18: 5,  # CONSTANT_InvokeDynamic
+    19: 3,  # CONSTANT_Module
+    20: 3,  # CONSTANT_Package
+  }
+  _WIDE = frozenset([Constant.CONSTANT_Long, Constant.CONSTANT_Double])
+  _LINKAGE = frozenset([
+    Constant.CONSTANT_Fieldref, Constant.CONSTANT_Methodref, Constant.CONSTANT_InterfaceMethodref])
+
+  _U1 = struct.Struct('>B')
+  _U2 = struct.Struct('>H')
+  _U2U2 = struct.Struct('>HH')
+
+  class InvalidConstant(JavaNativeType.ParseException): pass
+
+  def __init__(self, data, offset, count):
+    """Index the count - 1 constants of data starting at offset."""
+    self._data = data
+    self._tags = array('B', [0])
+    self._offsets = array('L', [0])
+    self._constants = {}
+    u1, u2, sizes, wide = self._U1, self._U2, self._SIZES, self._WIDE
+    k = 1
+    while k < count:
+      tag, = u1.unpack_from(data, offset)
+      try:
+        size = sizes[tag]
+      except KeyError:
+        raise self.InvalidConstant('Unknown constant tag %d at offset %d' % (tag, offset))
+      if size is None:
+        size = 3 + u2.unpack_from(data, offset + 1)[0]
+      self._tags.append(tag)
+      self._offsets.append(offset)
+      offset += size
+      k += 1
+      # Long and Double constants take up two entries:
+      # http://java.sun.com/docs/books/jvms/second_edition/html/ClassFile.doc.html#1348
+      if tag in wide:
+        self._tags.append(0)
+        self._offsets.append(0)
+        k += 1
+    if offset > len(data):
+      raise self.InvalidConstant('Constant pool extends past the end of the class data.')
+    self._end = offset
+
+  @property
+  def end(self):
+    """Offset of the first byte following the constant pool."""
+    return self._end
+
+  def __len__(self):
+    return len(self._tags)
+
+  def __iter__(self):
+    for index in range(len(self)):
+      yield self[index]
+
+  def tag(self, index):
+    return self._tags[index]
+
+  def __getitem__(self, index):
+    if index < 0:
+      index += len(self)
+    if index in self._constants:
+      return self._constants[index]
+    tag = self._tags[index]
+    if tag == 0:
+      constant = None
+    else:
+      offset = self._offsets[index]
+      size = self._SIZES[tag]
+      if size is None:
+        size = 3 + self._U2.unpack_from(self._data, offset + 1)[0]
+      constant_class = Constant._BASE_TYPES.get(tag)
+      constant = (constant_class(self._data[offset:offset + size]) if constant_class
+                  else ConstantBase())
+    self._constants[index] = constant
+    return constant
+
+  def utf8(self, index):
+    """Return the bytes of the Utf8 constant at index."""
+    if self._tags[index] != Constant.CONSTANT_Utf8:
+      raise self.InvalidConstant('Constant %d is not a Utf8 constant.' % index)
+    offset = self._offsets[index]
+    length, = self._U2.unpack_from(self._data, offset + 1)
+    return self._data[offset + 3:offset + 3 + length]
+
+  def reference(self, index):
+    """Return 'class.name.descriptor' for the Fieldref, Methodref or InterfaceMethodref at index,
+       as produced by calling the corresponding Constant."""
+    class_index, name_and_type_index = self._U2U2.unpack_from(self._data, self._offsets[index] + 1)
+    name_index, = self._U2.unpack_from(self._data, self._offsets[class_index] + 1)
+    member_name_index, descriptor_index = self._U2U2.unpack_from(
+        self._data, self._offsets[name_and_type_index] + 1)
+    return '%s.%s.%s' % (
+      self.utf8(name_index), self.utf8(member_name_index), self.utf8(descriptor_index))
+
+  def references(self):
+    """Return the references of every linkage constant, in constant pool order."""
+    linkage = self._LINKAGE
+    return [self.reference(index) for index, tag in enumerate(self._tags) if tag in linkage]
+
+
+class LazyClassFile(ClassFile):
+  """Wrapper for a .class file that defers decoding until needed.
+
+  The class data is walked once by offset, without copying, to index the constant pool and to
+  find the bounds of each field, method and attribute.  These are only decoded when first
+  accessed, and external references are resolved straight from the constant pool, so
+  dependency scans over many classes only pay for what they use.
+  """
+
+  _HEADER = struct.Struct('>LHHH')
+  _CLASS_INFO = struct.Struct('>HHHH')
+  _U2 = struct.Struct('>H')
+  _MEMBER_HEADER = struct.Struct('>HHHH')
+  _ATTRIBUTE_HEADER = struct.Struct('>HL')
+
+  def __init__(self, data):
+    self._data = data
+    self._decoded_fields = None
+    self._decoded_methods = None
+    self._decoded_attributes = None
+    self._decoded_interfaces = None
+    self._references = None
+    self._decode()
+
+  def _walk_attributes(self, offset, count):
+    bounds = []
+    for _ in range(count):
+      _, length = self._ATTRIBUTE_HEADER.unpack_from(self._data, offset)
+      end = offset + self._ATTRIBUTE_HEADER.size + length
+      bounds.append((offset, end))
+      offset = end
+    return bounds, offset
+
+  def _walk_members(self, offset, count):
+    bounds = []
+    for _ in range(count):
+      _, _, _, attributes_count = self._MEMBER_HEADER.unpack_from(self._data, offset)
+      _, end = self._walk_attributes(offset + self._MEMBER_HEADER.size, attributes_count)
+      bounds.append((offset, end))
+      offset = end
+    return bounds, offset
+
+  def _decode(self):
+    data = self._data
+    try:
+      (self._magic, self._minor_version, self._major_version,
+       self._constant_pool_count) = self._HEADER.unpack_from(data, 0)
+      assert self._magic == 0xCAFEBABE
+
+      self._constant_pool = ConstantPool(data, self._HEADER.size, self._constant_pool_count)
+      offset = self._constant_pool.end
+
+      access_flags, this_class, super_class, self._interfaces_count = (
+          self._CLASS_INFO.unpack_from(data, offset))
+      offset += self._CLASS_INFO.size
+      self._access_flags = ClassFlags(access_flags)
+      self._this_class = self._constant_pool[this_class]
+      self._super_class = self._constant_pool[super_class]
+      self._interface_indices = struct.unpack_from('>%dH' % self._interfaces_count, data, offset)
+      offset += 2 * self._interfaces_count
+
+      self._fields_count, = self._U2.unpack_from(data, offset)
+      self._field_bounds, offset = self._walk_members(offset + 2, self._fields_count)
+
+      self._methods_count, = self._U2.unpack_from(data, offset)
+      self._method_bounds, offset = self._walk_members(offset + 2, self._methods_count)
+
+      self._attributes_count, = self._U2.unpack_from(data, offset)
+      self._attribute_bounds, offset = self._walk_attributes(offset + 2, self._attributes_count)
+    except struct.error as e:
+      raise JavaNativeType.ParseException('Truncated class data: %s' % e)
+    if offset > len(data):
+      raise JavaNativeType.ParseException('Truncated class data.')
+
+  def _track_dependencies(self):
+    pass
+
+  def _linkage_references(self):
+    return self._constant_pool.references()
+
+  @property
+  def _external_references(self):
+    if self._references is None:
+      self._references = set(self._linkage_references())
+    return self._references
+
+  @property
+  def _interfaces(self):
+    if self._decoded_interfaces is None:
+      self._decoded_interfaces = [self._constant_pool[index] for index in self._interface_indices]
+    return self._decoded_interfaces
+
+  @property
+  def _fields(self):
+    if self._decoded_fields is None:
+      self._decoded_fields = [FieldInfo(self._data[start:end], self._constant_pool)
+                              for start, end in self._field_bounds]
+    return self._decoded_fields
+
+  @property
+  def _methods(self):
+    if self._decoded_methods is None:
+      self._decoded_methods = [MethodInfo(self._data[start:end], self._constant_pool)
+                               for start, end in self._method_bounds]
+    return self._decoded_methods
+
+  @property
+  def _attributes(self):
+    if self._decoded_attributes is None:
+      self._decoded_attributes = [Attribute.parse(self._data[start:end], self._constant_pool)
+                                  for start, end in self._attribute_bounds]
+    return self._decoded_attributes
+
+  def _linkage_constants(self):
+    linkage = ConstantPool._LINKAGE
+    return [self._constant_pool[index] for index in range(len(self._constant_pool))
+            if self._constant_pool.tag(index) in linkage]
@@ -0,0 +1,222 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""Analyze the classes of whole jars and classpaths.
+
+    >>> scanner = ClasspathScanner(cache_dir=os.path.expanduser('~/.cache/classpath'))
+    >>> for jar, classes in scanner.scan('lib/guava.jar:lib/jsr305.jar').items():
+    ...   for name, summary in classes.items():
+    ...     print(name, summary.linkage_signature, len(summary.external_references))
+
+Classes are parsed in a pool of worker processes.  If a cache directory is supplied, results are
+stored there per classpath entry and keyed by the CRC and size of each zip entry (or the size and
+mtime of each file, for directories), so only new or changed classes are parsed on a rescan.
+"""
+
+from collections import namedtuple
+import hashlib
+import json
+import multiprocessing
+import os
+from zipfile import ZipFile
+
+from twitter.common import log
+from twitter.common.concurrent import ProcessPoolExecutor, ThreadPoolExecutor
+from twitter.common.dirutil import safe_delete, safe_mkdir
+from twitter.common.lang import Compatibility
+
+from .class_file import LazyClassFile
+
+
+ClassSummary = namedtuple('ClassSummary', ['linkage_signature', 'external_references'])
+
+
+def _native(string):
+  """Return string as a native str: zip entry names may be unicode and json loads unicode, under
+  Python 2, where class names and the names of files are otherwise byte strings."""
+  return string if isinstance(string, str) else string.encode('utf-8')
+
+
+def analyze_class(data):
+  """Return the ClassSummary of the class file data."""
+  class_file = LazyClassFile(data)
+  return ClassSummary(class_file.linkage_signature(),
+                      tuple(sorted(class_file.external_references())))
+
+
+def _analyze_entries(path, names):
+  """Return a list of (name, ClassSummary or None) for the named classes of a jar or directory."""
+  results = []
+
+  def analyze(name, read):
+    try:
+      results.append((name, analyze_class(read(name))))
+    except Exception as e:
+      log.warning('Failed to analyze %s in %s: %r' % (name, path, e))
+      results.append((name, None))
+
+  if os.path.isdir(path):
+    def read(name):
+      with open(os.path.join(path, name), 'rb') as fp:
+        return fp.read()
+    for name in names:
+      analyze(name, read)
+  else:
+    with ZipFile(path) as zf:
+      infos = dict((_native(info.filename), info) for info in zf.infolist())
+      for name in names:
+        analyze(name, lambda name: zf.read(infos[name]))
+  return results
+
+
+class ClasspathScanner(object):
+  """
+    Compute the linkage signature and external references of every class on a classpath.
+  """
+
+  CACHE_VERSION = 1
+  DEFAULT_BATCH_SIZE = 256
+
+  def __init__(self, cache_dir=None, max_workers=None, processes=True,
+               batch_size=DEFAULT_BATCH_SIZE):
+    """
+      cache_dir: Optional directory in which to cache results between scans.
+      max_workers: Number of worker processes or threads (default: number of cpus.)
+      processes: If True, parse classes in a process pool, otherwise in a thread pool.
+      batch_size: Number of classes sent to a worker at a time.
+    """
+    self._cache_dir = cache_dir
+    self._max_workers = max_workers or multiprocessing.cpu_count()
+    self._executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    self._batch_size = batch_size
+    if cache_dir:
+      safe_mkdir(cache_dir)
+
+  @staticmethod
+  def entries(path):
+    """
+      Return a dictionary of class name => cache key for the .class files of a jar or directory.
+    """
+    if os.path.isdir(path):
+      entries = {}
+      for root, _, files in os.walk(path):
+        for filename in files:
+          if filename.endswith('.class'):
+            full_path = os.path.join(root, filename)
+            st = os.stat(full_path)
+            entries[os.path.relpath(full_path, path)] = [st.st_size, int(st.st_mtime)]
+      return entries
+    with ZipFile(path) as zf:
+      return dict((_native(info.filename), [info.CRC, info.file_size]) for info in zf.infolist()
+                  if info.filename.endswith('.class'))
+
+  def _cache_file(self, path):
+    digest = hashlib.sha1(os.path.realpath(path).encode('utf-8')).hexdigest()
+    return os.path.join(self._cache_dir, '%s.json' % digest)
+
+  def _read_cache(self, path):
+    if not self._cache_dir:
+      return {}
+    try:
+      with open(self._cache_file(path)) as fp:
+        cache = json.load(fp)
+      if cache.get('version') != self.CACHE_VERSION:
+        return {}
+      return dict((_native(name), entry) for name, entry in cache['entries'].items())
+    except (IOError, OSError, ValueError, KeyError, AttributeError) as e:
+      log.debug('Could not read classpath cache for %s: %s' % (path, e))
+      return {}
+
+  def _write_cache(self, path, entries):
+    if not self._cache_dir:
+      return
+    cache_file = self._cache_file(path)
+    temporary = '%s.%d.tmp' % (cache_file, os.getpid())
+    try:
+      with open(temporary, 'w') as fp:
+        json.dump({'version': self.CACHE_VERSION, 'path': path, 'entries': entries}, fp)
+      os.rename(temporary, cache_file)
+    except (IOError, OSError) as e:
+      log.warning('Failed to write classpath cache for %s: %s' % (path, e))
+    except UnicodeError as e:
+      # Names that are not UTF-8, which can't be stored as JSON.
+      log.debug('Not caching classpath entries of %s: %s' % (path, e))
+    finally:
+      safe_delete(temporary)
+
+  def _batches(self, path, names):
+    for start in range(0, len(names), self._batch_size):
+      yield path, names[start:start + self._batch_size]
+
+  def scan(self, classpath):
+    """
+      Analyze every class of every jar or directory on classpath, a list of paths or a
+      os.pathsep-separated string.
+
+      Returns a dictionary of path => {class name => ClassSummary}.  Classes that fail to parse
+      are logged and omitted.
+    """
+    if isinstance(classpath, Compatibility.string):
+      classpath = [path for path in classpath.split(os.pathsep) if path]
+
+    results, cached = {}, {}
+    batches = []
+    for path in classpath:
+      entries = self.entries(path)
+      cache = self._read_cache(path)
+      summaries, cached_entries, misses = {}, {}, []
+      for name, key in entries.items():
+        hit = cache.get(name)
+        if hit is not None and hit[:2] == key:
+          cached_entries[name] = hit
+          if hit[2] is not None:
+            summaries[name] = ClassSummary(_native(hit[2]), tuple(map(_native, hit[3])))
+        else:
+          misses.append(name)
+      results[path] = summaries
+      cached[path] = (entries, cached_entries)
+      if misses:
+        batches.extend(self._batches(path, sorted(misses)))
+      elif len(cache) != len(cached_entries):
+        self._write_cache(path, cached_entries)
+
+    if not batches:
+      return results
+
+    updated = set()
+    with self._executor_class(max_workers=self._max_workers) as executor:
+      futures = [(path, executor.submit(_analyze_entries, path, names))
+                 for path, names in batches]
+      for path, future in futures:
+        entries, cached_entries = cached[path]
+        for name, summary in future.result():
+          if summary is None:
+            cached_entries[name] = entries[name] + [None, None]
+          else:
+            results[path][name] = summary
+            cached_entries[name] = entries[name] + [summary.linkage_signature,
+                                                    list(summary.external_references)]
+        updated.add(path)
+
+    for path in updated:
+      self._write_cache(path, cached[path][1])
+    return results
+
+  def scan_jar(self, path):
+    """
+      Analyze every class of a single jar or directory, returning {class name => ClassSummary}.
+    """
+    return self.scan([path])[path]
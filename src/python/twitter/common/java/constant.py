@@ -218,7 +218,6 @@ class Constant(object):
 
   @staticmethod
   def parse(data):
-    print('parse data[0] = %s' % data[0])
     tag = u1(data[0]).get()
     constant = Constant._BASE_TYPES[tag](data)
     return constant
@@ -19,7 +19,8 @@ import struct
 import threading
 
 from .attribute_buffer import AttributeBuffer
-from .builders.perfdata2 import PerfData2Format
+from .builders.perfdata2 import CachedPerfData2Format, PerfData2Format
+from .provider import MappedFileProvider
 
 
 class PerfDataMapping(Mapping):
@@ -64,6 +65,11 @@ class PerfData(object):
          with open(filename, 'rb') as fp:
            return fp.read()
        pd = PerfData.get(partial(provider, '/tmp/hsperfdata_root/12345'))
+
+     To sample the same JVM repeatedly, use a MappedFileProvider and cache_layout=True so that
+     the buffer is neither re-read nor re-parsed on every sample:
+
+       pd = PerfData.get(MappedFileProvider('/tmp/hsperfdata_root/12345'), cache_layout=True)
   """
   MAGIC = '\xca\xfe\xc0\xc0'
 
@@ -88,11 +94,17 @@ class PerfData(object):
     return (major, minor, endianness)
 
   @classmethod
-  def get(cls, provider):
+  def get(cls, provider, cache_layout=False):
+    """Return a PerfDataMapping over the hsperf data buffers returned by provider.
+
+       If cache_layout is True, the layout of the buffer is parsed once and reused by subsequent
+       samples, which must then come from the same JVM.
+    """
     hsperf = provider()
     major, minor, endianness = cls._parse_prologue(hsperf)
 
     if major == 2 and minor == 0:
-      return PerfDataMapping(provider, PerfData2Format(endianness))
+      builder = CachedPerfData2Format if cache_layout else PerfData2Format
+      return PerfDataMapping(provider, builder(endianness))
 
     raise ValueError('Unknown hsperf format: only support 2.0 perf data buffers.')
@@ -19,7 +19,7 @@ import glob
 
 from twitter.common import app
 
-from twitter.common.java.perfdata import PerfData
+from twitter.common.java.perfdata import MappedFileProvider, PerfData
 
 
 app.add_option(
@@ -55,10 +55,7 @@ app.add_option(
 
 def file_provider():
   options = app.get_options()
-  def provider():
-    with open(options.filename, 'rb') as fp:
-      return fp.read()
-  return provider
+  return MappedFileProvider(options.filename)
 
 
 def list_pids():
@@ -83,10 +80,7 @@ def pid_provider():
       break
   else:
     app.error('Could not find pid %s' % options.pid)
-  def loader():
-    with open(path, 'rb') as fp:
-      return fp.read()
-  return loader
+  return MappedFileProvider(path)
 
 
 def main(args, options):
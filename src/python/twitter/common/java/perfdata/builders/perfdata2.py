@@ -49,20 +49,18 @@ class PerfData2Format(object):
   def __init__(self, endianness=SimpleAttributeBuffer.LITTLE_ENDIAN):
     self._endianness = endianness
 
-  def __call__(self, data):
-    prologue = PerfDataBuffer2Prologue(data, self._endianness)
-
-    if not prologue.accessible:
-      return {}
+  def _entries(self, data, start_offset, num_entries):
+    """Parse num_entries entry headers starting at start_offset.
 
-    monitor_map = {}
-    start_offset = prologue.entry_offset
+       Yields (offset of the next entry, name, units, variability, vector length, data offset)
+       for each entry, where vector length is 0 for LONG scalars and otherwise the length of a
+       string."""
     parsed_entries = 0
 
     def more_entries():
       return start_offset + PerfDataEntryHeader2.LENGTH < len(data)
 
-    while more_entries() and parsed_entries < prologue.num_entries:
+    while more_entries() and parsed_entries < num_entries:
       entry = PerfDataEntryHeader2(
           data[start_offset:start_offset + PerfDataEntryHeader2.LENGTH], self._endianness)
 
@@ -80,20 +78,36 @@ class PerfData2Format(object):
       if entry.vector_length == 0:
         if code != TypeCode.LONG:
           raise ValueError('Unexpected monitor type: %d' % code)
-        value = struct.unpack(
-            '>q' if self._endianness is SimpleAttributeBuffer.BIG_ENDIAN else '<q',
-            data[data_start:data_start + 8])[0]
-        monitor_map[name] = (entry.data_units, value)
       else:
         if code != TypeCode.BYTE or entry.data_units != Units.STRING or (
             variability not in (Variability.CONSTANT, Variability.VARIABLE)):
           raise ValueError('Unexpected vector monitor: code:%s units:%s variability:%s' % (
               code, entry.data_units, variability))
-        monitor_map[name] = (entry.data_units,
-            data[data_start:data_start + entry.vector_length].rstrip('\r\n\x00'))
 
       start_offset += entry.entry_length
       parsed_entries += 1
+      yield start_offset, name, entry.data_units, variability, entry.vector_length, data_start
+
+  @classmethod
+  def _string(cls, data, data_start, vector_length):
+    return data[data_start:data_start + vector_length].rstrip('\r\n\x00')
+
+  def __call__(self, data):
+    prologue = PerfDataBuffer2Prologue(data, self._endianness)
+
+    if not prologue.accessible:
+      return {}
+
+    monitor_map = {}
+    long_format = '>q' if self._endianness is SimpleAttributeBuffer.BIG_ENDIAN else '<q'
+
+    for _, name, units, _, vector_length, data_start in self._entries(
+        data, prologue.entry_offset, prologue.num_entries):
+      if vector_length == 0:
+        value = struct.unpack(long_format, data[data_start:data_start + 8])[0]
+      else:
+        value = self._string(data, data_start, vector_length)
+      monitor_map[name] = (units, value)
 
     return self._postprocess(monitor_map)
 
@@ -113,3 +127,102 @@ class PerfData2Format(object):
         return value
 
     return dict((key, produce_value(value[0], value[1])) for key, value in monitor_map.items())
+
+
+class CachedPerfData2Format(PerfData2Format):
+  """A PerfData2Format for repeatedly sampling the same buffer.
+
+     Entry headers and names are only parsed the first time they are seen, and CONSTANT monitors
+     are only read once.  Every other LONG monitor is then read by a single struct unpack over
+     the entire buffer on each sample, and only VARIABLE strings are re-read.
+
+     Entries added by the JVM since the last sample are parsed incrementally.  The layout is
+     rebuilt if the buffer no longer matches it, e.g. if the provider maps a new JVM.
+  """
+
+  def __init__(self, endianness=SimpleAttributeBuffer.LITTLE_ENDIAN):
+    super(CachedPerfData2Format, self).__init__(endianness)
+    self._byte_order = '>' if endianness is SimpleAttributeBuffer.BIG_ENDIAN else '<'
+    self._reset(None)
+
+  def _reset(self, entry_offset):
+    self._entry_offset = entry_offset
+    self._next_offset = entry_offset
+    self._num_entries = 0
+    self._last_entry = None  # (offset, header and name bytes) of the last entry parsed
+    self._constants = {}  # name => (unit, value)
+    self._longs = []  # [(data offset, name, unit)] of non-CONSTANT LONG monitors
+    self._strings = []  # [(data offset, name, unit, length)] of VARIABLE strings
+    self._long_struct = None
+    self._frequency = None
+
+  def _matches(self, data, entry_offset, num_entries):
+    if entry_offset != self._entry_offset or num_entries < self._num_entries:
+      return False
+    if self._last_entry is None:
+      return True
+    offset, header = self._last_entry
+    return data[offset:offset + len(header)] == header
+
+  def _extend(self, data, num_entries):
+    offset = self._next_offset
+    for next_offset, name, units, variability, vector_length, data_start in self._entries(
+        data, self._next_offset, num_entries - self._num_entries):
+      self._last_entry = (offset, data[offset:data_start])
+      if vector_length == 0:
+        if variability == Variability.CONSTANT:
+          self._constants[name] = (units, struct.unpack(
+              self._byte_order + 'q', data[data_start:data_start + 8])[0])
+        else:
+          self._longs.append((data_start, name, units))
+      elif variability == Variability.CONSTANT:
+        self._constants[name] = (units, self._string(data, data_start, vector_length))
+      else:
+        self._strings.append((data_start, name, units, vector_length))
+      offset = self._next_offset = next_offset
+      self._num_entries += 1
+    self._compile()
+
+  def _compile(self):
+    self._longs.sort()
+    fmt, position = [self._byte_order], self._longs[0][0] if self._longs else 0
+    for data_start, _, _ in self._longs:
+      if data_start > position:
+        fmt.append('%dx' % (data_start - position))
+      fmt.append('q')
+      position = data_start + 8
+    self._long_struct = struct.Struct(''.join(fmt))
+    if 'sun.os.hrt.frequency' in self._constants:
+      self._frequency = 1.0 * self._constants['sun.os.hrt.frequency'][1]
+
+  def __call__(self, data):
+    prologue = PerfDataBuffer2Prologue(data, self._endianness)
+
+    if not prologue.accessible:
+      return {}
+
+    entry_offset, num_entries = prologue.entry_offset, prologue.num_entries
+    if not self._matches(data, entry_offset, num_entries):
+      self._reset(entry_offset)
+    if num_entries > self._num_entries:
+      self._extend(data, num_entries)
+
+    if self._frequency is None:
+      # Without a constant frequency, fall back to normalizing everything each time.
+      return super(CachedPerfData2Format, self).__call__(data)
+
+    def produce_value(unit, value):
+      return value / self._frequency if unit == Units.TICKS else value
+
+    sample = dict((name, produce_value(unit, value))
+                  for name, (unit, value) in self._constants.items())
+    if self._longs:
+      try:
+        values = self._long_struct.unpack_from(data, self._longs[0][0])
+      except struct.error as e:
+        raise ValueError('Possibly corrupt data buffer: %s' % e)
+      for (_, name, unit), value in zip(self._longs, values):
+        sample[name] = produce_value(unit, value)
+    for data_start, name, unit, vector_length in self._strings:
+      sample[name] = self._string(data, data_start, vector_length)
+    return sample
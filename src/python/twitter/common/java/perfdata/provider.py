@@ -0,0 +1,64 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import mmap
+import os
+import threading
+
+
+class MappedFileProvider(object):
+  """An hsperfdata provider that memory-maps the hsperfdata file of a JVM.
+
+     The JVM updates its hsperfdata file in place through its own mapping, so once mapped every
+     call returns the live buffer without reading the file.  The file is remapped if it is
+     replaced or resized, e.g. when a new JVM reuses the pid.
+
+     Ex:
+
+       pd = PerfData.get(MappedFileProvider('/tmp/hsperfdata_root/12345'), cache_layout=True)
+       while True:
+         pd.sample()
+         ...
+  """
+
+  def __init__(self, filename):
+    self._filename = filename
+    self._mmap = None
+    self._identity = None
+    self._lock = threading.Lock()
+
+  def _map(self):
+    with open(self._filename, 'rb') as fp:
+      st = os.fstat(fp.fileno())
+      if st.st_size == 0:
+        raise ValueError('%s is empty' % self._filename)
+      # A previous mapping is left to be unmapped once no longer referenced, as a sample may
+      # still be reading from it.
+      self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    self._identity = (st.st_dev, st.st_ino, st.st_size)
+
+  def __call__(self):
+    with self._lock:
+      st = os.stat(self._filename)
+      if self._mmap is None or (st.st_dev, st.st_ino, st.st_size) != self._identity:
+        self._map()
+      return self._mmap
+
+  def close(self):
+    """Unmap the file.  A subsequent call will map it again."""
+    if self._mmap is not None:
+      self._mmap.close()
+      self._mmap, self._identity = None, None
@@ -15,6 +15,13 @@
 # ==================================================================================================
 
 from logging import Handler
+import threading
+import time
+
+try:
+  from Queue import Empty, Full, Queue
+except ImportError:
+  from queue import Empty, Full, Queue
 
 try:
   from scribe import scribe
@@ -114,3 +121,174 @@ class ScribeHandler(Handler):
                                         % (self._host, self._port, err))
     finally:
       self.transport.close()
+
+
+class QueuedScribeHandler(ScribeHandler):
+  """logging.Handler interface for Scribe that never does network I/O on the logging thread.
+
+  Records are put on a bounded queue that a background thread drains, sending batches of up to
+  batch_size messages via a single Log() call over a persistent connection.  When the queue is
+  full, the overflow policy decides what happens to new records:
+
+    DROP_NEWEST: drop the new record (default.)
+    DROP_OLDEST: drop the oldest queued record to make room for the new one.
+    BLOCK: block the logging thread for up to block_timeout seconds, then drop the new record.
+
+  Counters (enqueued, sent, dropped, send_failures) and the queue depth are exported via
+  twitter.common.metrics into the `metrics` registry supplied, e.g. RootMetrics().scope('scribe'),
+  or into a private registry available as handler.metrics.
+  """
+  DROP_NEWEST, DROP_OLDEST, BLOCK = 'drop_newest', 'drop_oldest', 'block'
+  OVERFLOW_POLICIES = frozenset([DROP_NEWEST, DROP_OLDEST, BLOCK])
+
+  def __init__(self, *args, **kwargs):
+    """logging.Handler interface for Scribe that sends from a background thread.
+
+    Params (in addition to those of ScribeHandler):
+    buffer: If True, retry a failed batch until scribe becomes available (new records
+            accumulate in the queue meanwhile.)  If False, drop the failed batch.
+    max_queue: Maximum number of records queued for sending.
+    batch_size: Maximum number of messages sent per Log() call.
+    overflow: One of DROP_NEWEST, DROP_OLDEST or BLOCK.
+    block_timeout: Seconds to block the logging thread under the BLOCK policy.
+    retry_interval: Seconds to wait before reconnecting after a failure.
+    metrics: twitter.common.metrics registry into which to export counters.
+    clock: time-like object providing time() and sleep(), for testing.
+    """
+    max_queue = kwargs.pop('max_queue', 10000)
+    self._batch_size = kwargs.pop('batch_size', 100)
+    self._overflow = kwargs.pop('overflow', self.DROP_NEWEST)
+    self._block_timeout = kwargs.pop('block_timeout', 0.1)
+    self._retry_interval = kwargs.pop('retry_interval', 1.0)
+    self._clock = kwargs.pop('clock', time)
+    metrics = kwargs.pop('metrics', None)
+    if self._overflow not in self.OVERFLOW_POLICIES:
+      raise ValueError('Unknown overflow policy: %s' % self._overflow)
+    if max_queue <= 0 or self._batch_size <= 0:
+      raise ValueError('max_queue and batch_size must be positive.')
+    ScribeHandler.__init__(self, *args, **kwargs)
+    # Imported here as twitter.common.metrics imports twitter.common.log.
+    from twitter.common.metrics import AtomicGauge, LambdaGauge
+    from twitter.common.metrics.metrics import Metrics
+    self.metrics = Metrics() if metrics is None else metrics
+    # Messages are only marked done (task_done) once sent or dropped, so that the queue's count of
+    # unfinished tasks covers the messages in flight as well as those queued.
+    self._queue = Queue(maxsize=max_queue)
+    self._stopped = threading.Event()
+    self._enqueued = self.metrics.register(AtomicGauge('enqueued'))
+    self._sent = self.metrics.register(AtomicGauge('sent'))
+    self._dropped = self.metrics.register(AtomicGauge('dropped'))
+    self._failures = self.metrics.register(AtomicGauge('send_failures'))
+    self.metrics.register(LambdaGauge('queue_depth', self._queue.qsize))
+    self._sender = threading.Thread(target=self._run, name='QueuedScribeHandler')
+    self._sender.daemon = True
+    self._sender.start()
+
+  @property
+  def messages_pending(self):
+    """Return True if there are messages queued or being sent."""
+    return self._queue.unfinished_tasks > 0
+
+  def emit(self, record):
+    """Queue a record for sending to Scribe."""
+    entry = scribe.LogEntry(category=self._category, message=self.format(record))
+    try:
+      if self._overflow == self.BLOCK:
+        self._queue.put(entry, timeout=self._block_timeout)
+      else:
+        while True:
+          try:
+            self._queue.put_nowait(entry)
+            break
+          except Full:
+            if self._overflow == self.DROP_NEWEST:
+              raise
+            try:
+              self._queue.get_nowait()
+              self._queue.task_done()
+              self._dropped.increment()
+            except Empty:
+              pass
+      self._enqueued.increment()
+    except Full:
+      self._dropped.increment()
+
+  def _drain(self, timeout):
+    """Return up to batch_size queued messages, waiting up to timeout seconds for the first."""
+    try:
+      batch = [self._queue.get(timeout=timeout)]
+    except Empty:
+      return []
+    while len(batch) < self._batch_size:
+      try:
+        batch.append(self._queue.get_nowait())
+      except Empty:
+        break
+    return batch
+
+  def _complete(self, batch):
+    for _ in batch:
+      self._queue.task_done()
+
+  def _send(self, batch):
+    """Send a batch over the persistent connection, reconnecting on the next call if it fails."""
+    try:
+      if not self.transport.isOpen():
+        self.transport.open()
+      result = self.client.Log(batch)
+    except Exception:
+      # Any failure (usually a TTransportException) must not kill the sender thread.
+      result = None
+    if result == scribe.ResultCode.OK:
+      self._sent.add(len(batch))
+      return True
+    self._failures.increment()
+    if result is None:
+      self._disconnect()
+    return False
+
+  def _disconnect(self):
+    try:
+      self.transport.close()
+    finally:
+      self._transport = None
+      self._client = None
+
+  def _run(self):
+    batch = []
+    while True:
+      if not batch:
+        batch = self._drain(timeout=0.1)
+        if not batch:
+          if self._stopped.is_set():
+            break
+          continue
+      if self._send(batch):
+        self._complete(batch)
+        batch = []
+      elif not self._buffer_enabled or self._stopped.is_set():
+        self._dropped.add(len(batch))
+        self._complete(batch)
+        batch = []
+      else:
+        self._clock.sleep(self._retry_interval)
+    self._disconnect()
+
+  def flush(self, timeout=5.0):
+    """Wait up to timeout seconds (None: forever) for queued messages to be sent.
+
+    Returns True if no messages remain pending.
+    """
+    deadline = None if timeout is None else self._clock.time() + timeout
+    while self.messages_pending and self._sender.is_alive():
+      if deadline is not None and self._clock.time() >= deadline:
+        return False
+      self._clock.sleep(0.01)
+    return not self.messages_pending
+
+  def close(self, timeout=5.0):
+    """Send any queued messages, waiting up to timeout seconds, and stop the sender."""
+    self.flush(timeout=timeout)
+    self._stopped.set()
+    self._sender.join(timeout)
+    Handler.close(self)
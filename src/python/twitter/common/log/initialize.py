@@ -47,7 +47,7 @@ import sys
 import time
 
 from twitter.common.log.formatters import glog, plain
-from twitter.common.log.handlers import ScribeHandler
+from twitter.common.log.handlers import QueuedScribeHandler, ScribeHandler
 from twitter.common.log.options import LogOptions
 from twitter.common.dirutil import safe_mkdir
 
@@ -192,10 +192,14 @@ def _setup_disk_logging(filebase):
 def _setup_scribe_logging():
   filter = GenericFilter(lambda r_l: r_l >= LogOptions.scribe_log_level())
   formatter = ProxyFormatter(LogOptions.scribe_log_scheme)
-  scribe_handler = ScribeHandler(buffer=LogOptions.scribe_buffer(),
-                                 category=LogOptions.scribe_category(),
-                                 host=LogOptions.scribe_host(),
-                                 port=LogOptions.scribe_port())
+  kwargs = dict(buffer=LogOptions.scribe_buffer(),
+                category=LogOptions.scribe_category(),
+                host=LogOptions.scribe_host(),
+                port=LogOptions.scribe_port())
+  if LogOptions.scribe_queue_size() > 0:
+    scribe_handler = QueuedScribeHandler(max_queue=LogOptions.scribe_queue_size(), **kwargs)
+  else:
+    scribe_handler = ScribeHandler(**kwargs)
   scribe_handler.setFormatter(formatter)
   scribe_handler.addFilter(filter)
   return [scribe_handler]
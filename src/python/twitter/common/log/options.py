@@ -40,7 +40,8 @@ _DEFAULT_LOG_OPTS = {
   'twitter_common_log_scribe_host': 'localhost',
   'twitter_common_log_scribe_log_level': 'NONE',
   'twitter_common_log_scribe_port': 1463,
-  'twitter_common_log_scribe_category': 'python_default'
+  'twitter_common_log_scribe_category': 'python_default',
+  'twitter_common_log_scribe_queue_size': 0,
 }
 
 
@@ -95,6 +96,7 @@ class LogOptions(object):
   _SCRIBE_LOG_LEVEL = None
   _SCRIBE_LOG_SCHEME = None
   _SCRIBE_PORT = None
+  _SCRIBE_QUEUE_SIZE = None
   _SCRIBE_CATEGORY = None
 
   @staticmethod
@@ -241,6 +243,24 @@ class LogOptions(object):
       LogOptions._SCRIBE_PORT = app.get_options().twitter_common_log_scribe_port
     return LogOptions._SCRIBE_PORT
 
+  @staticmethod
+  def set_scribe_queue_size(queue_size):
+    """
+      Set the size of the queue of messages sent to scribe from a background thread, or 0 to
+      send synchronously from the logging thread. Must be called before log.init() for
+      changes to take effect.
+    """
+    LogOptions._SCRIBE_QUEUE_SIZE = queue_size
+
+  @staticmethod
+  def scribe_queue_size():
+    """
+      Get the current size of the scribe message queue (0 if sending synchronously.)
+    """
+    if LogOptions._SCRIBE_QUEUE_SIZE is None:
+      LogOptions._SCRIBE_QUEUE_SIZE = app.get_options().twitter_common_log_scribe_queue_size
+    return LogOptions._SCRIBE_QUEUE_SIZE
+
   @staticmethod
   def set_stderr_log_level(log_level):
     """
@@ -472,3 +492,11 @@ if HAVE_APP:
               metavar='PORT',
               dest='twitter_common_log_scribe_port',
               help="The port used to connect to the scribe daemon. [default: %default].")
+
+  app.add_option('--scribe_queue_size',
+              type='int',
+              default=_DEFAULT_LOG_OPTS['twitter_common_log_scribe_queue_size'],
+              metavar='MESSAGES',
+              dest='twitter_common_log_scribe_queue_size',
+              help="If non-zero, send messages to the scribe daemon in batches from a background "
+                   "thread, queueing at most this many messages. [default: %default].")
@@ -3,7 +3,8 @@ from datetime import datetime, timedelta
 from twitter.common.lang import total_ordering
 
 # TODO(wickman) Do something that won't break if this is running over NYE?
-_CURRENT_YEAR = str(datetime.now().year)
+_YEAR = datetime.now().year
+_CURRENT_YEAR = str(_YEAR)
 
 
 class Level(object):
@@ -16,13 +17,15 @@ class Level(object):
 
 @total_ordering
 class Line(object):
+  """
+    A parsed log line.  Line implementations may construct lines via Line.deferred, in which case
+    the pid, source and message fields are only parsed out of the raw line when first accessed.
+  """
   __slots__ = (
     'raw',
     'level',
     'datetime',
-    'pid',
-    'source',
-    'message'
+    '_fields',
   )
 
   @classmethod
@@ -40,9 +43,38 @@ class Line(object):
       except ValueError:
         continue
 
+  @classmethod
+  def deferred(cls, raw, level, dt):
+    """Return a Line whose pid, source and message are parsed by split_fields on first access."""
+    line = cls.__new__(cls)
+    line.raw, line.level, line.datetime, line._fields = raw, level, dt, None
+    return line
+
   def __init__(self, raw, level, dt, pid, source, message):
-    (self.raw, self.level, self.datetime, self.pid, self.source, self.message) = (
-        raw, level, dt, pid, source, message)
+    self.raw, self.level, self.datetime = raw, level, dt
+    self._fields = (pid, source, message)
+
+  def split_fields(self):
+    """Return (pid, source, message) parsed from the raw line of a deferred Line."""
+    raise NotImplementedError
+
+  @property
+  def fields(self):
+    if self._fields is None:
+      self._fields = self.split_fields()
+    return self._fields
+
+  @property
+  def pid(self):
+    return self.fields[0]
+
+  @property
+  def source(self):
+    return self.fields[1]
+
+  @property
+  def message(self):
+    return self.fields[2]
 
   def extend(self, lines):
     extension = '\n'.join(lines)
@@ -60,9 +92,7 @@ class Line(object):
       return False
     return (self.datetime == other.datetime and
             self.level == other.level and
-            self.pid == other.pid and
-            self.source == other.source and
-            self.message == other.message)
+            self.fields == other.fields)
 
   def __str__(self):
     return self.raw
@@ -77,6 +107,48 @@ class GlogLine(Line):
     'D': Level.DEBUG
   }
 
+  # Fixed offsets of the separators in 'Lmmdd hh:mm:ss.uuuuuu pid source] message'
+  _SEPARATORS = ((5, ' '), (8, ':'), (11, ':'), (14, '.'), (21, ' '))
+  _HEADER_LENGTH = 22
+
+  # (mmdd hh:mm:ss, (year, month, day, hour, minute, second)) of the last line parsed, as
+  # consecutive lines usually share it.
+  _last_second = (None, None)
+
+  @classmethod
+  def _fixed_layout(cls, line):
+    if len(line) < cls._HEADER_LENGTH:
+      return False
+    for offset, separator in cls._SEPARATORS:
+      if line[offset] != separator:
+        return False
+    return True
+
+  @classmethod
+  def parse_time(cls, line):
+    """
+      Parse the timestamp of a glog line in the standard fixed layout, without strptime.
+
+      Raises ValueError if the timestamp is malformed.
+    """
+    if not cls._fixed_layout(line):
+      raise ValueError('Not a fixed layout glog line.')
+    second, fields = cls._last_second
+    if line[1:14] != second:
+      second = line[1:14]
+      digits = ''.join([line[1:5], line[6:8], line[9:11], line[12:14]])
+      if not digits.isdigit():
+        raise ValueError('Malformed glog timestamp.')
+      fields = (_YEAR, int(digits[0:2]), int(digits[2:4]), int(digits[4:6]), int(digits[6:8]),
+          int(digits[8:10]))
+      datetime(*fields)  # validate
+      cls._last_second = (second, fields)
+    microseconds = line[15:21]
+    if not microseconds.isdigit():
+      raise ValueError('Malformed glog timestamp.')
+    year, month, day, hour, minute, sec = fields
+    return datetime(year, month, day, hour, minute, sec, int(microseconds))
+
   @classmethod
   def split_time(cls, line):
     if len(line) == 0:
@@ -86,15 +158,30 @@ class GlogLine(Line):
     sline = line[1:].split(' ')
     if len(sline) < 2:
       raise ValueError
-    t = datetime.strptime(''.join([_CURRENT_YEAR, sline[0], ' ', sline[1]]), '%Y%m%d %H:%M:%S.%f')
+    try:
+      t = cls.parse_time(line)
+    except ValueError:
+      t = datetime.strptime(''.join([_CURRENT_YEAR, sline[0], ' ', sline[1]]),
+          '%Y%m%d %H:%M:%S.%f')
     return cls.LEVEL_MAP[line[0]], t, sline[2:]
 
   @classmethod
   def parse(cls, line):
+    if line and line[0] in cls.LEVEL_MAP and cls._fixed_layout(line):
+      # Lines in the standard layout have their remaining fields parsed on demand.
+      if line.find(' ', cls._HEADER_LENGTH) == -1:
+        raise ValueError('Glog line has no source.')
+      return cls.deferred(line, cls.LEVEL_MAP[line[0]], cls.parse_time(line))
     level, dt, rest = cls.split_time(line)
+    if len(rest) < 2:
+      raise ValueError('Glog line has no source.')
     pid, source, message = rest[0], rest[1], ' '.join(rest[2:])
     return cls(line, level, dt, pid, source, message)
 
+  def split_fields(self):
+    sline = self.raw[1:].split(' ', 4)
+    return sline[2], sline[3], sline[4] if len(sline) > 4 else ''
+
 
 class ZooLine(Line):
   LEVEL_MAP = {
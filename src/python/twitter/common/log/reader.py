@@ -1,7 +1,9 @@
 from collections import deque
 from datetime import datetime, timedelta
 import errno
+import heapq
 from io import BytesIO, FileIO
+from itertools import count
 import os
 
 from twitter.common.lang import Compatibility
@@ -108,7 +110,7 @@ class Stream(object):
 
 class StreamMuxer(object):
   """
-    Multiplexes a set of streams into a single stream.
+    Multiplexes a set of streams into a single stream, ordered by time.
   """
   def __init__(self, streams):
     """
@@ -116,27 +118,21 @@ class StreamMuxer(object):
     """
     streams = list(streams)
     self._labels = dict(streams)
-    self._refresh = set(stream for (stream, _) in streams)
-    self._heads = set()
+    self._refresh = [stream for (stream, _) in streams]
+    self._heads = []  # heap of (datetime, sequence, line, stream)
+    self._sequence = count()
 
   def _collect(self):
-    discard = set()
+    refresh = []
     for stream in self._refresh:
       line = stream.next()
-      if line is Stream.EOF:
-        discard.add(stream)
-      elif line is not None:
-        discard.add(stream)
-        self._heads.add((line, stream))
-    self._refresh -= discard
-
-  def _pop(self):
-    try:
-      minimum = min(self._heads)
-      self._heads.discard(minimum)
-      return minimum
-    except ValueError:
-      pass
+      if line is None:
+        refresh.append(stream)
+      elif line is not Stream.EOF:
+        # The sequence number breaks ties between equal timestamps in arrival order, so that
+        # neither lines nor streams are ever compared.
+        heapq.heappush(self._heads, (line.datetime, next(self._sequence), line, stream))
+    self._refresh = refresh
 
   def next(self):
     """
@@ -146,8 +142,7 @@ class StreamMuxer(object):
     self._collect()
     if not self._heads and not self._refresh:
       return Stream.EOF
-    minimum = self._pop()
-    if minimum:
-      line, stream = minimum
-      self._refresh.add(stream)
+    if self._heads:
+      _, _, line, stream = heapq.heappop(self._heads)
+      self._refresh.append(stream)
       return (self._labels[stream], line)
@@ -15,7 +15,8 @@
 # ==================================================================================================
 
 from .gauge import *
-from .rate import Rate
+from .histogram import Histogram
+from .rate import Rate, WindowedRate
 from .metrics import (
     CompoundMetrics,
     Observable,
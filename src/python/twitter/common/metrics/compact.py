@@ -0,0 +1,176 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""
+  A compact binary encoding of metric samples and sample deltas.
+
+  A payload is a header followed by a sequence of records:
+
+    header:  magic 'TCMX', version (uint8), flags (uint8), epoch (uint64), generation (uint64)
+    record:  tag (1 byte), metric id (uint32), payload
+
+  The only flag is FULL, set when the payload carries the entire sample rather than a delta: the
+  receiver must then forget every name and value it learned from earlier payloads.
+
+  Metric names are sent once, in 'D' (definition) records carrying a uint16 length-prefixed UTF-8
+  name.  Values are sent as 'i' (int64), 'd' (double), 'T'/'F' (bool), 'N' (None), 's' (uint32
+  length-prefixed UTF-8 string) or 'j' (uint32 length-prefixed JSON, for anything else.)  An 'X'
+  record, with no payload, marks a metric as removed.  All integers are big-endian.
+"""
+
+from collections import namedtuple
+import json
+import struct
+
+from twitter.common.lang import Compatibility
+
+
+MAGIC = b'TCMX'
+VERSION = 2
+FULL = 0x1
+
+_HEADER = struct.Struct('>4sBBQQ')
+_RECORD = struct.Struct('>cI')
+_NAME_LENGTH = struct.Struct('>H')
+_LENGTH = struct.Struct('>I')
+_INT = struct.Struct('>q')
+_DOUBLE = struct.Struct('>d')
+
+_MIN_INT, _MAX_INT = -2**63, 2**63 - 1
+
+
+class DecodeError(Exception): pass
+
+
+Payload = namedtuple('Payload', ['epoch', 'generation', 'full', 'samples', 'removed'])
+
+
+def _encode_string(value):
+  if not isinstance(value, bytes):
+    value = value.encode('utf-8')
+  return value
+
+
+def _encode_value(name_id, value):
+  if value is True or value is False:
+    return _RECORD.pack(b'T' if value else b'F', name_id)
+  elif value is None:
+    return _RECORD.pack(b'N', name_id)
+  elif isinstance(value, Compatibility.integer) and _MIN_INT <= value <= _MAX_INT:
+    return _RECORD.pack(b'i', name_id) + _INT.pack(value)
+  elif isinstance(value, Compatibility.real):
+    return _RECORD.pack(b'd', name_id) + _DOUBLE.pack(value)
+  elif isinstance(value, Compatibility.string):
+    encoded = _encode_string(value)
+    return _RECORD.pack(b's', name_id) + _LENGTH.pack(len(encoded)) + encoded
+  else:
+    encoded = _encode_string(json.dumps(value))
+    return _RECORD.pack(b'j', name_id) + _LENGTH.pack(len(encoded)) + encoded
+
+
+def encode(generation, samples, ids, new_ids=None, removed=(), epoch=0, full=False):
+  """
+    Encode a sample (or sample delta) as bytes.
+
+      generation: The generation of the sample.
+      samples: Dictionary of metric name => value.
+      ids: Dictionary of metric name => id covering every name in samples and removed.
+      new_ids: Dictionary of metric name => id of the names the receiver does not know yet
+               (default: every name in samples.)
+      removed: Names of metrics that have been removed.
+      epoch: The epoch of the sampler that produced the sample.
+      full: True if samples is the entire sample rather than a delta.
+  """
+  if new_ids is None:
+    new_ids = dict((name, ids[name]) for name in samples)
+  chunks = [_HEADER.pack(MAGIC, VERSION, FULL if full else 0, epoch, generation)]
+  for name, name_id in sorted(new_ids.items(), key=lambda item: item[1]):
+    encoded = _encode_string(name)
+    chunks.append(_RECORD.pack(b'D', name_id) + _NAME_LENGTH.pack(len(encoded)) + encoded)
+  for name, value in samples.items():
+    chunks.append(_encode_value(ids[name], value))
+  for name in removed:
+    chunks.append(_RECORD.pack(b'X', ids[name]))
+  return b''.join(chunks)
+
+
+def decode(data, names=None):
+  """
+    Decode bytes produced by encode().
+
+      data: The encoded payload.
+      names: Dictionary of metric id => name learned from previous payloads, updated in place
+             with any definitions found in this one (and cleared first if the payload is full.)
+
+    Returns a Payload (epoch, generation, full, samples, removed) where samples is a dictionary
+    of metric name => value and removed is a list of names.
+  """
+  names = {} if names is None else names
+  try:
+    magic, version, flags, epoch, generation = _HEADER.unpack_from(data, 0)
+  except struct.error as e:
+    raise DecodeError('Truncated header: %s' % e)
+  if magic != MAGIC or version != VERSION:
+    raise DecodeError('Unknown payload format %r version %d' % (magic, version))
+  full = bool(flags & FULL)
+  if full:
+    names.clear()
+
+  samples, removed = {}, []
+  offset = _HEADER.size
+
+  def read_bytes(struct_type):
+    length, = struct_type.unpack_from(data, offset)
+    start = offset + struct_type.size
+    if start + length > len(data):
+      raise DecodeError('Truncated record at offset %d' % offset)
+    return data[start:start + length], start + length
+
+  try:
+    while offset < len(data):
+      tag, name_id = _RECORD.unpack_from(data, offset)
+      offset += _RECORD.size
+      if tag == b'D':
+        name, offset = read_bytes(_NAME_LENGTH)
+        names[name_id] = name.decode('utf-8')
+        continue
+      if name_id not in names:
+        raise DecodeError('Undefined metric id %d' % name_id)
+      name = names[name_id]
+      if tag == b'X':
+        removed.append(name)
+      elif tag in (b'T', b'F'):
+        samples[name] = tag == b'T'
+      elif tag == b'N':
+        samples[name] = None
+      elif tag == b'i':
+        samples[name], = _INT.unpack_from(data, offset)
+        offset += _INT.size
+      elif tag == b'd':
+        samples[name], = _DOUBLE.unpack_from(data, offset)
+        offset += _DOUBLE.size
+      elif tag == b's':
+        value, offset = read_bytes(_LENGTH)
+        samples[name] = value.decode('utf-8')
+      elif tag == b'j':
+        value, offset = read_bytes(_LENGTH)
+        samples[name] = json.loads(value.decode('utf-8'))
+      else:
+        raise DecodeError('Unknown record tag %r at offset %d' % (tag, offset - _RECORD.size))
+  except struct.error as e:
+    raise DecodeError('Truncated record: %s' % e)
+
+  return Payload(epoch, generation, full, samples, removed)
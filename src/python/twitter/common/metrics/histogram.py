@@ -0,0 +1,162 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+from bisect import bisect_left
+import threading
+
+from twitter.common.lang import Compatibility
+
+from .gauge import NamedGauge
+from .metrics import MetricProvider
+
+
+def bucket_limits(error=0.005, maximum=2**31 - 1):
+  """
+    Compute the upper limits of exponentially sized buckets such that any value in [0, maximum]
+    is stored with a relative error of at most ``error``.
+  """
+  limits = [1]
+  while limits[-1] < maximum:
+    limits.append(max(limits[-1] + 1, int(limits[-1] * (1.0 + 2 * error))))
+  return limits
+
+
+class Histogram(NamedGauge, MetricProvider):
+  """
+    A streaming histogram with fixed memory footprint.
+
+    Observations are counted in a fixed set of exponentially sized buckets (shared by every
+    histogram with the same precision) so that add() is a bisect plus an increment and never
+    allocates.  When sampled by Metrics, a histogram named 'latency_ms' expands into
+    'latency_ms.p50', 'latency_ms.p99', 'latency_ms.count' and so on.
+
+    Values should be non-negative and are bucketed as integers, so record them in a unit
+    fine enough for the precision required (e.g. microseconds rather than fractional seconds.)
+  """
+
+  DEFAULT_PERCENTILES = (0.5, 0.9, 0.95, 0.99, 0.999, 0.9999)
+
+  _LIMITS = {}
+  _LIMITS_LOCK = threading.Lock()
+
+  @classmethod
+  def limits_for(cls, error):
+    with cls._LIMITS_LOCK:
+      if error not in cls._LIMITS:
+        cls._LIMITS[error] = bucket_limits(error=error)
+      return cls._LIMITS[error]
+
+  @staticmethod
+  def percentile_name(percentile):
+    """
+      Turn a percentile into its sample suffix, e.g. 0.5 => 'p50', 0.999 => 'p999'.
+    """
+    if not 0 < percentile < 1:
+      raise ValueError('Percentiles must be in the range (0, 1), got %s' % percentile)
+    digits = ('%.10f' % percentile).split('.')[1].rstrip('0')
+    return 'p' + digits.ljust(2, '0')
+
+  def __init__(self, name, percentiles=DEFAULT_PERCENTILES, error=0.005):
+    """
+      Create a histogram.
+
+        name: The base name of the histogram.
+        percentiles: The percentiles to export on sample.
+        error: The maximum relative error of reported percentiles (default 0.5%.)
+    """
+    self._percentiles = tuple((self.percentile_name(p), p) for p in sorted(percentiles))
+    self._limits = self.limits_for(error)
+    self._lock = threading.Lock()
+    self._counts = [0] * (len(self._limits) + 1)
+    self._count = self._sum = 0
+    self._min = self._max = None
+    NamedGauge.__init__(self, name)
+
+  def add(self, value):
+    """
+      Record an observation.
+    """
+    if not isinstance(value, Compatibility.numeric):
+      raise TypeError('Histogram.add must be called with a number, got %s' % type(value))
+    if value < 0:
+      raise ValueError('Histogram.add must be called with a non-negative number.')
+    index = bisect_left(self._limits, value)
+    with self._lock:
+      self._counts[index] += 1
+      self._count += 1
+      self._sum += value
+      if self._min is None or value < self._min:
+        self._min = value
+      if self._max is None or value > self._max:
+        self._max = value
+
+  def clear(self):
+    """
+      Drop all recorded observations.
+    """
+    with self._lock:
+      self._counts = [0] * (len(self._limits) + 1)
+      self._count = self._sum = 0
+      self._min = self._max = None
+
+  def _bucket_value(self, index, maximum):
+    if index == 0:
+      return self._limits[0]
+    if index >= len(self._limits):
+      return maximum
+    # Midpoint of the bucket (limits[index - 1], limits[index]].
+    return (self._limits[index - 1] + 1 + self._limits[index]) // 2
+
+  def _percentiles_of(self, counts, total, minimum, maximum):
+    results = {}
+    if not self._percentiles:
+      return results
+    percentiles = iter(self._percentiles)
+    name, percentile = next(percentiles)
+    target = max(1, int(percentile * total + 0.5))
+    seen = 0
+    for index, count in enumerate(counts):
+      if not count:
+        continue
+      seen += count
+      while seen >= target:
+        value = self._bucket_value(index, maximum)
+        results[name] = min(max(value, minimum), maximum)
+        try:
+          name, percentile = next(percentiles)
+        except StopIteration:
+          return results
+        target = max(1, int(percentile * total + 0.5))
+    return results
+
+  def sample(self):
+    """
+      Returns a dictionary of statistic => value for the observations recorded so far.
+    """
+    with self._lock:
+      counts, total, value_sum = list(self._counts), self._count, self._sum
+      minimum, maximum = self._min, self._max
+    samples = dict(count=total, sum=value_sum)
+    if total == 0:
+      samples.update((name, 0) for name, _ in self._percentiles)
+      samples.update(avg=0, min=0, max=0)
+      return samples
+    samples.update(avg=float(value_sum) / total, min=minimum, max=maximum)
+    samples.update(self._percentiles_of(counts, total, minimum, maximum))
+    return samples
+
+  def read(self):
+    return self.sample()
@@ -14,6 +14,7 @@
 # limitations under the License.
 # ==================================================================================================
 
+import weakref
 
 from twitter.common.lang import Compatibility, Singleton
 from .gauge import (
@@ -109,12 +110,60 @@ class Metrics(MetricRegistry, MetricProvider):
   def __init__(self):
     self._metrics = {}
     self._children = {}
+    self._parents = weakref.WeakKeyDictionary()
+    self._generation = 0
+    self._flattened = None
+
+  def _invalidate(self):
+    """
+      Drop the flattened view of this scope and of every scope it is registered into.
+    """
+    self._generation += 1
+    self._flattened = None
+    for parent in list(self._parents.keys()):
+      parent._invalidate()
+
+  def _attach(self, name, child):
+    previous = self._children.get(name)
+    self._children[name] = child
+    if previous is not None and previous is not child:
+      self._detach(previous)
+    if isinstance(child, Metrics):
+      child._parents[self] = True
+    self._invalidate()
+
+  def _detach(self, child):
+    if isinstance(child, Metrics) and child not in self._children.values():
+      child._parents.pop(self, None)
+
+  def _flatten(self):
+    """
+      Returns a list of (fully qualified name, gauge) for this scope and its children.
+
+      The list is computed once and cached until a register/unregister or scope change anywhere
+      beneath this scope.  Gauges that are MetricProviders are included as-is and expanded at
+      sample time.
+    """
+    flattened = self._flattened
+    if flattened is not None:
+      return flattened
+    generation = self._generation
+    flattened = list(self._metrics.items())
+    for scope_name, scope in list(self._children.items()):
+      if isinstance(scope, Metrics):
+        flattened.extend((self.sample_name(scope_name, name), gauge)
+                         for (name, gauge) in scope._flatten())
+      else:
+        flattened.append((scope_name, scope))
+    if generation == self._generation:
+      self._flattened = flattened
+    return flattened
 
   def scope(self, name):
     if not isinstance(name, Compatibility.string):
       raise TypeError('Scope names must be strings, got: %s' % type(name))
     if name not in self._children:
-      self._children[name] = Metrics()
+      self._attach(name, Metrics())
     return self._children[name]
 
   def register_observable(self, name, observable):
@@ -122,12 +171,16 @@ class Metrics(MetricRegistry, MetricProvider):
       raise TypeError('Scope names must be strings, got: %s' % type(name))
     if not isinstance(observable, Observable):
       raise TypeError('observable must be an Observable, got: %s' % type(observable))
-    self._children[name] = observable.metrics
+    self._attach(name, observable.metrics)
 
   def unregister_observable(self, name):
     if not isinstance(name, Compatibility.string):
       raise TypeError('Unregister takes a string name!')
-    return self._children.pop(name, None)
+    child = self._children.pop(name, None)
+    if child is not None:
+      self._detach(child)
+      self._invalidate()
+    return child
 
   def register(self, gauge):
     if isinstance(gauge, Compatibility.string):
@@ -135,22 +188,34 @@ class Metrics(MetricRegistry, MetricProvider):
     if not isinstance(gauge, NamedGauge) and not namablegauge(gauge):
       raise TypeError('Must register either a string or a Gauge-like object! Got %s' % gauge)
     self._metrics[gauge.name()] = gauge
+    self._invalidate()
     return gauge
 
   def unregister(self, name):
     if not isinstance(name, Compatibility.string):
       raise TypeError('Unregister takes a string name!')
-    return self._metrics.pop(name, None)
+    gauge = self._metrics.pop(name, None)
+    if gauge is not None:
+      self._invalidate()
+    return gauge
 
   @classmethod
   def sample_name(cls, scope_name, sample_name):
     return '.'.join([scope_name, sample_name])
 
   def sample(self):
-    samples = dict(filter(None, map(self.coerce_metric, self._metrics.items())))
-    for scope_name, scope in self._children.items():
-      samples.update((self.sample_name(scope_name, sample_name), sample_value)
-                     for (sample_name, sample_value) in scope.sample().items())
+    samples = {}
+    coerce_value = self.coerce_value
+    for name, gauge in self._flatten():
+      if isinstance(gauge, MetricProvider):
+        # Gauges that are themselves providers (e.g. Histogram) expand into name.<statistic>.
+        samples.update((self.sample_name(name, sample_name), coerce_value(sample_value))
+                       for (sample_name, sample_value) in gauge.sample().items())
+        continue
+      try:
+        samples[name] = coerce_value(gauge.read())
+      except ValueError:
+        continue
     return samples
 
 
@@ -14,11 +14,15 @@
 # limitations under the License.
 # ==================================================================================================
 
+import math
+import threading
 import time
 
+from twitter.common.collections import RingBuffer
 from twitter.common.quantity import Amount, Time
 from .gauge import NamedGauge, gaugelike, namablegauge
 
+
 class Rate(NamedGauge):
   """
     Gauge that computes a windowed rate.
@@ -70,3 +74,113 @@ class Rate(NamedGauge):
     dy = new_sample - last_sample[1]
     dt = now - last_sample[0]
     return 0 if dt == 0 else dy / dt
+
+
+class SampleHistory(object):
+  """
+    A bounded, time-ordered history of (timestamp, value) samples of a gauge.
+
+    Consecutive samples are kept at least `resolution` seconds apart (a newer sample within the
+    resolution replaces the newest one), so the history covering `horizon` seconds never holds
+    more than horizon / resolution + 2 samples.  A history may be shared by several
+    WindowedRates so that the underlying gauge is read at most once per clock tick.
+  """
+  def __init__(self, gauge, horizon, resolution, clock=time):
+    if not gaugelike(gauge):
+      raise TypeError('SampleHistory must take a Gauge-like object!  Got %s' % type(gauge))
+    if resolution <= 0 or horizon < resolution:
+      raise ValueError('SampleHistory requires 0 < resolution <= horizon.')
+    self._gauge = gauge
+    self._resolution = resolution
+    self._clock = clock
+    self._lock = threading.Lock()
+    self._samples = RingBuffer(int(math.ceil(float(horizon) / resolution)) + 2)
+
+  def sample(self):
+    """
+      Sample the gauge, returning the (timestamp, value) of the newest sample.
+    """
+    with self._lock:
+      now = self._clock.time()
+      samples = self._samples
+      if len(samples) > 0 and samples[-1][0] == now:
+        return samples[-1]
+      newest = (now, self._gauge.read())
+      if len(samples) >= 2 and samples[-1][0] - samples[-2][0] < self._resolution:
+        samples[-1] = newest
+      else:
+        samples.append(newest)
+      return newest
+
+  def oldest(self, newer_than):
+    """
+      Return the oldest (timestamp, value) sample taken no earlier than `newer_than`, or None.
+    """
+    with self._lock:
+      samples = self._samples
+      low, high = 0, len(samples)
+      while low < high:
+        mid = (low + high) // 2
+        if samples[mid][0] < newer_than:
+          low = mid + 1
+        else:
+          high = mid
+      return samples[low] if low < len(samples) else None
+
+
+class WindowedRate(NamedGauge):
+  """
+    Gauge that computes a windowed rate in bounded memory and logarithmic time per read.
+
+    Unlike Rate, which keeps every sample in its window, WindowedRate reads from a fixed-size
+    SampleHistory.  Use WindowedRate.of to derive several windows (e.g. 1s, 1m and 5m) from one
+    underlying gauge and history.
+  """
+  DEFAULT_SLOTS = 10
+
+  @classmethod
+  def of(cls, gauge, name=None, windows=(Amount(1, Time.SECONDS),), slots=DEFAULT_SLOTS,
+         clock=time):
+    """
+      Return a list of WindowedRates of gauge, one per window, sharing a single SampleHistory.
+
+        gauge: The gauge to sample (must be namable if name is not specified.)
+        name: The base name of the rates.
+        windows: The windows over which the rates should be measured.
+        slots: The number of samples retained per smallest window.
+    """
+    if name is None:
+      if not namablegauge(gauge):
+        raise TypeError('WindowedRate.of must take a namable Gauge-like object if no name '
+                        'specified!')
+      name = gauge.name()
+    if not windows:
+      raise ValueError('WindowedRate.of requires at least one window.')
+    seconds = [window.as_(Time.SECONDS) for window in windows]
+    history = SampleHistory(gauge, max(seconds), float(min(seconds)) / slots, clock=clock)
+    return [cls(name, history, window=window, clock=clock) for window in windows]
+
+  def __init__(self, name, gauge, window=Amount(1, Time.SECONDS), slots=DEFAULT_SLOTS,
+               clock=time):
+    """
+      Create a gauge using name as a base for a <name>_per_<window> sampling gauge.
+
+        name: The base name of the gauge.
+        gauge: The gauge to sample, or a SampleHistory shared with other WindowedRates.
+        window: The window over which the samples should be measured (default 1 second.)
+        slots: The number of samples retained per window if a new history is created.
+    """
+    self._window = window
+    self._window_secs = window.as_(Time.SECONDS)
+    if isinstance(gauge, SampleHistory):
+      self._history = gauge
+    else:
+      self._history = SampleHistory(gauge, self._window_secs, float(self._window_secs) / slots,
+                                    clock=clock)
+    NamedGauge.__init__(self, '%s_per_%s%s' % (name, window.amount(), window.unit()))
+
+  def read(self):
+    now, new_sample = self._history.sample()
+    last_time, last_sample = self._history.oldest(now - self._window_secs)
+    dt = now - last_time
+    return 0 if dt == 0 else (new_sample - last_sample) / dt
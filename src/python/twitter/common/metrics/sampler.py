@@ -14,8 +14,10 @@
 # limitations under the License.
 # ==================================================================================================
 
+from collections import namedtuple
 import json
 import os
+import random
 import time
 import threading
 
@@ -59,22 +61,132 @@ class MetricSampler(SamplerBase, MetricProvider):
   """
     A thread that periodically samples from a MetricProvider and caches the
     samples.
+
+    Each sample is numbered by a monotonically increasing generation, and the sampler tracks the
+    generation in which every metric last changed, so that consumers that already hold an older
+    sample can fetch only the difference via delta().  Metric names are also assigned stable
+    integer ids for use by compact encodings.
+
+    Generations and ids are only meaningful within the sampler's epoch, a random number chosen
+    when the sampler is created, so consumers must hand back the epoch along with the generation
+    to detect that the sampler (usually the whole process) has been restarted.
+
+    The names of removed metrics are remembered for `removal_window` generations, so that any
+    number of consumers polling at least that often are told about removals exactly; consumers
+    that fall further behind are resynchronized with a full sample.
   """
-  def __init__(self, provider, period=Amount(1, Time.SECONDS), clock=time):
+  Delta = namedtuple('Delta', ['epoch', 'generation', 'full', 'samples', 'removed', 'ids',
+                               'new_ids'])
+
+  # Keep epochs exactly representable as JSON (double precision) numbers.
+  EPOCH_BITS = 53
+
+  DEFAULT_REMOVAL_WINDOW = 300
+
+  def __init__(self, provider, period=Amount(1, Time.SECONDS), clock=time,
+               removal_window=DEFAULT_REMOVAL_WINDOW):
+    if removal_window < 1:
+      raise ValueError('removal_window must be at least one generation, got %r' % removal_window)
     self._provider = provider
-    self._last_sample = self._provider.sample()
+    self._removal_window = removal_window
     self._lock = threading.Lock()
+    self._epoch = random.SystemRandom().getrandbits(self.EPOCH_BITS)
+    self._generation = 0
+    self._horizon = 0  # deltas since generations older than this require a full resync
+    self._last_sample = {}
+    self._changed = {}  # name => generation in which the value last changed
+    self._removed = {}  # name => generation in which the metric disappeared
+    self._ids = {}  # name => (id, generation in which the id was assigned)
+    self._next_id = 0
+    self._update(self._provider.sample())
     SamplerBase.__init__(self, period, clock)
     self.daemon = True
 
+  def _update(self, new_sample):
+    with self._lock:
+      self._generation += 1
+      generation, old_sample = self._generation, self._last_sample
+      for name, value in new_sample.items():
+        if name not in old_sample or old_sample[name] != value:
+          self._changed[name] = generation
+          self._removed.pop(name, None)
+          if name not in self._ids:
+            self._ids[name] = (self._next_id, generation)
+            self._next_id += 1
+      for name in old_sample:
+        if name not in new_sample:
+          self._changed.pop(name, None)
+          self._removed[name] = generation
+      self._last_sample = new_sample
+      self._evict_removed()
+
+  def _evict_removed(self):
+    # Forget the names of metrics removed more than removal_window generations ago.  Consumers
+    # that have not seen such a removal yet can no longer be sent an exact delta, so they get a
+    # full resync instead.
+    oldest = self._generation - self._removal_window
+    for name, generation in list(self._removed.items()):
+      if generation <= oldest:
+        self._horizon = max(self._horizon, generation)
+        self._ids.pop(name, None)
+        del self._removed[name]
+
+  @property
+  def epoch(self):
+    return self._epoch
+
+  @property
+  def generation(self):
+    with self._lock:
+      return self._generation
+
   def sample(self):
     with self._lock:
       return self._last_sample
 
-  def iterate(self):
-    new_sample = self._provider.sample()
+  def delta(self, since=0, epoch=None):
+    """
+      Returns a MetricSampler.Delta describing the changes made after generation `since` of
+      `epoch` (default: this sampler's epoch):
+
+        epoch, generation: The epoch and generation of the current sample.
+        full: True if this is the entire sample rather than a difference, in which case the
+              consumer should discard everything it knows about this sampler, names included.
+        samples: dictionary of metric name => sample of metrics added or changed.
+        removed: list of names of metrics that have disappeared.
+        ids: dictionary of metric name => id for every name in samples and removed.
+        new_ids: dictionary of metric name => id for ids assigned after `since`.
+
+      A full sample is returned if `since` is 0, if `epoch` is not this sampler's epoch, if `since`
+      is ahead of the current generation or if some removal made after `since` has already fallen
+      out of the removal window and been forgotten.
+    """
     with self._lock:
-      self._last_sample = new_sample
+      full = (since <= 0 or since < self._horizon or since > self._generation or
+              (epoch is not None and epoch != self._epoch))
+      if full:
+        samples = dict(self._last_sample)
+        removed = []
+        ids = dict((name, self._ids[name][0]) for name in samples)
+        new_ids = ids
+      else:
+        samples = dict((name, self._last_sample[name])
+                       for (name, generation) in self._changed.items() if generation > since)
+        removed = [name for (name, generation) in self._removed.items() if generation > since]
+        ids = dict((name, self._ids[name][0]) for name in list(samples) + removed)
+        new_ids = dict((name, name_id) for (name, (name_id, generation)) in self._ids.items()
+                       if generation > since and name in ids)
+      return self.Delta(self._epoch, self._generation, full, samples, removed, ids, new_ids)
+
+  def ids(self):
+    """
+      Returns a dictionary of metric name => id of every metric seen by this sampler.
+    """
+    with self._lock:
+      return dict((name, name_id) for (name, (name_id, _)) in self._ids.items())
+
+  def iterate(self):
+    self._update(self._provider.sample())
 
 
 class DiskMetricWriter(SamplerBase):
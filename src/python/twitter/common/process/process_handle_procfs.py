@@ -7,6 +7,9 @@ from .process_handle import ProcessHandleParserBase
 
 class ProcessHandlersProcfs(object):
   BOOT_TIME = None
+  CLK_TCK = None
+  PAGESIZE = None
+
   @staticmethod
   def boot_time(now=None):
     now = now or time.time()
@@ -22,11 +25,15 @@ class ProcessHandlersProcfs(object):
 
   @staticmethod
   def handle_time(_, value):
-    return 1.0 * value / os.sysconf('SC_CLK_TCK')
+    if ProcessHandlersProcfs.CLK_TCK is None:
+      ProcessHandlersProcfs.CLK_TCK = os.sysconf('SC_CLK_TCK')
+    return 1.0 * value / ProcessHandlersProcfs.CLK_TCK
 
   @staticmethod
   def handle_mem(_, value):
-    return value * os.sysconf('SC_PAGESIZE')
+    if ProcessHandlersProcfs.PAGESIZE is None:
+      ProcessHandlersProcfs.PAGESIZE = os.sysconf('SC_PAGESIZE')
+    return value * ProcessHandlersProcfs.PAGESIZE
 
   @staticmethod
   def handle_start_time(key, value):
@@ -34,6 +41,44 @@ class ProcessHandlersProcfs(object):
     return time.time() - (ProcessHandlersProcfs.boot_time() + elapsed_after_system_boot)
 
 
+class ProcStatParser(object):
+  """
+    A split-based parser for /proc/<pid>/stat lines, producing the same attributes as a
+    ProcessHandleParser over the same attrs, type_map and handlers without going through
+    ScanfParser's regular expressions.
+
+    The comm field is delimited by its parentheses rather than by whitespace, so commands with
+    spaces in their names parse correctly.
+  """
+  STRING_TYPES = frozenset(['%s', '%c'])
+
+  @staticmethod
+  def split(line):
+    """Split a stat line into its fields, or return None if it is malformed."""
+    comm_start, comm_end = line.find(' ('), line.rfind(')')
+    if comm_start == -1 or comm_end < comm_start:
+      return None
+    return [line[:comm_start], line[comm_start + 1:comm_end + 1]] + line[comm_end + 1:].split()
+
+  def __init__(self, attrs, type_map, handlers={}):
+    self._fields = [
+      (attr, str if type_map[attr] in self.STRING_TYPES else int, handlers.get(attr))
+      for attr in attrs]
+
+  def parse(self, line):
+    fields = self.split(line)
+    if fields is None or len(fields) < len(self._fields):
+      return {}
+    d = {}
+    try:
+      for (attr, convert, handler), value in zip(self._fields, fields):
+        value = convert(value)
+        d[attr] = handler(attr, value) if handler else value
+    except ValueError:
+      return {}
+    return d
+
+
 class ProcessHandleProcfs(ProcessHandleParserBase):
   ATTRS = (
     """pid comm state ppid pgrp session tty_nr tpgid flags minflt cminflt majflt cmajflt utime
@@ -69,6 +114,23 @@ class ProcessHandleProcfs(ProcessHandleParserBase):
     'rss': ProcessHandlersProcfs.handle_mem
   }
 
+  PARSER = ProcStatParser(ATTRS, TYPE_MAP, HANDLERS)
+
+  @staticmethod
+  def read_stat(pid):
+    """Return the contents of /proc/<pid>/stat, or None if it could not be read."""
+    try:
+      fd = os.open('/proc/%s/stat' % pid, os.O_RDONLY)
+    except OSError:
+      return None
+    try:
+      data = os.read(fd, 4096)
+      return data if isinstance(data, str) else data.decode('utf-8', 'replace')
+    except OSError:
+      return None
+    finally:
+      os.close(fd)
+
   def _produce(self):
     try:
       with open("/proc/%s/stat" % self._pid) as fp:
@@ -25,12 +25,10 @@ class ProcessProvider(Interface):
       self._pid_to_children = defaultdict(set)
       self._handles = {}
     else:
-      for pid, ppid in self._pid_to_parent.items():
-        try:
-          self._pid_to_children[ppid].remove(pid)
-        except KeyError:
-          pass
       for pid in pids:
+        ppid = self._pid_to_parent.pop(pid, None)
+        if ppid is not None:
+          self._pid_to_children[ppid].discard(pid)
         self._raw.pop(pid, None)
         self._handles.pop(pid, None)
       self._pids = self._pids - set(pids)
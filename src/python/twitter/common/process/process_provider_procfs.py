@@ -1,6 +1,6 @@
 import os
 
-from .process_handle_procfs import ProcessHandleProcfs
+from .process_handle_procfs import ProcessHandleProcfs, ProcStatParser
 from .process_provider import ProcessProvider
 
 def filter_map(fn, lst):
@@ -9,35 +9,98 @@ def filter_map(fn, lst):
 class ProcessProvider_Procfs(ProcessProvider):
   """
     ProcessProvider on top of procfs.
+
+    In addition to the ProcessProvider interface, this provides update() to incrementally
+    refresh the process table and collect_tree() to collect a process tree without scanning
+    all of /proc.
   """
-  def _collect_all(self):
+  _CHILDREN_SUPPORTED = None
+
+  @staticmethod
+  def _list_pids():
     def try_int(value):
       try:
         return int(value)
       except ValueError:
         return None
-    return self._collect_set(filter_map(try_int, os.listdir('/proc')))
+    return filter_map(try_int, os.listdir('/proc'))
+
+  def _collect_all(self):
+    return self._collect_set(self._list_pids())
 
   def _collect_set(self, pidset):
-    def try_read_pid(pid):
-      try:
-        with open('/proc/%s/stat' % pid) as fp:
-          return fp.read()
-      except IOError:
-        return None
-    return filter_map(try_read_pid, pidset)
+    return filter_map(ProcessHandleProcfs.read_stat, pidset)
 
   def _translate_line_to_pid_pair(self, line):
-    sline = line.split()
+    fields = ProcStatParser.split(line)
     try:
-      return (int(sline[ProcessHandleProcfs.ATTRS.index('pid')]),
-              int(sline[ProcessHandleProcfs.ATTRS.index('ppid')]))
-    except:
+      return int(fields[0]), int(fields[3])
+    except (TypeError, IndexError, ValueError):
       return None, None
 
   def _translate_line_to_handle(self, line):
     return ProcessHandleProcfs.from_line(line)
 
+  def update(self):
+    """
+      Incrementally refresh the process table from the last collection: collect processes that
+      have appeared since, forget those that have exited and recollect the surviving children
+      of exited processes, since they will have been reparented.
+
+      Unlike collect_all(), the stats of processes that were already known are not reread, so
+      use collect_set() to refresh the processes of interest.  A pid that is reused between
+      two updates is not noticed until it is recollected.
+    """
+    current = set(self._list_pids())
+    exited = self._pids - current
+    orphans = set()
+    for pid in exited:
+      orphans.update(self._pid_to_children.pop(pid, ()))
+    self.clear(exited)
+    self.collect_set((current - self._pids) | (orphans & current))
+
+  @classmethod
+  def _children_supported(cls):
+    if cls._CHILDREN_SUPPORTED is None:
+      pid = os.getpid()
+      cls._CHILDREN_SUPPORTED = os.path.exists('/proc/%d/task/%d/children' % (pid, pid))
+    return cls._CHILDREN_SUPPORTED
+
+  @staticmethod
+  def _read_children(pid):
+    children = set()
+    try:
+      tids = os.listdir('/proc/%s/task' % pid)
+    except OSError:
+      return children
+    for tid in tids:
+      try:
+        with open('/proc/%s/task/%s/children' % (pid, tid)) as fp:
+          children.update(int(child) for child in fp.read().split())
+      except IOError:
+        continue
+    return children
+
+  def collect_tree(self, pid):
+    """
+      Collect data from pid and all of its descendants, replacing the last collection.
+
+      Descendants are found through /proc/<pid>/task/<tid>/children (Linux 3.5+ with
+      CONFIG_PROC_CHILDREN) rather than by reading every process in /proc.  On kernels without
+      it this falls back to collect_all().
+    """
+    if not self._children_supported():
+      self.collect_all()
+      return
+    pids, pending = set(), [pid]
+    while pending:
+      next_pid = pending.pop()
+      if next_pid not in pids:
+        pids.add(next_pid)
+        pending.extend(self._read_children(next_pid))
+    self.clear()
+    self._process_lines(self._collect_set(pids))
+
   @staticmethod
   def _platform_compatible():
     # Compatible with any Linux >=2.5.19, but could be easily adapted
@@ -17,13 +17,29 @@
 __author__ = 'Brian Wickman'
 
 from .recordio import *
+from .block_recordio import (
+  BlockRecordReader,
+  BlockRecordWriter,
+  CompressedCodec,
+)
+from .mapped import MappedRecordReader
 
 __all__ = [
+  'BlockRecordReader',
+  'BlockRecordWriter',
+  'CompressedCodec',
+  'MappedRecordReader',
   'RecordIO',
   'RecordWriter',
   'RecordReader',
 ]
 
+try:
+  from .scanner import RecordScanner
+  __all__ += [ 'RecordScanner' ]
+except ImportError:
+  pass
+
 try:
   from .thrift_recordio import *
   __all__ += [ 'ThriftRecordReader', 'ThriftRecordWriter' ]
@@ -0,0 +1,285 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""Compressed and block-framed RecordIO streams.
+
+CompressedCodec compresses each record individually and works with the plain RecordIO Reader and
+Writer.  For small records, BlockRecordWriter batches many records into a single compressed
+block, stored as one ordinary RecordIO frame:
+
+  header:   magic 'RB', version (uint8), compression (uint8), record count (uint32),
+            uncompressed payload length (uint32), CRC32 of the uncompressed payload (uint32)
+  payload:  the (compressed) concatenation of length-prefixed encoded records
+
+BlockRecordReader reads such files through the usual read/try_read/iteration interface.
+"""
+
+import bz2
+import struct
+import zlib
+
+from twitter.common import log
+
+from .recordio import RecordIO
+
+
+class Compression(object):
+  NONE, ZLIB, BZ2 = 0, 1, 2
+
+  _BY_NAME = {
+    'none': NONE,
+    'zlib': ZLIB,
+    'bz2': BZ2,
+  }
+
+  @classmethod
+  def get(cls, compression):
+    """
+      Return the compression id for a compression name or id.
+    """
+    if compression in cls._BY_NAME:
+      return cls._BY_NAME[compression]
+    if compression in cls._BY_NAME.values():
+      return compression
+    raise RecordIO.InvalidArgument('Unknown compression: %r' % (compression,))
+
+  @classmethod
+  def compress(cls, compression, data, level):
+    if compression == cls.ZLIB:
+      return zlib.compress(data, level)
+    elif compression == cls.BZ2:
+      return bz2.compress(data, level)
+    return data
+
+  @classmethod
+  def decompress(cls, compression, data):
+    try:
+      if compression == cls.ZLIB:
+        return zlib.decompress(data)
+      elif compression == cls.BZ2:
+        return bz2.decompress(data)
+    except (zlib.error, IOError, ValueError) as e:
+      raise BlockRecordIO.CorruptBlock('Failed to decompress: %s' % e)
+    if compression != cls.NONE:
+      raise BlockRecordIO.CorruptBlock('Unknown compression id %d' % compression)
+    return data
+
+
+class CompressedCodec(RecordIO.Codec):
+  """
+    Wrap a RecordIO.Codec so that every record is compressed individually.
+  """
+  def __init__(self, codec, compression='zlib', level=6):
+    if not isinstance(codec, RecordIO.Codec):
+      raise RecordIO.InvalidCodec('Codec must be subclass of RecordIO.Codec')
+    self._codec = codec
+    self._compression = Compression.get(compression)
+    self._level = level
+
+  def encode(self, blob):
+    return Compression.compress(self._compression, self._codec.encode(blob), self._level)
+
+  def decode(self, blob):
+    return self._codec.decode(Compression.decompress(self._compression, blob))
+
+
+class BlockRecordIO(object):
+  class CorruptBlock(RecordIO.Error): pass
+
+  MAGIC = b'RB'
+  VERSION = 1
+  HEADER = struct.Struct('>2sBBLLL')
+  LENGTH = struct.Struct('>L')
+
+  class BlockCodec(RecordIO.Codec):
+    """
+      Codec that encodes a list of records, using an underlying codec for each record, into a
+      single checksummed and compressed block.
+    """
+    def __init__(self, codec, compression='zlib', level=6):
+      if not isinstance(codec, RecordIO.Codec):
+        raise RecordIO.InvalidCodec('Codec must be subclass of RecordIO.Codec')
+      self._codec = codec
+      self._compression = Compression.get(compression)
+      self._level = level
+
+    def encode(self, records):
+      return self.encode_blobs([self._codec.encode(record) for record in records])
+
+    def encode_blobs(self, blobs):
+      """
+        Encode a list of records that have already been encoded by the underlying codec.
+      """
+      length = BlockRecordIO.LENGTH
+      chunks = []
+      for blob in blobs:
+        chunks.append(length.pack(len(blob)))
+        chunks.append(blob)
+      payload = b''.join(chunks)
+      header = BlockRecordIO.HEADER.pack(BlockRecordIO.MAGIC, BlockRecordIO.VERSION,
+          self._compression, len(blobs), len(payload), zlib.crc32(payload) & 0xffffffff)
+      return header + Compression.compress(self._compression, payload, self._level)
+
+    def decode(self, blob):
+      header_size = BlockRecordIO.HEADER.size
+      if len(blob) < header_size:
+        raise BlockRecordIO.CorruptBlock('Block too short for header.')
+      magic, version, compression, count, payload_length, checksum = (
+          BlockRecordIO.HEADER.unpack(blob[:header_size]))
+      if magic != BlockRecordIO.MAGIC or version != BlockRecordIO.VERSION:
+        raise BlockRecordIO.CorruptBlock('Not a version %d block.' % BlockRecordIO.VERSION)
+      payload = Compression.decompress(compression, blob[header_size:])
+      if len(payload) != payload_length or zlib.crc32(payload) & 0xffffffff != checksum:
+        raise BlockRecordIO.CorruptBlock('Block checksum mismatch.')
+      length = BlockRecordIO.LENGTH
+      records, offset = [], 0
+      for _ in range(count):
+        if offset + length.size > payload_length:
+          raise BlockRecordIO.CorruptBlock('Block holds fewer than %d records.' % count)
+        record_length, = length.unpack_from(payload, offset)
+        offset += length.size
+        records.append(self._codec.decode(payload[offset:offset + record_length]))
+        offset += record_length
+      return records
+
+  class _RawCodec(RecordIO.Codec):
+    def encode(self, blob):
+      return blob
+
+    def decode(self, blob):
+      return blob
+
+
+class BlockRecordReader(RecordIO.Reader):
+  """
+    RecordReader for streams written by BlockRecordWriter.  Records are returned one at a time
+    by read(), try_read() and iteration, as with RecordIO.Reader.
+  """
+  def __init__(self, fp, codec):
+    RecordIO.Reader.__init__(self, fp, BlockRecordIO.BlockCodec(codec))
+    self._pending = []
+
+  def __iter__(self):
+    for block in RecordIO.Reader.__iter__(self):
+      for record in block:
+        yield record
+
+  def read(self):
+    """
+      Read a single record from this stream, reading a new block from the underlying file
+      handle if no records from the previous block are pending.
+
+      Returns the record or None if no data available.
+    """
+    while not self._pending:
+      block = RecordIO.Reader.do_read(self._fp, self._codec)
+      if block is None:
+        return None
+      self._pending.extend(reversed(block))
+    return self._pending.pop()
+
+  def try_read(self):
+    """
+      Attempt to read a single record from the stream.  Only updates the file position
+      if a block was read successfully.
+
+      Returns the record or None if no data available.
+    """
+    while not self._pending:
+      pos = self._fp.tell()
+      try:
+        block = RecordIO.Reader.do_read(self._fp, self._codec)
+      except RecordIO.PrematureEndOfStream as e:
+        log.debug('Got premature end of stream [%s], skipping - %s' % (self._fp.name, e))
+        self._fp.seek(pos)
+        return None
+      if block is None:
+        return None
+      self._pending.extend(reversed(block))
+    return self._pending.pop()
+
+
+class BlockRecordWriter(RecordIO.Writer):
+  """
+    RecordWriter that batches records into compressed blocks.
+
+    A block is written once block_size bytes of encoded records are pending, or on flush() and
+    close().  Records still pending in memory are lost if the process dies before then.  Blocks
+    hold at most half of RecordIO.MAXIMUM_RECORD_SIZE bytes of encoded records, which leaves
+    room for the block header and for compression to expand incompressible records, so that
+    every block can be read back as a single RecordIO frame.
+  """
+  DEFAULT_BLOCK_SIZE = 64 * 1024
+
+  @staticmethod
+  def maximum_block_size():
+    return RecordIO.MAXIMUM_RECORD_SIZE // 2
+
+  def __init__(self, fp, codec, compression='zlib', level=6, block_size=DEFAULT_BLOCK_SIZE,
+               sync=False):
+    RecordIO.Writer.__init__(self, fp, BlockRecordIO.BlockCodec(codec, compression, level),
+        sync=sync)
+    if not 0 < block_size <= self.maximum_block_size():
+      raise RecordIO.InvalidArgument('block_size must be positive and at most %d bytes.' % (
+          self.maximum_block_size()))
+    self._record_codec = codec
+    self._block_size = block_size
+    self._blobs = []
+    self._pending_bytes = 0
+
+  def write(self, record):
+    """
+      Append the record to the current block, writing the block out if it is full.  The
+      current block is written out first if the record would not fit in it.
+
+      Returns True on success, False on any filesystem failure.
+
+      May raise:
+        RecordIO.RecordSizeExceeded if the record can't fit in a block on its own.
+    """
+    blob = self._record_codec.encode(record)
+    size = BlockRecordIO.LENGTH.size + len(blob)
+    if size > self.maximum_block_size():
+      raise RecordIO.RecordSizeExceeded('Record of %d bytes exceeds the maximum block size.' %
+          len(blob))
+    if self._pending_bytes + size > self.maximum_block_size() and not self.flush():
+      return False
+    self._blobs.append(blob)
+    self._pending_bytes += size
+    if self._pending_bytes >= self._block_size:
+      return self.flush()
+    return True
+
+  def flush(self):
+    """
+      Write out any pending records as a block.  If that fails, the records remain pending and
+      are retried by the next write out.
+
+      Returns True on success, False on any filesystem failure.
+    """
+    if not self._blobs:
+      return True
+    if not RecordIO.Writer.do_write(self._fp, self._codec.encode_blobs(self._blobs),
+        BlockRecordIO._RawCodec(), sync=self._sync):
+      return False
+    self._blobs, self._pending_bytes = [], 0
+    return True
+
+  def close(self):
+    try:
+      self.flush()
+    finally:
+      RecordIO.Writer.close(self)
@@ -0,0 +1,247 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""Random access to RecordIO files through mmap.
+
+MappedRecordReader maps a RecordIO file into memory and exposes its frames as zero-copy views.
+An index of record offsets may be built once and persisted next to the file (as <filename>.idx)
+so that subsequent readers can seek to record N or binary search by key without scanning.
+"""
+
+from array import array
+import mmap
+import os
+import struct
+import sys
+
+from twitter.common import log
+
+from .recordio import RecordIO
+
+
+# Python 2.x arrays have no 'Q' typecode, but 'L' is 64 bits wide on LP64 platforms.
+_OFFSET_TYPECODE = 'L' if array('L').itemsize == 8 else 'Q'
+
+
+def _offsets_from_bytes(data):
+  offsets = array(_OFFSET_TYPECODE)
+  getattr(offsets, 'frombytes', getattr(offsets, 'fromstring', None))(data)
+  if sys.byteorder == 'little':
+    offsets.byteswap()
+  return offsets
+
+
+def _offsets_to_bytes(offsets):
+  offsets = array(_OFFSET_TYPECODE, offsets)
+  if sys.byteorder == 'little':
+    offsets.byteswap()
+  return getattr(offsets, 'tobytes', getattr(offsets, 'tostring', None))()
+
+
+class MappedRecordReader(object):
+  """
+    Read-only, memory-mapped access to the records of a RecordIO file.
+
+    Records are returned as zero-copy views into the mapping (memoryview under Python 3, buffer
+    under Python 2) unless a codec is supplied, in which case they are decoded.  Views must not
+    be used after the reader is closed.
+
+    A partially written trailing record (e.g. from a writer that is still appending) is ignored.
+  """
+
+  INDEX_SUFFIX = '.idx'
+  INDEX_MAGIC = b'RIDX'
+  INDEX_HEADER = struct.Struct('>4sQQ')  # magic, bytes of the file covered, number of records
+  _HEADER = struct.Struct('>L')
+
+  class InvalidIndex(RecordIO.Error): pass
+
+  def __init__(self, filename, codec=None, persist_index=True):
+    """
+      Map the RecordIO file at filename.
+
+        codec: If supplied, a RecordIO.Codec used to decode records.  Otherwise raw frames are
+               returned.
+        persist_index: If True, load the offset index from <filename>.idx when it is valid, and
+                       save it there whenever it has to be (re)built.
+    """
+    if codec is not None and not isinstance(codec, RecordIO.Codec):
+      raise RecordIO.InvalidCodec('Codec must be subclass of RecordIO.Codec')
+    self._filename = filename
+    self._codec = codec
+    self._persist_index = persist_index
+    self._offsets = None
+    self._indexed_size = 0
+    with open(filename, 'rb') as fp:
+      self._size = os.fstat(fp.fileno()).st_size
+      self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) if self._size else None
+    self._view = self._make_view()
+
+  def _make_view(self):
+    if self._mmap is None:
+      return lambda offset, length: b''
+    try:
+      mapped = memoryview(self._mmap)
+      return lambda offset, length: mapped[offset:offset + length]
+    except TypeError:
+      # Python 2.x mmaps do not expose the new-style buffer interface.
+      return lambda offset, length: buffer(self._mmap, offset, length)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+
+  def close(self):
+    self._view = None
+    if self._mmap is not None:
+      self._mmap.close()
+      self._mmap = None
+
+  @property
+  def index_filename(self):
+    return self._filename + self.INDEX_SUFFIX
+
+  def _frame_at(self, offset):
+    """
+      Return (frame offset, frame length) of the record whose header is at offset, or None if
+      there is no complete record there.
+    """
+    if offset + RecordIO.RECORD_HEADER_SIZE > self._size:
+      return None
+    length, = self._HEADER.unpack_from(self._mmap, offset)
+    if length > RecordIO.MAXIMUM_RECORD_SIZE:
+      raise RecordIO.RecordSizeExceeded('Record at offset %d exceeds maximum allowable size'
+          % offset)
+    start = offset + RecordIO.RECORD_HEADER_SIZE
+    if start + length > self._size:
+      log.debug('%s: ignoring truncated record at offset %d' % (self._filename, offset))
+      return None
+    return start, length
+
+  def _scan(self, offset=0):
+    """
+      Yield (frame offset, frame length) of each record starting at the given header offset.
+    """
+    while True:
+      frame = self._frame_at(offset)
+      if frame is None:
+        break
+      yield frame
+      offset = frame[0] + frame[1]
+
+  def _decode(self, view):
+    if self._codec is None:
+      return view
+    return self._codec.decode(view.tobytes() if hasattr(view, 'tobytes') else str(view))
+
+  def __iter__(self):
+    """
+      Iterate over every record in the file without building an index.
+    """
+    for offset, length in self._scan():
+      yield self._decode(self._view(offset, length))
+
+  # Indexing
+  def _load_index(self):
+    try:
+      with open(self.index_filename, 'rb') as fp:
+        header = fp.read(self.INDEX_HEADER.size)
+        magic, covered, count = self.INDEX_HEADER.unpack(header)
+        if magic != self.INDEX_MAGIC or covered > self._size:
+          raise self.InvalidIndex('Index %s does not match %s' % (
+              self.index_filename, self._filename))
+        offsets = _offsets_from_bytes(fp.read())
+        if len(offsets) != count:
+          raise self.InvalidIndex('Index %s is truncated' % self.index_filename)
+        return offsets, covered
+    except (IOError, OSError, struct.error, self.InvalidIndex) as e:
+      log.debug('Could not load index for %s: %s' % (self._filename, e))
+      return None
+
+  def save_index(self):
+    """
+      Persist the offset index of this file to <filename>.idx, atomically.
+    """
+    offsets = self.offsets()
+    temporary = '%s.%d.tmp' % (self.index_filename, os.getpid())
+    with open(temporary, 'wb') as fp:
+      fp.write(self.INDEX_HEADER.pack(self.INDEX_MAGIC, self._indexed_size, len(offsets)))
+      fp.write(_offsets_to_bytes(offsets))
+    os.rename(temporary, self.index_filename)
+
+  def offsets(self):
+    """
+      Return an array of the header offset of every record, building the index if necessary.
+
+      An index persisted by a previous reader is reused, and extended if the file has been
+      appended to since.  Files are assumed to be append-only: an index is only discarded if the
+      file has shrunk below the size it covers.
+    """
+    if self._offsets is not None:
+      return self._offsets
+    loaded = self._load_index() if self._persist_index else None
+    if loaded is None:
+      offsets, covered = array(_OFFSET_TYPECODE), 0
+    else:
+      offsets, covered = loaded
+    known = len(offsets)
+    for start, length in self._scan(covered):
+      offsets.append(start - RecordIO.RECORD_HEADER_SIZE)
+      covered = start + length
+    self._offsets, self._indexed_size = offsets, covered
+    if self._persist_index and (loaded is None or len(offsets) > known):
+      try:
+        self.save_index()
+      except (IOError, OSError) as e:
+        log.warning('Failed to save index for %s: %s' % (self._filename, e))
+    return offsets
+
+  def __len__(self):
+    return len(self.offsets())
+
+  def __getitem__(self, index):
+    """
+      Return record number index (negative indices count from the end.)
+    """
+    offsets = self.offsets()
+    start, length = self._frame_at(offsets[index])
+    return self._decode(self._view(start, length))
+
+  def seek(self, index):
+    """
+      Iterate over the records starting from record number index.
+    """
+    offsets = self.offsets()
+    if index >= len(offsets):
+      return
+    for start, length in self._scan(offsets[index]):
+      yield self._decode(self._view(start, length))
+
+  def bisect(self, key, key_function):
+    """
+      Binary search a file whose records are sorted by key_function(record), returning the
+      number of the first record whose key is >= key (or len(self) if there is none.)
+    """
+    low, high = 0, len(self)
+    while low < high:
+      mid = (low + high) // 2
+      if key_function(self[mid]) < key:
+        low = mid + 1
+      else:
+        high = mid
+    return low
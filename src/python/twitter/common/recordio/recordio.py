@@ -29,6 +29,7 @@ import errno
 from abc import abstractmethod
 import os
 import struct
+import time
 
 from twitter.common import log
 from twitter.common.lang import Compatibility, Interface
@@ -254,6 +255,89 @@ class RecordIO(object):
       return RecordIO.Writer.do_write(self._fp, blob, self._codec, sync=self._sync)
 
 
+  class BufferedWriter(Writer):
+    DEFAULT_BUFFER_SIZE = 64 * 1024
+
+    def __init__(self, fp, codec, sync=False, buffer_size=DEFAULT_BUFFER_SIZE,
+                 flush_interval=None, clock=time):
+      """
+        Initialize a BufferedWriter from the FileLike fp, with RecordIO.Codec codec.
+
+        Records are framed into an in-memory buffer and written out with a single write() once
+        buffer_size bytes are pending or, if flush_interval (in seconds) is supplied, once a
+        write() finds that flush_interval has elapsed since the last flush.  If sync=True is
+        supplied, each of these group commits is fsynced, rather than every record.
+
+        Use flush() to force pending records to disk at durability points.  Buffered records
+        that have not been flushed are lost if the process dies.  Records that fail to be written
+        out remain buffered, and are retried by the next write out.
+      """
+      RecordIO.Writer.__init__(self, fp, codec, sync=sync)
+      if buffer_size < 0:
+        raise RecordIO.InvalidArgument('buffer_size must be non-negative.')
+      self._buffer_size = buffer_size
+      self._flush_interval = flush_interval
+      self._clock = clock
+      self._buffer = []
+      self._buffered = 0
+      self._last_flush = clock.time()
+
+    @property
+    def pending(self):
+      """
+        The number of bytes buffered but not yet written.
+      """
+      return self._buffered
+
+    def write(self, blob):
+      """
+        Append the blob to the buffer, writing out the buffer if a threshold is reached.
+
+        Returns True on success, False on any filesystem failure.
+      """
+      frame = self._codec.encode(blob)
+      self._buffer.append(struct.pack('>L', len(frame)))
+      self._buffer.append(frame)
+      self._buffered += RecordIO.RECORD_HEADER_SIZE + len(frame)
+      if self._buffered >= self._buffer_size or (self._flush_interval is not None and
+          self._clock.time() - self._last_flush >= self._flush_interval):
+        return self._commit(self._sync)
+      return True
+
+    def _commit(self, sync):
+      self._last_flush = self._clock.time()
+      if self._buffer:
+        data = b''.join(self._buffer)
+        try:
+          self._fp.write(data)
+        except (IOError, OSError) as e:
+          log.debug("Got exception in write(%s): %s" % (self._fp.name, e))
+          # Keep the records, so that the next commit retries them.
+          self._buffer = [data]
+          return False
+        self._buffer, self._buffered = [], 0
+      if sync:
+        self._fp.flush()
+      return True
+
+    def flush(self):
+      """
+        Write out and fsync all buffered records.
+
+        Returns True on success, False on any filesystem failure.
+      """
+      return self._commit(True)
+
+    def close(self):
+      """
+        Write out any buffered records and close the underlying filehandle.
+      """
+      try:
+        self._commit(self._sync)
+      finally:
+        RecordIO.Writer.close(self)
+
+
 class StringCodec(RecordIO.Codec):
   """
     A simple string-based implementation of Codec.
@@ -0,0 +1,131 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""Scan many RecordIO files in parallel.
+
+    >>> from twitter.common.recordio import RecordScanner, StringCodec
+    >>> scanner = RecordScanner(StringCodec(), transform=lambda record: record.upper())
+    >>> for record in scanner.scan(glob.glob('/var/log/checkpoints/*.recordio')):
+    ...   process(record)
+
+Files are decoded (and transformed) in a pool of worker threads, or processes if
+processes=True, in which case the codec and transform must be picklable, e.g. module-level
+functions and ThriftRecordIO.ThriftCodec instances.
+"""
+
+from collections import deque
+import multiprocessing
+
+from twitter.common.concurrent import (
+  FIRST_COMPLETED,
+  ProcessPoolExecutor,
+  ThreadPoolExecutor,
+  wait,
+)
+
+from .recordio import RecordIO
+
+
+def scan_file(filename, codec, transform=None):
+  """
+    Read every record of a RecordIO file, returning the list of decoded records.
+
+    If transform is supplied, it is applied to every record and its result is returned in place
+    of the record, unless it is None, in which case the record is dropped.
+  """
+  with open(filename, 'rb') as fp:
+    reader = RecordIO.Reader(fp, codec)
+    if transform is None:
+      return list(reader)
+    results = []
+    for record in reader:
+      result = transform(record)
+      if result is not None:
+        results.append(result)
+    return results
+
+
+class RecordScanner(object):
+  """
+    Fan out reads of many RecordIO files across a pool of workers.
+  """
+
+  def __init__(self, codec, transform=None, max_workers=None, processes=False, max_pending=None):
+    """
+      codec: The RecordIO.Codec used to decode records.
+      transform: Optional callable run in the workers on each decoded record; records for which
+                 it returns None are dropped, otherwise its result is yielded.
+      max_workers: Number of worker threads or processes (default: number of cpus.)
+      processes: If True, use a process pool rather than a thread pool.
+      max_pending: Maximum number of files read ahead of the consumer (default: 2 * max_workers.)
+    """
+    if not isinstance(codec, RecordIO.Codec):
+      raise RecordIO.InvalidCodec('Codec must be subclass of RecordIO.Codec')
+    if transform is not None and not callable(transform):
+      raise RecordIO.InvalidArgument('transform must be callable, got %s' % type(transform))
+    self._codec = codec
+    self._transform = transform
+    self._max_workers = max_workers or multiprocessing.cpu_count()
+    self._executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    self._max_pending = max_pending or 2 * self._max_workers
+
+  def scan_files(self, filenames, ordered=True):
+    """
+      Yield (filename, records) for each filename, where records is the list of (transformed)
+      records read from the file.
+
+      If ordered is True, files are yielded in the order supplied, otherwise in the order that
+      reads complete.  Errors reading a file are raised when its turn comes.
+    """
+    filenames = iter(filenames)
+    order = deque()  # futures in submission order, if ordered
+    pending = {}  # future => filename
+    executor = self._executor_class(max_workers=self._max_workers)
+
+    def submit():
+      for filename in filenames:
+        future = executor.submit(scan_file, filename, self._codec, self._transform)
+        pending[future] = filename
+        if ordered:
+          order.append(future)
+        if len(pending) >= self._max_pending:
+          break
+
+    try:
+      submit()
+      while pending:
+        if ordered:
+          done = [order.popleft()]
+        else:
+          done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+          yield pending.pop(future), future.result()
+        submit()
+    finally:
+      for future in pending:
+        future.cancel()
+      executor.shutdown(wait=True)
+
+  def scan(self, filenames, ordered=True):
+    """
+      Yield the (transformed) records of every file in filenames.
+
+      Records of a single file are always yielded in file order.  If ordered is True, files are
+      yielded in the order supplied, otherwise in the order that reads complete.
+    """
+    for _, records in self.scan_files(filenames, ordered=ordered):
+      for record in records:
+        yield record
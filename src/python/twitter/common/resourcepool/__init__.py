@@ -16,7 +16,7 @@
 
 __author__ = 'Alec Thomas'
 
-from .resourcepool import ResourcePool
+from .resourcepool import ManagedResource, ManagedResourcePool, Resource, ResourcePool
 
-__all__ = ['ResourcePool']
+__all__ = ['ManagedResource', 'ManagedResourcePool', 'Resource', 'ResourcePool']
 
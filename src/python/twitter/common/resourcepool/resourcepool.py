@@ -17,11 +17,16 @@
 
 """A generic thread-safe resource pool."""
 
+from collections import deque
+import threading
+import time
+
 try:
-  from Queue import Queue
+  from Queue import Empty, Queue
 except ImportError:
-  from queue import Queue
+  from queue import Empty, Queue
 
+from twitter.common.metrics import AtomicGauge, LambdaGauge, Observable
 from twitter.common.quantity import Amount, Time
 
 
@@ -113,3 +118,189 @@ class ResourcePool(object):
         will succeed.
     """
     return self._resources.empty()
+
+
+class ManagedResource(Resource):
+  """Wrapper object around a resource allocated from a ManagedResourcePool.
+
+  Used as a context manager, the resource is discarded rather than returned to the pool if the
+  block raises, as the resource may have been left in an unusable state.
+  """
+
+  __slots__ = ()
+
+  def discard(self):
+    """Close the underlying resource rather than returning it to the pool."""
+    self._pool.discard(self.resource)
+    self._pool = None
+
+  def __exit__(self, exc_type, unused_val, unused_tb):
+    if exc_type is None:
+      self.release()
+    else:
+      self.discard()
+
+  def __repr__(self):
+    return 'ManagedResource(%r)' % self.resource
+
+
+class ManagedResourcePool(ResourcePool, Observable):
+  """A resource pool that creates its resources on demand.
+
+  Up to max_size resources are created by calling factory as they are needed.  Resources that
+  have been idle for more than max_idle seconds are closed, down to min_size resources, and
+  idle resources that fail health_check are closed rather than handed out.  The most recently
+  released resource is handed out first, so that the rest may idle out.
+
+    >>> pool = ManagedResourcePool(lambda: socket.create_connection(('localhost', 9999)),
+    ...                            max_size=4, max_idle=60, close=lambda sock: sock.close())
+    >>> with pool.acquire() as sock:
+    ...   sock.sendall('ping')
+
+  Pool statistics are exported through pool.metrics.
+  """
+
+  DEFAULT_MAX_SIZE = 8
+
+  def __init__(self, factory, min_size=0, max_size=DEFAULT_MAX_SIZE, max_idle=None,
+               health_check=None, close=None, clock=time):
+    """
+    :param factory: Callable that returns a new resource.
+    :param min_size: Number of idle resources that are kept regardless of max_idle.
+    :param max_size: Maximum number of resources, idle or in use.
+    :param max_idle: Seconds (or Amount) after which idle resources are closed, or None to keep
+        them indefinitely.
+    :param health_check: Optional callable that returns False if an idle resource may no longer
+        be used.
+    :param close: Optional callable that closes a resource that is evicted or discarded.
+    """
+    if not 0 <= min_size <= max_size or max_size < 1:
+      raise ValueError('Must have 0 <= min_size <= max_size and max_size >= 1.')
+    if isinstance(max_idle, Amount):
+      max_idle = max_idle.as_(Time.SECONDS)
+    ResourcePool.__init__(self, [])
+    self._factory = factory
+    self._min_size = min_size
+    self._max_size = max_size
+    self._max_idle = max_idle
+    self._health_check = health_check
+    self._close = close
+    self._clock = clock
+    self._condition = threading.Condition()
+    self._idle = deque()  # (resource, time released), most recently released last
+    self._size = 0  # idle, in use or being created
+    self._is_closed = False
+    self._created = self.metrics.register(AtomicGauge('created'))
+    self._closed = self.metrics.register(AtomicGauge('closed'))
+    self._failed_health_checks = self.metrics.register(AtomicGauge('failed_health_checks'))
+    self._timeouts = self.metrics.register(AtomicGauge('timeouts'))
+    self.metrics.register(LambdaGauge('size', lambda: self._size))
+    self.metrics.register(LambdaGauge('idle', lambda: len(self._idle)))
+    self.metrics.register(LambdaGauge('in_use', self.in_use))
+
+  def in_use(self):
+    """The number of resources acquired from this pool or being created."""
+    return self._size - len(self._idle)
+
+  def _close_resource(self, resource):
+    self._closed.increment()
+    if self._close:
+      try:
+        self._close(resource)
+      except Exception:
+        pass
+
+  def _evict(self):
+    """Remove expired idle resources and return them, to be closed outside of the lock."""
+    evicted = []
+    if self._max_idle is None:
+      return evicted
+    expiry = self._clock.time() - self._max_idle
+    while len(self._idle) > self._min_size and self._idle[0][1] < expiry:
+      evicted.append(self._idle.popleft()[0])
+      self._size -= 1
+    return evicted
+
+  def acquire(self, timeout=None):
+    """Acquire a resource, creating one if none are idle and the pool is not full.
+
+    :param timeout: If provided, seconds (or Amount) to wait for a resource before raising
+        Queue.Empty. If not provided, blocks indefinitely.
+
+    :returns: Returns a ManagedResource() wrapper object.
+    :raises Empty: No resources are available before timeout.
+    """
+    if isinstance(timeout, Amount):
+      timeout = timeout.as_(Time.SECONDS)
+    deadline = None if timeout is None else self._clock.time() + timeout
+    while True:
+      resource, create = None, False
+      with self._condition:
+        evicted = self._evict()
+        while not self._idle and self._size >= self._max_size:
+          remaining = None if deadline is None else deadline - self._clock.time()
+          if remaining is not None and remaining <= 0:
+            self._timeouts.increment()
+            raise Empty()
+          self._condition.wait(remaining)
+        if self._idle:
+          resource, _ = self._idle.pop()
+        else:
+          self._size += 1
+          create = True
+      for expired in evicted:
+        self._close_resource(expired)
+      if create:
+        try:
+          resource = self._factory()
+        except Exception:
+          self._forget()
+          raise
+        self._created.increment()
+        return ManagedResource(self, resource)
+      if self._health_check is None or self._health_check(resource):
+        return ManagedResource(self, resource)
+      self._failed_health_checks.increment()
+      self.discard(resource)
+
+  def _forget(self):
+    with self._condition:
+      self._size -= 1
+      self._condition.notify()
+
+  def release(self, resource):
+    """Return a resource to the pool, or close it if the pool has been closed."""
+    with self._condition:
+      if self._is_closed:
+        self._size -= 1
+        evicted = [resource]
+      else:
+        self._idle.append((resource, self._clock.time()))
+        evicted = self._evict()
+      self._condition.notify()
+    for expired in evicted:
+      self._close_resource(expired)
+
+  def discard(self, resource):
+    """Close a resource acquired from the pool, making room for a new one."""
+    self._forget()
+    self._close_resource(resource)
+
+  def empty(self):
+    """Check if acquire() would wait.
+
+    Note: This is a rough guide only. It does not guarantee that acquire()
+        will succeed.
+    """
+    with self._condition:
+      return not self._idle and self._size >= self._max_size
+
+  def close(self):
+    """Close all idle resources.  Resources in use are closed as they are released or discarded."""
+    with self._condition:
+      self._is_closed = True
+      idle, self._idle = self._idle, deque()
+      self._size -= len(idle)
+      self._condition.notify_all()
+    for resource, _ in idle:
+      self._close_resource(resource)
@@ -2,7 +2,9 @@ __author__ = 'Brian Wickman'
 
 from twitter.common.rpc.factories import make_client
 from twitter.common.rpc.address import Address
+from twitter.common.rpc.pool import ClientPool
 __all__ = [
   'make_client',
-  'Address'
+  'Address',
+  'ClientPool',
 ]
@@ -0,0 +1,186 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import random
+import select
+import threading
+import time
+
+from thrift.transport import TTransport
+from twitter.common.metrics import AtomicGauge, LambdaGauge, Observable
+from twitter.common.resourcepool import ManagedResourcePool
+
+from .address import Address
+from .factories import make_client
+
+
+def connection_healthy(client):
+  """
+    Return False if the connection of an idle client has been closed by the server.
+
+    An idle connection should have nothing to read, so a readable socket means that the server
+    has closed it (or sent something unexpected), either way leaving it unusable.
+  """
+  connection = getattr(client, '_connection', None)
+  handle = getattr(connection, 'handle', None)
+  if handle is None:
+    return connection is None or connection.isOpen()
+  try:
+    readable, _, _ = select.select([handle], [], [], 0)
+  except (select.error, ValueError):
+    return False
+  return not readable
+
+
+class ClientPool(Observable):
+  """
+    Pools of thrift clients to a set of equivalent endpoints.
+
+    Each endpoint has its own ManagedResourcePool of connected clients, so that clients are
+    reused across calls rather than connecting for every call.  Calls are balanced across
+    endpoints by picking the less loaded of two endpoints at random, and endpoints that cannot
+    be connected to are skipped for retry_interval seconds in favour of the least loaded of the
+    others.
+
+    Endpoints may be given up front or tracked from a ServerSet:
+
+      pool = ClientPool(UserService, max_size=16, max_idle=60)
+      serverset = ServerSet(zk, '/twitter/service/users/prod', on_join=pool.add,
+                            on_leave=pool.remove)
+
+      with pool.acquire() as client:
+        client.getUser(12345)
+
+    If the body of the with statement raises, the client's connection is closed rather than
+    returned to the pool.  Pool statistics are exported through pool.metrics, with a scope for
+    each endpoint.
+  """
+
+  class NoEndpointsAvailable(Exception): pass
+
+  DEFAULT_RETRY_INTERVAL = 5.0
+
+  def __init__(self, client_iface, endpoints=(), min_size=0,
+               max_size=ManagedResourcePool.DEFAULT_MAX_SIZE, max_idle=None,
+               health_check=connection_healthy, retry_interval=DEFAULT_RETRY_INTERVAL,
+               clock=time, **client_kw):
+    """
+      client_iface: The thrift generated service module, as for make_client.
+      endpoints: Initial endpoints, as Address-parseable values or ServiceInstances.
+      min_size, max_size, max_idle, health_check: As for ManagedResourcePool, per endpoint.
+      retry_interval: Seconds to skip an endpoint for after failing to connect to it.
+      client_kw: Passed to make_client, e.g. protocol, transport or connection.
+    """
+    self._client_iface = client_iface
+    self._pool_kw = dict(min_size=min_size, max_size=max_size, max_idle=max_idle,
+                         health_check=health_check, close=lambda client: client.close(),
+                         clock=clock)
+    self._retry_interval = retry_interval
+    self._clock = clock
+    self._client_kw = client_kw
+    self._lock = threading.Lock()
+    self._pools = {}  # (host, port) => ManagedResourcePool
+    self._failed = {}  # (host, port) => time of last connection failure
+    self._connect_failures = self.metrics.register(AtomicGauge('connect_failures'))
+    self.metrics.register(LambdaGauge('endpoints', lambda: len(self._pools)))
+    for endpoint in endpoints:
+      self.add(endpoint)
+
+  @staticmethod
+  def _key(endpoint):
+    endpoint = getattr(endpoint, 'service_endpoint', endpoint)
+    if not isinstance(endpoint, Address) and hasattr(endpoint, 'host'):
+      endpoint = (endpoint.host, endpoint.port)
+    address = Address.parse(endpoint)
+    return address.host, address.port
+
+  def _factory(self, key):
+    host, port = key
+    return lambda: make_client(self._client_iface, host, port, **self._client_kw)
+
+  def add(self, endpoint):
+    """Add an endpoint (Address-parseable or ServiceInstance) to balance across."""
+    key = self._key(endpoint)
+    with self._lock:
+      if key in self._pools:
+        return
+      pool = self._pools[key] = ManagedResourcePool(self._factory(key), **self._pool_kw)
+    self.metrics.register_observable('%s:%d' % key, pool)
+
+  def remove(self, endpoint):
+    """Stop using an endpoint and close its clients, those in use once they are released."""
+    key = self._key(endpoint)
+    with self._lock:
+      pool = self._pools.pop(key, None)
+      self._failed.pop(key, None)
+    if pool is not None:
+      self.metrics.unregister_observable('%s:%d' % key)
+      pool.close()
+
+  def endpoints(self):
+    with self._lock:
+      return [Address(host, port) for host, port in self._pools]
+
+  def _candidates(self):
+    """Return the pools of endpoints that are not being skipped, in order of preference."""
+    now = self._clock.time()
+    with self._lock:
+      pools = list(self._pools.items())
+      failed = dict(self._failed)
+    healthy = [(key, pool) for key, pool in pools
+               if now - failed.get(key, now - self._retry_interval) >= self._retry_interval]
+    # If every endpoint is failing, try them all anyway.
+    candidates = healthy or pools
+    random.shuffle(candidates)
+    if len(candidates) > 1:
+      first, second = candidates[0], candidates[1]
+      if second[1].in_use() < first[1].in_use():
+        candidates[0], candidates[1] = second, first
+    # Should the chosen endpoint fail, fall back to the least loaded of the rest.
+    return candidates[:1] + sorted(candidates[1:], key=lambda candidate: candidate[1].in_use())
+
+  def acquire(self, timeout=None):
+    """
+      Acquire a connected client, as a ManagedResource, from the endpoint chosen for this call.
+
+      Raises NoEndpointsAvailable if there are no endpoints or none could be connected to, and
+      Queue.Empty if the chosen endpoint has no free client within timeout.
+    """
+    candidates = self._candidates()
+    if not candidates:
+      raise self.NoEndpointsAvailable('No endpoints to connect to.')
+    errors = []
+    for key, pool in candidates:
+      try:
+        resource = pool.acquire(timeout=timeout)
+      except (TTransport.TTransportException, IOError, OSError) as e:
+        self._connect_failures.increment()
+        with self._lock:
+          if key in self._pools:
+            self._failed[key] = self._clock.time()
+        errors.append('%s:%d: %s' % (key[0], key[1], e))
+        continue
+      with self._lock:
+        self._failed.pop(key, None)
+      return resource
+    raise self.NoEndpointsAvailable('Failed to connect to any endpoint: %s' % '; '.join(errors))
+
+  def close(self):
+    """Close the idle clients of every endpoint."""
+    with self._lock:
+      pools = list(self._pools.values())
+    for pool in pools:
+      pool.close()
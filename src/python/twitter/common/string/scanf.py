@@ -1,4 +1,5 @@
 import re
+import struct
 from ctypes import (
   c_int,
   c_long,
@@ -10,6 +11,7 @@ from ctypes import (
   c_double,
   c_char,
   c_char_p,
+  sizeof,
 )
 
 from twitter.common.lang import Compatibility
@@ -73,17 +75,75 @@ class ScanfParser(object):
     c_double: float
   }
 
-  def _preprocess_format_string(self, string):
+  @staticmethod
+  def _integer_converter(ctype):
+    bits = 8 * sizeof(ctype)
+    if ctype(-1).value < 0:
+      low, high = -(1 << (bits - 1)), (1 << (bits - 1)) - 1
+    else:
+      low, high = 0, (1 << bits) - 1
+    def convert(value):
+      value = int(value)
+      # Out of range values wrap around as they would in the ctype.
+      return value if low <= value <= high else ctype(value).value
+    return convert
+
+  _SINGLE_PRECISION = struct.Struct('f')
+
+  @staticmethod
+  def _float_converter(value):
+    value = float(value)
+    try:
+      return ScanfParser._SINGLE_PRECISION.unpack(ScanfParser._SINGLE_PRECISION.pack(value))[0]
+    except OverflowError:
+      return c_float(value).value
+
+  @staticmethod
+  def _string_converter(value):
+    # A c_char_p ends at the first NUL.
+    return value if '\x00' not in value else value[:value.index('\x00')]
+
+  @classmethod
+  def _converter(cls, ctype):
+    """
+      Return a function converting a matched string directly to the Python value that
+      ctype(PRECONVERSIONS[ctype](string)).value would produce.
+    """
+    if ctype in (c_int, c_long, c_longlong, c_uint, c_ulong, c_ulonglong):
+      return cls._integer_converter(ctype)
+    elif ctype is c_float:
+      return cls._float_converter
+    elif ctype is c_double:
+      return float
+    elif ctype is c_char:
+      return str
+    return cls._string_converter
+
+  # format string => (regular expression, applicators)
+  _COMPILED = {}
+
+  @classmethod
+  def _compile(cls, format_string):
+    compiled = cls._COMPILED.get(format_string)
+    if compiled is None:
+      re_pattern, applicators = cls._preprocess_format_string(format_string)
+      compiled = cls._COMPILED[format_string] = (re_pattern, re.compile(re_pattern), applicators)
+    return compiled
+
+  @classmethod
+  def _preprocess_format_string(cls, string):
+    """
+      Translate a format string into a regular expression and a list of (name, converter)
+      applicators, one per group.  name is None for unnamed parameters and converter is None for
+      ignored parameters.
+    """
     def match_conversion(string, k):
       MAX_CONVERSION_LENGTH = 3
       for offset in range(MAX_CONVERSION_LENGTH, 0, -1):
         k_offset = k + offset
-        if string[k:k_offset] in ScanfParser.CONVERSIONS:
-          re, converter = ScanfParser.CONVERSIONS[string[k:k_offset]]
-          if converter in ScanfParser.PRECONVERSIONS:
-            return (re, lambda val: converter(ScanfParser.PRECONVERSIONS[converter](val))), k_offset
-          else:
-            return (re, converter), k_offset
+        if string[k:k_offset] in cls.CONVERSIONS:
+          regex, ctype = cls.CONVERSIONS[string[k:k_offset]]
+          return (regex, cls._converter(ctype)), k_offset
       raise ScanfParser.ParseError('%s is an invalid format specifier' % (
         string[k]))
 
@@ -91,10 +151,8 @@ class ScanfParser(object):
       if string[k] == '%':
         return '%', None, k+1
       if string[k] == '*':
-        def null_apply(scan_object, value):
-          pass
-        (regex, preconversion), k = match_conversion(string, k+1)
-        return '(%s)' % regex, null_apply, k
+        (regex, _), k = match_conversion(string, k+1)
+        return '(%s)' % regex, (None, None), k
       if string[k] == '(':
         offset = string[k+1:].find(')')
         if offset == -1:
@@ -102,14 +160,10 @@ class ScanfParser(object):
         if offset == 0:
           raise ScanfParser.ParseError("Empty label string")
         name = string[k+1:k+1+offset]
-        (regex, preconversion), k = match_conversion(string, k+1+offset+1)
-        def dict_apply(scan_object, value):
-          scan_object._dict[name] = preconversion(value).value
-        return '(%s)' % regex, dict_apply, k
-      (regex, preconversion), k = match_conversion(string, k)
-      def list_apply(scan_object, value):
-        scan_object._list.append(preconversion(value).value)
-      return '(%s)' % regex, list_apply, k
+        (regex, converter), k = match_conversion(string, k+1+offset+1)
+        return '(%s)' % regex, (name, converter), k
+      (regex, converter), k = match_conversion(string, k)
+      return '(%s)' % regex, (None, converter), k
 
     re_str = ""
     k = 0
@@ -125,26 +179,53 @@ class ScanfParser(object):
         k += 1
     return re_str, applicators
 
-  def parse(self, line, allow_extra=False):
-    """
-      Given a line of text, parse it and return a ScanfResult object.
-    """
+  def _match(self, line, allow_extra):
     if not isinstance(line, Compatibility.string):
       raise TypeError("Expected line to be a string, got %s" % type(line))
     sre_match = self._re.match(line)
     if sre_match is None:
       raise ScanfParser.ParseError("Failed to match pattern: %s against %s" % (
         self._re_pattern, line))
-    groups = list(sre_match.groups())
-    if len(groups) != len(self._applicators):
-      raise ScanfParser.ParseError("Did not parse all groups! Missing %d" % (
-        len(self._applicators) - len(groups)))
     if sre_match.end() != len(line) and not allow_extra:
       raise ScanfParser.ParseError("Extra junk on the line! '%s'" % (
         line[sre_match.end():]))
+    return sre_match.groups()
+
+  def parse(self, line, allow_extra=False):
+    """
+      Given a line of text, parse it and return a ScanfResult object.
+    """
+    groups = self._match(line, allow_extra)
+    if len(groups) != len(self._applicators):
+      raise ScanfParser.ParseError("Did not parse all groups! Missing %d" % (
+        len(self._applicators) - len(groups)))
+    so = ScanfResult()
+    for (name, converter), group in zip(self._applicators, groups):
+      if converter is None:
+        continue
+      if name is None:
+        so._list.append(converter(group))
+      else:
+        so._dict[name] = converter(group)
+    return so
+
+  def parse_many(self, lines, allow_extra=False):
+    """
+      Given an iterable of lines of text, parse them all and return a ScanfResult object whose
+      values are columns: lists holding the value of each parameter for every line, in order.
+
+      Raises ParseError if any line fails to parse.
+    """
+    rows = [self._match(line, allow_extra) for line in lines]
+    columns = zip(*rows) if rows else [()] * len(self._applicators)
     so = ScanfResult()
-    for applicator, group in zip(self._applicators, groups):
-      applicator(so, group)
+    for (name, converter), column in zip(self._applicators, columns):
+      if converter is None:
+        continue
+      if name is None:
+        so._list.append(list(map(converter, column)))
+      else:
+        so._dict[name] = list(map(converter, column))
     return so
 
   def __init__(self, format_string):
@@ -159,5 +240,4 @@ class ScanfParser(object):
     """
     if not isinstance(format_string, Compatibility.string):
       raise TypeError('format_string should be a string, instead got %s' % type(format_string))
-    self._re_pattern, self._applicators = self._preprocess_format_string(format_string)
-    self._re = re.compile(self._re_pattern)
+    self._re_pattern, self._re, self._applicators = self._compile(format_string)
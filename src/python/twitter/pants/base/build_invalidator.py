@@ -18,14 +18,18 @@ import errno
 import hashlib
 import itertools
 import os
+import threading
+import time
 
 from abc import abstractmethod
 from collections import namedtuple
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
 
-from twitter.common.dirutil import safe_mkdir
+from twitter.common.dirutil import safe_mkdir, safe_open
 from twitter.common.lang import Compatibility, Interface
 
-from twitter.pants.base.hash_utils import hash_all
+from twitter.pants.base.hash_utils import hash_all, hash_file
 from twitter.pants.base.target import Target
 
 
@@ -84,7 +88,113 @@ TRANSITIVE_SOURCES = DefaultSourceScope(recursive=True, include_buildfile=False)
 # Bump this to invalidate all existing keys in artifact caches across all pants deployments in the world.
 # Do this if you've made a change that invalidates existing artifacts, e.g.,  fixed a bug that
 # caused bad artifacts to be cached.
-GLOBAL_CACHE_KEY_GEN_VERSION = '6'
+GLOBAL_CACHE_KEY_GEN_VERSION = '7'
+
+
+class FingerprintStore(object):
+  """A persistent map from source files to the SHA1 digests of their contents.
+
+  A file's digest is remembered along with its size, mtime and inode, and the file is only
+  re-read once any of those change.  Files modified within RACY_INTERVAL seconds of being hashed
+  could change again without their mtime changing, so their digests are not remembered.
+
+  Digests are kept in memory until save() writes them to path.
+  """
+
+  FORMAT_VERSION = '1'
+  RACY_INTERVAL = 2
+
+  _STORES = {}
+  _STORES_LOCK = threading.Lock()
+
+  @classmethod
+  def shared(cls, path):
+    """Returns the FingerprintStore for path, shared by all its users in this process."""
+    path = os.path.realpath(path)
+    with cls._STORES_LOCK:
+      store = cls._STORES.get(path)
+      if store is None:
+        store = cls._STORES[path] = cls(path)
+      return store
+
+  def __init__(self, path, clock=time):
+    self._path = path
+    self._clock = clock
+    self._lock = threading.Lock()
+    self._fingerprints = None  # Absolute path -> (size, mtime_ns, inode, hex digest).
+    self._dirty = False
+
+  @staticmethod
+  def _stat_key(st):
+    mtime_ns = getattr(st, 'st_mtime_ns', None)
+    if mtime_ns is None:
+      mtime_ns = int(st.st_mtime * 1000000000)
+    return st.st_size, mtime_ns, st.st_ino
+
+  def _load(self):
+    fingerprints = {}
+    try:
+      with open(self._path, 'r') as fd:
+        if fd.readline().strip() == self.FORMAT_VERSION:
+          for line in fd:
+            fields = line.rstrip('\n').split(' ', 4)
+            if len(fields) == 5:
+              digest, size, mtime_ns, inode, path = fields
+              fingerprints[path] = (int(size), int(mtime_ns), int(inode), digest)
+    except (IOError, ValueError):
+      # A missing or corrupt store just means rehashing.
+      fingerprints = {}
+    return fingerprints
+
+  def _get_fingerprints(self):
+    with self._lock:
+      if self._fingerprints is None:
+        self._fingerprints = self._load()
+      return self._fingerprints
+
+  def digest(self, path):
+    """Returns the hex SHA1 digest of the contents of the file at path."""
+    path = os.path.abspath(path)
+    fingerprints = self._get_fingerprints()
+    key = self._stat_key(os.stat(path))
+    entry = fingerprints.get(path)
+    if entry is not None and entry[:3] == key:
+      return entry[3]
+    now = self._clock.time()
+    digest = hash_file(path)
+    with self._lock:
+      if key[1] < (now - self.RACY_INTERVAL) * 1000000000:
+        fingerprints[path] = key + (digest,)
+        self._dirty = True
+      elif fingerprints.pop(path, None) is not None:
+        self._dirty = True
+    return digest
+
+  def save(self):
+    """Writes the remembered digests to disk, if any have changed since they were loaded."""
+    with self._lock:
+      if not self._dirty:
+        return
+      tmp_path = '%s.%d.tmp' % (self._path, os.getpid())
+      with safe_open(tmp_path, 'w') as fd:
+        fd.write(self.FORMAT_VERSION + '\n')
+        for path, (size, mtime_ns, inode, digest) in self._fingerprints.items():
+          if '\n' not in path:
+            fd.write('%s %d %d %d %s\n' % (digest, size, mtime_ns, inode, path))
+      os.rename(tmp_path, self._path)
+      self._dirty = False
+
+  def clear(self):
+    """Forgets all remembered digests, in memory and on disk."""
+    with self._lock:
+      self._fingerprints = {}
+      self._dirty = False
+      try:
+        os.unlink(self._path)
+      except OSError as e:
+        if e.errno != errno.ENOENT:
+          raise
+
 
 class CacheKeyGenerator(object):
   """Generates cache keys for versions of target sets."""
@@ -110,11 +220,14 @@ class CacheKeyGenerator(object):
         sorted(list(itertools.chain(*[cache_key.sources for cache_key in cache_keys])))
       return CacheKey(combined_id, combined_hash, combined_num_sources, combined_sources)
 
-  def __init__(self, cache_key_gen_version=None):
+  def __init__(self, cache_key_gen_version=None, fingerprint_store=None):
     """cache_key_gen_version - If provided, added to all cache keys. Allows you to invalidate all cache
                                keys in a single pants repo, by changing this value in config.
+    fingerprint_store - If provided, a FingerprintStore used to avoid rehashing unchanged files.
     """
     self._cache_key_gen_version = (cache_key_gen_version or '') + '_' + GLOBAL_CACHE_KEY_GEN_VERSION
+    self._fingerprint_store = fingerprint_store
+    self._precomputed_digests = {}
 
   def key_for_target(self, target, sources=TARGET_SOURCES, fingerprint_extra=None):
     """Get a key representing the given target and its sources.
@@ -164,16 +277,53 @@ class CacheKeyGenerator(object):
       else:
         yield os.path.basename(path), path
 
+  def file_digests(self, paths, num_workers=1):
+    """Returns a map from each file under the given paths to the hex SHA1 digest of its content.
+
+    :paths: The paths to hash, walked as for key_for().
+    :num_workers: The number of threads to hash files on. Reading and hashing large buffers
+                  release the GIL, so files are hashed concurrently.
+    """
+    filenames = sorted(set(filename for _, filename in self._walk_paths(paths)))
+    if num_workers <= 1 or len(filenames) <= 1:
+      return dict((filename, self._file_digest(filename)) for filename in filenames)
+    pool = ThreadPool(processes=min(num_workers, len(filenames)))
+    try:
+      # An explicit timeout, as otherwise python ignores SIGINT while waiting for the result.
+      digests = pool.map_async(self._file_digest, filenames).get(timeout=1000000000)
+    finally:
+      pool.terminate()
+    return dict(zip(filenames, digests))
+
+  @contextmanager
+  def precomputed_digests(self, paths, num_workers):
+    """Hashes the files under the given paths up front, on num_workers threads.
+
+    Keys generated within the context use these digests rather than hashing those files again.
+    """
+    self._precomputed_digests = self.file_digests(paths, num_workers)
+    try:
+      yield
+    finally:
+      self._precomputed_digests = {}
+
+  def _file_digest(self, filename):
+    digest = self._precomputed_digests.get(filename)
+    if digest is not None:
+      return digest
+    if self._fingerprint_store:
+      return self._fingerprint_store.digest(filename)
+    return hash_file(filename)
+
   def _sources_hash(self, sha, paths):
-    """Update a SHA1 digest with the content of all files under the given paths.
+    """Update a SHA1 digest with the names and content digests of all files under the given paths.
 
     :returns: The files found under the given paths.
     """
     files = []
     for relative_filename, filename in self._walk_paths(paths):
-      with open(filename, "rb") as fd:
-        sha.update(Compatibility.to_bytes(relative_filename))
-        sha.update(fd.read())
+      sha.update(Compatibility.to_bytes(relative_filename))
+      sha.update(Compatibility.to_bytes(self._file_digest(filename)))
       files.append(filename)
     return files
 
@@ -243,3 +393,113 @@ class BuildInvalidator(object):
       if e.errno != errno.ENOENT:
         raise
       return None  # File doesn't exist.
+
+
+class SingleFileBuildInvalidator(BuildInvalidator):
+  """A BuildInvalidator that keeps the hashes of all target sets in a single file.
+
+  The file is a log of (id, hash) updates, read once into memory and then appended to with each
+  change, rather than a file per target set.  A blank hash records an invalidation.  When the
+  log holds mostly superseded entries it is compacted, by atomically replacing it with one entry
+  per target set, as it is loaded.
+
+  Use shared() so that all users of a root in this process share the one copy in memory.
+  """
+
+  LOG_NAME = 'hashes.log'
+  COMPACTION_MIN_ENTRIES = 1000
+
+  _INVALIDATORS = {}
+  _INVALIDATORS_LOCK = threading.Lock()
+
+  @classmethod
+  def shared(cls, root):
+    """Returns the SingleFileBuildInvalidator for root, shared by all its users in this process."""
+    root = os.path.realpath(root)
+    with cls._INVALIDATORS_LOCK:
+      invalidator = cls._INVALIDATORS.get(root)
+      if invalidator is None:
+        invalidator = cls._INVALIDATORS[root] = cls(root)
+      return invalidator
+
+  def __init__(self, root):
+    super(SingleFileBuildInvalidator, self).__init__(root)
+    self._log_path = os.path.join(self._root, self.LOG_NAME)
+    self._lock = threading.Lock()
+    self._hashes = None  # id -> hash, loaded on first use.
+    self._log = None
+
+  def force_invalidate_all(self):
+    with self._lock:
+      self._close_log()
+      super(SingleFileBuildInvalidator, self).force_invalidate_all()
+      self._hashes = {}
+
+  def force_invalidate(self, cache_key):
+    with self._lock:
+      if self._get_hashes().pop(cache_key.id, None) is not None:
+        self._append(cache_key.id, '')
+
+  def _write_sha(self, cache_key):
+    with self._lock:
+      hashes = self._get_hashes()
+      if hashes.get(cache_key.id) != cache_key.hash:
+        hashes[cache_key.id] = cache_key.hash
+        self._append(cache_key.id, cache_key.hash)
+
+  def _read_sha_by_id(self, id):
+    with self._lock:
+      return self._get_hashes().get(id)
+
+  def _get_hashes(self):
+    if self._hashes is None:
+      self._hashes, entries = self._load()
+      if entries > max(self.COMPACTION_MIN_ENTRIES, 2 * len(self._hashes)):
+        self._compact()
+    return self._hashes
+
+  def _load(self):
+    """Returns the current hashes recorded in the log and the number of entries in the log."""
+    hashes, entries, size = {}, 0, 0
+    try:
+      with open(self._log_path, 'rb') as fd:
+        for line in fd:
+          if not line.endswith('\n'):
+            # An interrupted append. Drop it, so that the next append starts on a fresh line
+            # rather than completing the partial entry with its own.
+            with open(self._log_path, 'r+b') as log:
+              log.truncate(size)
+            break
+          size += len(line)
+          id, _, hash = line[:-1].partition('\t')
+          entries += 1
+          if hash:
+            hashes[id] = hash
+          else:
+            hashes.pop(id, None)
+    except IOError as e:
+      if e.errno != errno.ENOENT:
+        raise
+    return hashes, entries
+
+  def _compact(self):
+    self._close_log()
+    tmp_path = '%s.%d.tmp' % (self._log_path, os.getpid())
+    with open(tmp_path, 'wb') as fd:
+      for id, hash in self._hashes.items():
+        fd.write('%s\t%s\n' % (id, hash))
+    os.rename(tmp_path, self._log_path)
+
+  def _append(self, id, hash):
+    if '\t' in id or '\n' in id:
+      raise ValueError('Cannot record the hash of target set with id %r.' % id)
+    if self._log is None:
+      self._log = open(self._log_path, 'ab')
+    # A single write of a whole entry, so that concurrent appends do not interleave.
+    self._log.write('%s\t%s\n' % (id, hash))
+    self._log.flush()
+
+  def _close_log(self):
+    if self._log is not None:
+      self._log.close()
+      self._log = None
@@ -177,17 +177,19 @@ class Config(object):
     if not self._has_option(section, option):
       return default
     raw_value = self._get_value(section, option)
-    if issubclass(type, str):
+    if not isinstance(type, tuple) and issubclass(type, str):
       return raw_value
 
+    type_name = (' or '.join(t.__name__ for t in type) if isinstance(type, tuple)
+                 else type.__name__)
     try:
       parsed_value = eval(raw_value, {}, {})
     except SyntaxError as e:
       raise Config.ConfigError('No valid %s for %s.%s: %s\n%s' % (
-        type.__name__, section, option, raw_value, e))
+        type_name, section, option, raw_value, e))
 
     if not isinstance(parsed_value, type):
       raise Config.ConfigError('No valid %s for %s.%s: %s' % (
-        type.__name__, section, option, raw_value))
+        type_name, section, option, raw_value))
 
     return parsed_value
@@ -2,6 +2,7 @@ import os
 import urlparse
 from twitter.pants.cache.pinger import Pinger
 from twitter.pants.cache.combined_artifact_cache import CombinedArtifactCache
+from twitter.pants.cache.content_addressed_artifact_cache import ContentAddressedArtifactCache
 from twitter.pants.cache.local_artifact_cache import LocalArtifactCache
 from twitter.pants.cache.restful_artifact_cache import RESTfulArtifactCache
 
@@ -22,7 +23,8 @@ def select_best_url(spec, pinger, log):
   return best_url
 
 
-def create_artifact_cache(log, artifact_root, spec, task_name, action='using'):
+def create_artifact_cache(log, artifact_root, spec, task_name, action='using',
+                          content_addressed=False, max_size=None):
   """Returns an artifact cache for the specified spec.
 
   spec can be:
@@ -30,6 +32,10 @@ def create_artifact_cache(log, artifact_root, spec, task_name, action='using'):
     - a URL of a RESTful cache root.
     - a bar-separated list of URLs, where we'll pick the one with the best ping times.
     - A list of the above, for a combined cache.
+
+  If content_addressed is True, file-based caches store each distinct file once, rather than
+  storing a tarball per artifact, and max_size, if set, bounds the bytes of files kept by each of
+  them when it is pruned.
   """
   if not spec:
     raise ValueError('Empty artifact cache spec')
@@ -37,6 +43,8 @@ def create_artifact_cache(log, artifact_root, spec, task_name, action='using'):
     if spec.startswith('/') or spec.startswith('~'):
       path = os.path.join(spec, task_name)
       log.info('%s %s local artifact cache at %s' % (task_name, action, path))
+      if content_addressed:
+        return ContentAddressedArtifactCache(log, artifact_root, path, max_size=max_size)
       return LocalArtifactCache(log, artifact_root, path)
     elif spec.startswith('http://') or spec.startswith('https://'):
       # Caches are supposed to be close, and we don't want to waste time pinging on no-op builds.
@@ -53,5 +61,6 @@ def create_artifact_cache(log, artifact_root, spec, task_name, action='using'):
     else:
       raise ValueError('Invalid artifact cache spec: %s' % spec)
   elif isinstance(spec, (list, tuple)):
-    caches = filter(None, [ create_artifact_cache(log, artifact_root, x, task_name, action) for x in spec ])
+    caches = filter(None, [ create_artifact_cache(log, artifact_root, x, task_name, action,
+                                                  content_addressed, max_size) for x in spec ])
     return CombinedArtifactCache(caches) if caches else None
@@ -82,30 +82,47 @@ class TarballArtifact(Artifact):
         self._relpaths.add(relpath)
 
   def extract(self):
+    self._extract(self._tarfile, 'r')
+
+  def extract_from(self, fileobj):
+    """Extract the tarball as it is read from fileobj, which need not be seekable.
+
+    Unlike extract(), this can fail part way through, leaving some of the files extracted.
+    """
+    self._extract(fileobj, 'r|*')
+
+  def _extract(self, path_or_file, mode):
     try:
-      with open_tar(self._tarfile, 'r', errorlevel=2) as tarin:
-        # Note: We create all needed paths proactively, even though extractall() can do this for us.
+      with open_tar(path_or_file, mode, errorlevel=2) as tarin:
+        # Note: We create all needed paths proactively, even though extract() can do this for us.
         # This is because we may be called concurrently on multiple artifacts that share directories,
-        # and there will be a race condition inside extractall(): task T1 A) sees that a directory
+        # and there will be a race condition inside extract(): task T1 A) sees that a directory
         # doesn't exist and B) tries to create it. But in the gap between A) and B) task T2 creates
         # the same directory, so T1 throws "File exists" in B).
         # This actually happened, and was very hard to debug.
         # Creating the paths here up front allows us to squelch that "File exists" error.
+        # Members are handled as they are read, so that the tarball may be streamed.
         paths = []
-        dirs = set()
-        for tarinfo in tarin.getmembers():
+        dirs = []
+        for tarinfo in tarin:
           paths.append(tarinfo.name)
-          if tarinfo.isdir():
-            dirs.add(tarinfo.name)
-          else:
-            dirs.add(os.path.dirname(tarinfo.name))
-        for d in dirs:
+          directory = tarinfo.name if tarinfo.isdir() else os.path.dirname(tarinfo.name)
           try:
-            os.makedirs(os.path.join(self._artifact_root, d))
+            os.makedirs(os.path.join(self._artifact_root, directory))
           except OSError as e:
             if e.errno != errno.EEXIST:
               raise
-        tarin.extractall(self._artifact_root)
+          if tarinfo.isdir():
+            dirs.append(tarinfo)
+          else:
+            tarin.extract(tarinfo, self._artifact_root)
+        # As extractall() does, set directory attributes last, as extracting into a directory
+        # changes its mtime and it may not be writable.
+        for tarinfo in sorted(dirs, key=lambda tarinfo: tarinfo.name, reverse=True):
+          dirpath = os.path.join(self._artifact_root, tarinfo.name)
+          tarin.chown(tarinfo, dirpath)
+          tarin.utime(tarinfo, dirpath)
+          tarin.chmod(tarinfo, dirpath)
         self._relpaths.update(paths)
     except tarfile.ReadError as e:
       raise ArtifactError(e.message)
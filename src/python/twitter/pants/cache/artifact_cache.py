@@ -56,6 +56,15 @@ class ArtifactCache(object):
   def has(self, cache_key):
     pass
 
+  def has_many(self, cache_keys):
+    """Returns a list of whether there are artifacts cached for each of the given keys, in order.
+
+    Subclasses may override to check many keys more efficiently than one at a time.
+
+    cache_keys: A list of CacheKey objects.
+    """
+    return [self.has(cache_key) for cache_key in cache_keys]
+
   def use_cached_files(self, cache_key):
     """Use the files cached for the given key.
 
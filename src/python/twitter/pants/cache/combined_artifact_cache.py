@@ -27,6 +27,16 @@ class CombinedArtifactCache(ArtifactCache):
   def has(self, cache_key):
     return any(cache.has(cache_key) for cache in self._artifact_caches)
 
+  def has_many(self, cache_keys):
+    found = [False] * len(cache_keys)
+    for cache in self._artifact_caches:  # Only ask each cache about the keys not yet found.
+      missing = [i for i, was_found in enumerate(found) if not was_found]
+      if not missing:
+        break
+      for i, was_found in zip(missing, cache.has_many([cache_keys[i] for i in missing])):
+        found[i] = was_found
+    return found
+
   def use_cached_files(self, cache_key):
     to_backfill = []
     for cache in self._artifact_caches:
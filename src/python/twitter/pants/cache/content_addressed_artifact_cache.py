@@ -0,0 +1,300 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import errno
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import stat
+import time
+import uuid
+
+from twitter.common.dirutil import safe_delete, safe_mkdir, safe_mkdir_for
+from twitter.pants.cache.artifact import Artifact, ArtifactError
+from twitter.pants.cache.artifact_cache import ArtifactCache
+
+
+class BlobStore(object):
+  """Stores file contents under their SHA1 digests, each distinct content once.
+
+  Blobs are made read-only, so that a file hard-linked to a blob can't be modified in place.
+  """
+
+  HARDLINK = 'hardlink'
+  REFLINK = 'reflink'
+  COPY = 'copy'
+
+  # The Linux ioctl that makes a copy-on-write clone of a file, on filesystems that support it.
+  FICLONE = 0x40049409
+
+  READ_SIZE = 64 * 1024
+
+  def __init__(self, root):
+    self._root = root
+
+  def path(self, digest):
+    return os.path.join(self._root, digest[:2], digest)
+
+  def blobs(self):
+    """Yields (name, path) for every file in the store: blobs, named by their digests, and the
+    temporary files of puts in progress.
+    """
+    for dir_name, _, filenames in os.walk(self._root):
+      for filename in filenames:
+        yield filename, os.path.join(dir_name, filename)
+
+  def put(self, path):
+    """Stores the contents of the file at path, if not already stored, and returns their digest."""
+    safe_mkdir(self._root)
+    tmp_path = os.path.join(self._root, '%s.tmp' % uuid.uuid4())
+    sha = hashlib.sha1()
+    try:
+      # Hash while copying, so that the file is read once.
+      with open(path, 'rb') as infile:
+        with open(tmp_path, 'wb') as outfile:
+          data = infile.read(self.READ_SIZE)
+          while data:
+            sha.update(data)
+            outfile.write(data)
+            data = infile.read(self.READ_SIZE)
+      digest = sha.hexdigest()
+      blob = self.path(digest)
+      if os.path.exists(blob):
+        # Mark the blob as recently used, so that prune won't collect it before it is referenced.
+        # This is best-effort: in a cache shared by several users we may not own the blob.
+        try:
+          os.utime(blob, None)
+        except OSError:
+          pass
+      else:
+        os.chmod(tmp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        safe_mkdir_for(blob)
+        os.rename(tmp_path, blob)
+      return digest
+    finally:
+      safe_delete(tmp_path)
+
+  def place(self, digest, dst, mode, link_mode):
+    """Makes dst a file with the contents of the given blob.
+
+    With HARDLINK, dst is a link to the blob, and so is read-only. Otherwise dst is a reflink
+    (where supported) or a copy of the blob, with the given mode.
+    """
+    blob = self.path(digest)
+    safe_mkdir_for(dst)
+    # Replace rather than write through any existing file, which may itself be linked to a blob.
+    safe_delete(dst)
+    if link_mode == self.HARDLINK:
+      try:
+        os.link(blob, dst)
+        return
+      except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EMLINK, errno.EPERM):
+          raise
+    if not (link_mode == self.REFLINK and self._reflink(blob, dst)):
+      shutil.copyfile(blob, dst)
+    os.chmod(dst, mode)
+
+  @classmethod
+  def _reflink(cls, src, dst):
+    with open(src, 'rb') as infile:
+      with open(dst, 'wb') as outfile:
+        try:
+          fcntl.ioctl(outfile.fileno(), cls.FICLONE, infile.fileno())
+          return True
+        except (IOError, OSError):
+          return False
+
+
+class ManifestArtifact(Artifact):
+  """An artifact stored as a manifest of the files under artifact_root and their blobs."""
+
+  def __init__(self, artifact_root, blob_store, manifest, link_mode=BlobStore.REFLINK):
+    Artifact.__init__(self, artifact_root)
+    self._blob_store = blob_store
+    self._manifest = manifest
+    self._link_mode = link_mode
+
+  def _files(self, paths):
+    for path in paths or ():
+      if os.path.isdir(path):
+        # As with TarballArtifact, symlinks are followed.
+        for dir_name, _, filenames in os.walk(path, followlinks=True):
+          for filename in filenames:
+            yield os.path.join(dir_name, filename)
+      else:
+        yield path
+
+  def collect(self, paths):
+    files = []
+    for path in self._files(paths):
+      relpath = os.path.relpath(path, self._artifact_root)
+      mode = stat.S_IMODE(os.stat(path).st_mode)
+      files.append([relpath, self._blob_store.put(path), mode])
+    for path in paths or ():
+      self._relpaths.add(os.path.relpath(path, self._artifact_root))
+    # Write to a temporary name and move it atomically, so that the manifest is never incomplete.
+    safe_mkdir_for(self._manifest)
+    manifest_tmp = '%s.%s.tmp' % (self._manifest, uuid.uuid4())
+    with open(manifest_tmp, 'w') as outfile:
+      json.dump({'files': files}, outfile)
+    os.rename(manifest_tmp, self._manifest)
+
+  @staticmethod
+  def read_manifest(manifest):
+    """Returns the (relpath, digest, mode) entries of the files in a manifest."""
+    try:
+      with open(manifest, 'r') as infile:
+        return json.load(infile)['files']
+    except (IOError, ValueError, KeyError, TypeError) as e:
+      raise ArtifactError('Failed to read manifest %s: %s' % (manifest, e))
+
+  def extract(self):
+    for relpath, digest, mode in self.read_manifest(self._manifest):
+      dst = os.path.join(self._artifact_root, relpath)
+      try:
+        self._blob_store.place(digest, dst, mode, self._link_mode)
+      except (IOError, OSError) as e:
+        raise ArtifactError('Failed to extract %s: %s' % (relpath, e))
+      self._relpaths.add(relpath)
+
+
+class ContentAddressedArtifactCache(ArtifactCache):
+  """An artifact cache that stores each distinct file content once, in local files.
+
+  Files are stored in a blob store under cache_root, keyed by their SHA1 digest, and each cache
+  key has a small manifest of the files in its artifact.  Identical files produced for many keys
+  are therefore stored once, uncompressed, and extracting an artifact links or copies its files
+  from the blob store rather than unpacking a tarball.
+
+  link_mode selects how files are extracted:
+    - BlobStore.REFLINK (the default) makes copy-on-write clones where the filesystem supports
+      them, and copies otherwise.
+    - BlobStore.HARDLINK hard-links extracted files to their blobs. This is the cheapest, but the
+      extracted files are read-only, and must be replaced rather than modified.
+    - BlobStore.COPY always copies.
+  """
+
+  # How long prune() keeps files that may belong to an insert in progress.
+  INSERT_GRACE_SECS = 3600
+
+  def __init__(self, log, artifact_root, cache_root, link_mode=BlobStore.REFLINK, max_size=None,
+               clock=time):
+    """
+    cache_root: The blobs and manifests are stored under this directory.
+    max_size: If set, prune() removes the least recently used artifacts until the blobs of the
+              remaining artifacts occupy at most this many bytes.
+    """
+    ArtifactCache.__init__(self, log, artifact_root)
+    self._cache_root = os.path.expanduser(cache_root)
+    self._blob_store = BlobStore(os.path.join(self._cache_root, 'blobs'))
+    self._manifest_root = os.path.join(self._cache_root, 'manifests')
+    self._link_mode = link_mode
+    self._max_size = max_size
+    self._clock = clock
+    safe_mkdir(self._cache_root)
+
+  def _artifact(self, cache_key):
+    return ManifestArtifact(self.artifact_root, self._blob_store, self._manifest_for_key(cache_key),
+                            self._link_mode)
+
+  def try_insert(self, cache_key, paths):
+    self._artifact(cache_key).collect(paths)
+
+  def has(self, cache_key):
+    return os.path.isfile(self._manifest_for_key(cache_key))
+
+  def use_cached_files(self, cache_key):
+    try:
+      manifest = self._manifest_for_key(cache_key)
+      if os.path.exists(manifest):
+        artifact = self._artifact(cache_key)
+        artifact.extract()
+        # The manifest's mtime records when it was last used, for prune(). In a cache shared by
+        # several users we may not own the manifest, in which case its use just isn't recorded.
+        try:
+          os.utime(manifest, None)
+        except OSError:
+          pass
+        return artifact
+      else:
+        return None
+    except Exception as e:
+      self.log.warn('Error while reading from local artifact cache: %s' % e)
+      return None
+
+  def delete(self, cache_key):
+    safe_delete(self._manifest_for_key(cache_key))
+
+  def prune(self, age_hours):
+    """Removes artifacts unused for age_hours, and then the least recently used artifacts until
+    the cache is no larger than max_size, along with the blobs no longer referenced.
+    """
+    now = self._clock.time()
+    manifests = []  # (last used time, path, digests)
+    for dir_name, _, filenames in os.walk(self._manifest_root):
+      for filename in filenames:
+        path = os.path.join(dir_name, filename)
+        try:
+          last_used = os.path.getmtime(path)
+          if filename.endswith('.tmp'):
+            if now - last_used > self.INSERT_GRACE_SECS:
+              safe_delete(path)  # Left by an insert that failed.
+          elif now - last_used > age_hours * 3600:
+            safe_delete(path)
+          else:
+            digests = set(digest for _, digest, _ in ManifestArtifact.read_manifest(path))
+            manifests.append((last_used, path, digests))
+        except ArtifactError:
+          safe_delete(path)  # Unreadable, so of no use.
+        except OSError as e:
+          if e.errno != errno.ENOENT:  # Concurrently deleted.
+            raise
+
+    references = {}
+    for _, _, digests in manifests:
+      for digest in digests:
+        references[digest] = references.get(digest, 0) + 1
+    sizes = {}
+    for digest, path in self._blob_store.blobs():
+      try:
+        st = os.stat(path)
+      except OSError:
+        continue
+      if digest in references:
+        sizes[digest] = st.st_size
+      # Blobs not yet referenced may belong to an insert in progress, so are kept for a while.
+      elif now - st.st_mtime > self.INSERT_GRACE_SECS:
+        safe_delete(path)
+
+    if self._max_size is not None:
+      total_size = sum(sizes.values())
+      for _, path, digests in sorted(manifests):
+        if total_size <= self._max_size:
+          break
+        safe_delete(path)
+        for digest in digests:
+          references[digest] -= 1
+          if not references[digest] and digest in sizes:
+            safe_delete(self._blob_store.path(digest))
+            total_size -= sizes.pop(digest)
+
+  def _manifest_for_key(self, cache_key):
+    # Note: it's important to use the id as well as the hash, because two different targets
+    # may have the same hash if both have no sources, but we may still want to differentiate them.
+    return os.path.join(self._manifest_root, cache_key.id, cache_key.hash) + '.json'
@@ -1,5 +1,7 @@
+import errno
 import os
 import shutil
+import time
 import uuid
 
 from twitter.common.dirutil import safe_mkdir, safe_mkdir_for, safe_delete
@@ -55,6 +57,12 @@ class LocalArtifactCache(ArtifactCache):
       if os.path.exists(tarfile):
         artifact = TarballArtifact(self.artifact_root, tarfile, self._compress)
         artifact.extract()
+        # The tarball's mtime records when it was last used, for prune(). In a cache shared by
+        # several users we may not own the tarball, in which case its use just isn't recorded.
+        try:
+          os.utime(tarfile, None)
+        except OSError:
+          pass
         return artifact
       else:
         return None
@@ -66,7 +74,17 @@ class LocalArtifactCache(ArtifactCache):
     safe_delete(self._cache_file_for_key(cache_key))
 
   def prune(self, age_hours):
-    pass
+    """Removes artifacts unused for age_hours."""
+    cutoff = time.time() - age_hours * 3600
+    for dir_name, _, filenames in os.walk(self._cache_root):
+      for filename in filenames:
+        path = os.path.join(dir_name, filename)
+        try:
+          if os.path.getmtime(path) < cutoff:
+            os.unlink(path)
+        except OSError as e:
+          if e.errno != errno.ENOENT:  # Concurrently deleted.
+            raise
 
   def _cache_file_for_key(self, cache_key):
     # Note: it's important to use the id as well as the hash, because two different targets
@@ -40,6 +40,12 @@ class ReadWriteArtifactCache(ArtifactCache):
     else:
       return False
 
+  def has_many(self, cache_keys):
+    if self._read_artifact_cache:
+      return self._read_artifact_cache.has_many(cache_keys)
+    else:
+      return [False] * len(cache_keys)
+
   def use_cached_files(self, cache_key):
     if self._read_artifact_cache:
       return self._read_artifact_cache.use_cached_files(cache_key)
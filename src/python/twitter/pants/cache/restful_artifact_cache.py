@@ -1,16 +1,26 @@
 import httplib
+import socket
+import threading
 import urlparse
-from twitter.common.contextutil import temporary_file_path, temporary_file
+from multiprocessing.pool import ThreadPool
+from twitter.common.contextutil import temporary_file_path
 from twitter.common.quantity import Amount, Data
 from twitter.pants.cache.artifact import TarballArtifact
 from twitter.pants.cache.artifact_cache import ArtifactCache
 
 
 class RESTfulArtifactCache(ArtifactCache):
-  """An artifact cache that stores the artifacts on a RESTful service."""
+  """An artifact cache that stores the artifacts on a RESTful service.
+
+  Each thread keeps its connection to the service open between requests, so that many requests
+  cost one TCP (and SSL) handshake rather than one each.
+  """
 
   READ_SIZE = int(Amount(4, Data.MB).as_(Data.BYTES))
 
+  # The number of concurrent requests, each on its own connection, made by has_many().
+  MAX_CONCURRENT_REQUESTS = 8
+
   def __init__(self, log, artifact_root, url_base, compress=True):
     """
     url_base: The prefix for urls on some RESTful service. We must be able to PUT and GET to any
@@ -29,6 +39,7 @@ class RESTfulArtifactCache(ArtifactCache):
     self._netloc = parsed_url.netloc
     self._path_prefix = parsed_url.path.rstrip('/')
     self.compress = compress
+    self._local = threading.local()  # Holds each thread's connection.
 
   def try_insert(self, cache_key, paths):
     with temporary_file_path() as tarfile:
@@ -43,8 +54,30 @@ class RESTfulArtifactCache(ArtifactCache):
   def has(self, cache_key):
     return self._request('HEAD', self._remote_path_for_key(cache_key)) is not None
 
+  def has_many(self, cache_keys):
+    if len(cache_keys) <= 1:
+      return [self.has(cache_key) for cache_key in cache_keys]
+    # Probe concurrently, each thread making its requests over a single kept-alive connection.
+    connections = set()
+    def has(cache_key):
+      try:
+        return self.has(cache_key)
+      finally:
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+          connections.add(connection)
+    pool = ThreadPool(processes=min(self.MAX_CONCURRENT_REQUESTS, len(cache_keys)))
+    try:
+      # An explicit timeout, as otherwise python ignores SIGINT while waiting for the result.
+      return pool.map_async(has, cache_keys).get(timeout=1000000000)
+    finally:
+      pool.terminate()
+      # The pool's threads are gone, so close their connections.
+      for connection in connections:
+        connection.close()
+
   def use_cached_files(self, cache_key):
-    # This implementation fetches the appropriate tarball and extracts it.
+    # This implementation fetches the appropriate tarball and extracts it as it is read.
     remote_path = self._remote_path_for_key(cache_key)
     try:
       # Send an HTTP request for the tarball.
@@ -52,24 +85,18 @@ class RESTfulArtifactCache(ArtifactCache):
       if response is None:
         return None
 
-      done = False
-      with temporary_file() as outfile:
-        total_bytes = 0
-        # Read the data in a loop.
-        while not done:
-          data = response.read(self.READ_SIZE)
-          outfile.write(data)
-          if len(data) < self.READ_SIZE:
-            done = True
-          total_bytes += len(data)
-        outfile.close()
-        self.log.debug('Read %d bytes from artifact cache at %s' %
-                       (total_bytes,self._url_string(remote_path)))
-
-        # Extract the tarfile.
-        artifact = TarballArtifact(self.artifact_root, outfile.name, self.compress)
-        artifact.extract()
-        return artifact
+      try:
+        artifact = TarballArtifact(self.artifact_root, None, self.compress)
+        artifact.extract_from(response)
+        # Read anything after the end of the archive, so that the connection may be reused.
+        while response.read(self.READ_SIZE):
+          pass
+      except Exception:
+        # The rest of the response is unread, so the connection can't be reused.
+        self._close_connection()
+        raise
+      self.log.debug('Read artifact from artifact cache at %s' % self._url_string(remote_path))
+      return artifact
     except Exception as e:
       self.log.warn('Error while reading from remote artifact cache: %s' % e)
       return None
@@ -95,14 +122,42 @@ class RESTfulArtifactCache(ArtifactCache):
     else:
       return httplib.HTTPConnection(self._netloc, timeout=self._timeout_secs)
 
+  def _connection(self):
+    connection = getattr(self._local, 'connection', None)
+    if connection is None:
+      connection = self._local.connection = self._connect()
+    return connection
+
+  def _close_connection(self):
+    connection = getattr(self._local, 'connection', None)
+    if connection is not None:
+      self._local.connection = None
+      connection.close()
+
   # Returns a response if we get a 200, None if we get a 404 and raises an exception otherwise.
+  # The body of a successful GET must be read to its end by the caller before the next request.
   def _request(self, method, path, body=None):
     self.log.debug('Sending %s request to %s' % (method, self._url_string(path)))
-    # TODO(benjy): Keep connection open and reuse?
-    conn = self._connect()
-    conn.request(method, path, body=body)
-    response = conn.getresponse()
+    while True:
+      connection = self._connection()
+      # Whether we are reusing a connection, which the server may since have closed.
+      reused = connection.sock is not None
+      try:
+        connection.request(method, path, body=body)
+        response = connection.getresponse()
+        break
+      except (httplib.HTTPException, socket.error):
+        self._close_connection()
+        if not reused:
+          raise
+        # Retry once, on a new connection.
+        if body is not None:
+          body.seek(0)
     # Allow all 2XX responses. E.g., nginx returns 201 on PUT. HEAD may return 204.
+    if int(response.status / 100) == 2 and method == 'GET':
+      return response
+    # Read the rest of the response, so that the connection may be reused.
+    response.read()
     if int(response.status / 100) == 2:
       return response
     elif response.status == 404:
@@ -173,13 +173,19 @@ class CacheManager(object):
   Note that this is distinct from the ArtifactCache concept, and should probably be renamed.
   """
   def __init__(self, cache_key_generator, build_invalidator_dir,
-               invalidate_dependents, extra_data, only_externaldeps):
+               invalidate_dependents, extra_data, only_externaldeps, hash_workers=1,
+               invalidator_factory=BuildInvalidator):
+    """hash_workers - The number of threads to hash the targets' source files on, up front, when
+                    checking targets.
+    invalidator_factory - Creates the BuildInvalidator for build_invalidator_dir.
+    """
     self._cache_key_generator = cache_key_generator
+    self._hash_workers = hash_workers
     self._invalidate_dependents = invalidate_dependents
     self._extra_data = pickle.dumps(extra_data)  # extra_data may be None.
     self._sources = NO_SOURCES if only_externaldeps else TARGET_SOURCES
 
-    self._invalidator = BuildInvalidator(build_invalidator_dir)
+    self._invalidator = invalidator_factory(build_invalidator_dir)
 
   def update(self, vts):
     """Mark a changed or invalidated VersionedTargetSet as successfully processed."""
@@ -204,7 +210,17 @@ class CacheManager(object):
     'cover' the input targets, possibly partitioning them, and are in topological order.
     The caller can inspect these in order and, e.g., rebuild the invalid ones.
     """
-    all_vts = self._sort_and_validate_targets(targets)
+    if self._hash_workers > 1:
+      # Only the hashing of files is done concurrently: keys are still computed in dependency
+      # order, from these digests, as a target's key may depend on the keys of its dependencies.
+      targets = list(targets)
+      sources = [path for target in targets
+                 if isinstance(target, Target) and self._sources.valid(target)
+                 for path in self._sources.select(target)]
+      with self._cache_key_generator.precomputed_digests(sources, self._hash_workers):
+        all_vts = self._sort_and_validate_targets(targets)
+    else:
+      all_vts = self._sort_and_validate_targets(targets)
     invalid_vts = filter(lambda vt: not vt.valid, all_vts)
     return InvalidationCheck(all_vts, invalid_vts, partition_size_hint)
 
@@ -17,6 +17,7 @@
 from collections import defaultdict
 
 import itertools
+import multiprocessing
 import os
 import shutil
 import sys
@@ -26,7 +27,11 @@ from contextlib import contextmanager
 
 from twitter.common.collections.orderedset import OrderedSet
 
-from twitter.pants.base.build_invalidator import BuildInvalidator, CacheKeyGenerator
+from twitter.pants.base.build_invalidator import (
+    BuildInvalidator,
+    CacheKeyGenerator,
+    FingerprintStore,
+    SingleFileBuildInvalidator)
 from twitter.pants.base.config import Config
 from twitter.pants.base.hash_utils import hash_file
 from twitter.pants.base.worker_pool import Work
@@ -60,18 +65,29 @@ class Task(object):
     self.context = context
     self.dry_run = self.can_dry_run() and context.options.dry_run
     self._pants_workdir = self.context.config.getdefault('pants_workdir')
+
+    default_invalidator_root = os.path.join(self.context.config.getdefault('pants_workdir'),
+                                            'build_invalidator')
+    invalidator_root = context.config.get('tasks', 'build_invalidator',
+                                          default=default_invalidator_root)
+    self._build_invalidator_dir = os.path.join(invalidator_root, self.product_type())
+    if context.config.getbool('tasks', 'build_invalidator_single_file', default=False):
+      self._invalidator_factory = SingleFileBuildInvalidator.shared
+    else:
+      self._invalidator_factory = BuildInvalidator
+
+    # Shared by all tasks, so that each source file is hashed at most once per change.
+    self._fingerprint_store = FingerprintStore.shared(
+        os.path.join(invalidator_root, 'fingerprints.%s' % FingerprintStore.FORMAT_VERSION))
     self._cache_key_generator = CacheKeyGenerator(
-        context.config.getdefault('cache_key_gen_version', default=None))
+        context.config.getdefault('cache_key_gen_version', default=None),
+        fingerprint_store=self._fingerprint_store)
+    self._hash_workers = context.config.getint('tasks', 'hash_workers',
+                                               default=multiprocessing.cpu_count())
     self._read_artifact_cache_spec = None
     self._write_artifact_cache_spec = None
     self._artifact_cache = None
     self._artifact_cache_setup_lock = threading.Lock()
-
-    default_invalidator_root = os.path.join(self.context.config.getdefault('pants_workdir'),
-                                            'build_invalidator')
-    self._build_invalidator_dir = os.path.join(
-        context.config.get('tasks', 'build_invalidator', default=default_invalidator_root),
-        self.product_type())
     self._jvm_tool_bootstrapper = JvmToolBootstrapper(self.context.products)
 
   def register_jvm_tool(self, key, target_addrs):
@@ -108,7 +124,12 @@ class Task(object):
     if len(spec) > 0:
       pants_workdir = self.context.config.getdefault('pants_workdir')
       my_name = self.__class__.__name__
-      return create_artifact_cache(self.context.log, pants_workdir, spec, my_name, action)
+      content_addressed = self.context.config.getdefault('content_addressed_artifact_caches',
+                                                         type=bool, default=False)
+      max_size = self.context.config.getdefault('local_artifact_cache_max_size', type=int,
+                                                default=None)
+      return create_artifact_cache(self.context.log, pants_workdir, spec, my_name, action,
+                                   content_addressed=content_addressed, max_size=max_size)
     else:
       return None
 
@@ -119,8 +140,30 @@ class Task(object):
         self._artifact_cache = ReadWriteArtifactCache(
             self._create_artifact_cache(self._read_artifact_cache_spec, 'will read from'),
             self._create_artifact_cache(self._write_artifact_cache_spec, 'will write to'))
+        self._prune_artifact_cache()
       return self._artifact_cache
 
+  def _prune_artifact_cache(self):
+    """Prunes the local caches this task writes to, if configured to.
+
+    This happens once per task per run, when the task first uses its artifact cache, so the caches
+    grow by at most one run's artifacts beyond the configured bounds:
+      - local_artifact_cache_max_age_hours: artifacts unused for this long are removed.
+      - local_artifact_cache_max_size: content-addressed caches are then trimmed to this many bytes,
+        least recently used artifacts first.
+    """
+    if not self.artifact_cache_writes_enabled():
+      return
+    max_age_hours = self.context.config.getdefault('local_artifact_cache_max_age_hours',
+                                                   type=(int, float), default=None)
+    max_size = self.context.config.getdefault('local_artifact_cache_max_size', type=int,
+                                              default=None)
+    if max_age_hours is None and max_size is None:
+      return
+    max_age_hours = float(max_age_hours) if max_age_hours is not None else float('inf')
+    self.context.log.debug('Pruning artifact cache for %s' % self.__class__.__name__)
+    self._artifact_cache.prune(max_age_hours)
+
   def artifact_cache_reads_enabled(self):
     return bool(self._read_artifact_cache_spec) and self.context.options.read_from_artifact_cache
 
@@ -173,7 +216,7 @@ class Task(object):
 
   def invalidate(self):
     """Invalidates all targets for this task."""
-    BuildInvalidator(self._build_invalidator_dir).force_invalidate_all()
+    self._invalidator_factory(self._build_invalidator_dir).force_invalidate_all()
 
   @contextmanager
   def invalidated(self, targets, only_buildfiles=False, invalidate_dependents=False,
@@ -205,9 +248,12 @@ class Task(object):
                                  self._build_invalidator_dir,
                                  invalidate_dependents,
                                  extra_data,
-                                 only_externaldeps=only_buildfiles)
+                                 only_externaldeps=only_buildfiles,
+                                 hash_workers=self._hash_workers,
+                                 invalidator_factory=self._invalidator_factory)
 
     invalidation_check = cache_manager.check(targets, partition_size_hint)
+    self._fingerprint_store.save()
 
     if invalidation_check.invalid_vts and self.artifact_cache_reads_enabled():
       with self.context.new_workunit('cache'):
@@ -0,0 +1,245 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""Conversion between python thrift structs and JSON, compiled from thrift_spec.
+
+The first conversion of a thrift class compiles a function for it from its thrift_spec, and
+every later conversion of that class reuses it.  The encoding is the same as ThriftJSONEncoder's
+and the decoding the same as ThriftJSONDecoder's.
+
+    >>> codec = ThriftJSONCodec(TestStruct)
+    >>> struct = codec.decode(codec.encode(TestStruct(field1=1)))
+
+Many structs may be streamed as newline-delimited JSON, one struct per line:
+
+    >>> with open('structs.json', 'w') as fp:
+    ...   codec.dump_stream(structs, fp)
+    >>> with open('structs.json') as fp:
+    ...   for struct in codec.load_stream(fp):
+    ...     process(struct)
+"""
+
+import json
+import threading
+
+from thrift.Thrift import TType
+
+try:
+  _string, _long = unicode, long
+except NameError:
+  _string, _long = str, int
+
+
+_ENCODERS = {}  # thrift class => function of a struct returning a JSON-serializable dict
+_DECODERS = {}  # thrift class => function of a decoded JSON dict returning a struct
+
+# Codecs are compiled under a lock, re-entrant since compiling a struct's codec compiles those of
+# the structs it contains.  A codec is registered in the _COMPILING map before its fields are
+# compiled, so that recursive structs find it, and is only published to _ENCODERS or _DECODERS,
+# where other threads look without the lock, once the outermost compilation is complete.
+_COMPILE_LOCK = threading.RLock()
+_COMPILING_ENCODERS = {}
+_COMPILING_DECODERS = {}
+
+
+def _identity(value):
+  return value
+
+
+def _compile(codecs, compiling, thrift_class, build):
+  """
+    Return the codec for thrift_class from codecs, or compile it with build(), which returns the
+    codec and a function that compiles its fields.
+  """
+  codec = codecs.get(thrift_class)
+  if codec is not None:
+    return codec
+  with _COMPILE_LOCK:
+    codec = codecs.get(thrift_class) or compiling.get(thrift_class)
+    if codec is not None:
+      return codec
+    outermost = not compiling
+    try:
+      codec, compile_fields = build()
+      compiling[thrift_class] = codec
+      compile_fields()
+      if outermost:
+        codecs.update(compiling)
+    finally:
+      if outermost:
+        compiling.clear()
+    return codec
+
+
+def _value_encoder(ttype, ttype_info):
+  """Return a function that makes a value JSON-serializable, or None if it already is."""
+  if ttype == TType.STRUCT:
+    return compile_encoder(ttype_info[0])
+  elif ttype in (TType.LIST, TType.SET):
+    element_encoder = _value_encoder(ttype_info[0], ttype_info[1])
+    if ttype == TType.SET:
+      # Sets are emitted as lists, sorted by element.
+      if element_encoder is None:
+        return sorted
+      return lambda value: [element_encoder(element) for element in sorted(value)]
+    if element_encoder is None:
+      return None
+    return lambda value: [element_encoder(element) for element in value]
+  elif ttype == TType.MAP:
+    key_encoder = _value_encoder(ttype_info[0], ttype_info[1]) or _identity
+    value_encoder = _value_encoder(ttype_info[2], ttype_info[3])
+    if value_encoder is None and key_encoder is _identity:
+      return None
+    value_encoder = value_encoder or _identity
+    return lambda value: dict((key_encoder(k), value_encoder(v)) for k, v in value.items())
+  return None
+
+
+def compile_encoder(thrift_class):
+  """
+    Return a function converting a struct of thrift_class to a JSON-serializable dict, in which
+    fields that are unset or equal to their defaults are omitted.
+  """
+  def build():
+    fields = []
+
+    def encode(struct):
+      attributes = struct.__dict__
+      result = {}
+      for name, default, value_encoder in fields:
+        if name in attributes:
+          value = attributes[name]
+          if value != default:
+            result[name] = (value if value is None or value_encoder is None
+                            else value_encoder(value))
+      return result
+
+    def compile_fields():
+      for field in thrift_class.thrift_spec:
+        if field is not None:
+          _, ttype, name, ttype_info, default = field
+          fields.append((name, default, _value_encoder(ttype, ttype_info)))
+
+    return encode, compile_fields
+
+  return _compile(_ENCODERS, _COMPILING_ENCODERS, thrift_class, build)
+
+
+def _bool(value):
+  return not not value
+
+
+_PRIMITIVE_DECODERS = {
+  TType.STRING: _string,
+  TType.DOUBLE: float,
+  TType.I64: _long,
+  TType.I32: int,
+  TType.I16: int,
+  TType.BYTE: int,
+  TType.BOOL: _bool,
+}
+
+
+def _value_decoder(ttype, ttype_info):
+  """Return a function that converts a decoded JSON value to a thrift value of ttype."""
+  if ttype in _PRIMITIVE_DECODERS:
+    return _PRIMITIVE_DECODERS[ttype]
+  elif ttype == TType.STRUCT:
+    return compile_decoder(ttype_info[0])
+  elif ttype == TType.LIST:
+    element_decoder = _value_decoder(ttype_info[0], ttype_info[1])
+    return lambda value: [element_decoder(element) for element in value]
+  elif ttype == TType.SET:
+    element_decoder = _value_decoder(ttype_info[0], ttype_info[1])
+    return lambda value: set(element_decoder(element) for element in value)
+  elif ttype == TType.MAP:
+    key_decoder = _value_decoder(ttype_info[0], ttype_info[1])
+    value_decoder = _value_decoder(ttype_info[2], ttype_info[3])
+    return lambda value: dict((key_decoder(k), value_decoder(v)) for k, v in value.items())
+
+  # As with ThriftJSONDecoder, only fail if a field of an unsupported type is actually present.
+  def unsupported(value):
+    raise ValueError('Unrecognized thrift field type: %d' % ttype)
+  return unsupported
+
+
+def compile_decoder(thrift_class):
+  """
+    Return a function converting a decoded JSON dict to a struct of thrift_class.  Fields absent
+    from the dict are left at their defaults and unknown keys are ignored.
+  """
+  def build():
+    fields = {}
+
+    def decode(value):
+      struct = thrift_class()
+      for name, field_value in value.items():
+        value_decoder = fields.get(name)
+        if value_decoder is not None:
+          setattr(struct, name, value_decoder(field_value))
+      return struct
+
+    def compile_fields():
+      for field in thrift_class.thrift_spec:
+        if field is not None:
+          _, ttype, name, ttype_info, _ = field
+          fields[name] = _value_decoder(ttype, ttype_info)
+
+    return decode, compile_fields
+
+  return _compile(_DECODERS, _COMPILING_DECODERS, thrift_class, build)
+
+
+class ThriftJSONCodec(object):
+  """
+    Encode and decode structs of a thrift class to and from JSON.
+  """
+
+  def __init__(self, thrift_class, sort_keys=False):
+    self._thrift_class = thrift_class
+    self._encode = compile_encoder(thrift_class)
+    self._decode = compile_decoder(thrift_class)
+    self._json_encoder = json.JSONEncoder(sort_keys=sort_keys, separators=(',', ':'))
+    self._json_decoder = json.JSONDecoder()
+
+  def to_dict(self, struct):
+    """Return struct as a JSON-serializable dict."""
+    return self._encode(struct)
+
+  def from_dict(self, value):
+    """Return the struct represented by a decoded JSON dict."""
+    return self._decode(value)
+
+  def encode(self, struct):
+    """Return struct as a compact JSON string."""
+    return self._json_encoder.encode(self._encode(struct))
+
+  def decode(self, json_str):
+    return self._decode(self._json_decoder.decode(json_str))
+
+  def dump_stream(self, structs, fp):
+    """Write structs to fp as newline-delimited JSON."""
+    encode, json_encode, write = self._encode, self._json_encoder.encode, fp.write
+    for struct in structs:
+      write(json_encode(encode(struct)))
+      write('\n')
+
+  def load_stream(self, fp):
+    """Yield the structs of newline-delimited JSON read from fp, skipping blank lines."""
+    decode, json_decode = self._decode, self._json_decoder.decode
+    for line in fp:
+      if line.strip():
+        yield decode(json_decode(line))
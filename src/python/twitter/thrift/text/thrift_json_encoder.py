@@ -16,6 +16,8 @@
 
 import json
 
+from .thrift_json_codec import compile_encoder
+
 class ThriftJSONEncoder(json.JSONEncoder):
   """An encoder that makes python thrift structs JSON serializable via the
   standard python json module.
@@ -44,16 +46,8 @@ class ThriftJSONEncoder(json.JSONEncoder):
     if not hasattr(o, ThriftJSONEncoder.THRIFT_SPEC):
       return super(ThriftJSONEncoder, self).default(o)
 
-    # Handle thrift structs.
-    spec = getattr(o, ThriftJSONEncoder.THRIFT_SPEC)
-    ret = {}
-    for (field_number, type, name, type_info, default) in \
-          [field_spec for field_spec in spec if field_spec is not None]:
-      if name in o.__dict__:
-        val = o.__dict__[name]
-        if val != default:
-          ret[name] = val
-    return ret
+    # Handle thrift structs, with an encoder compiled once per class from its thrift_spec.
+    return compile_encoder(type(o))(o)
 
 def thrift_to_json(o):
   """A utility shortcut function to return a pretty-printed JSON thrift object.
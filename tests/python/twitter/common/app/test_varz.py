@@ -0,0 +1,139 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import json
+import wsgiref.util
+
+from twitter.common.app.modules.varz import VarsEndpoint
+from twitter.common.http import HttpServer
+from twitter.common.metrics import Label, RootMetrics
+from twitter.common.metrics import compact
+from twitter.common.quantity import Amount, Time
+
+import pytest
+
+
+@pytest.fixture
+def metrics(request):
+  RootMetrics().clear()
+  request.addfinalizer(RootMetrics().clear)
+  return RootMetrics()
+
+
+class VarsServer(object):
+  def __init__(self):
+    self.endpoint = VarsEndpoint(period=Amount(1, Time.DAYS))
+    # Samples are taken explicitly by the tests rather than by the sampler thread.
+    self.endpoint._monitor.stop()
+    self.server = HttpServer()
+    self.server.mount_routes(self.endpoint)
+
+  def sample(self):
+    self.endpoint._monitor.iterate()
+
+  def get(self, path, query=''):
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query}
+    wsgiref.util.setup_testing_defaults(environ)
+    statuses = []
+    body = b''.join(self.server.app(environ, lambda status, headers: statuses.append(status)))
+    assert statuses[0].startswith('200')
+    return body
+
+  def get_json(self, query=''):
+    return json.loads(self.get('/vars.json', query).decode('utf-8'))
+
+
+def test_vars_json_delta(metrics):
+  counter = metrics.register('counter')
+  metrics.register(Label('label', 'value'))
+  server = VarsServer()
+
+  assert server.get_json() == {'counter': None, 'label': 'value'}
+  full = server.get_json('since=0')
+  assert full['full'] is True
+  assert full['samples'] == {'counter': None, 'label': 'value'}
+
+  counter.write(5)
+  metrics.unregister('label')
+  server.sample()
+  delta = server.get_json('since=%d&epoch=%d' % (full['generation'], full['epoch']))
+  assert delta['full'] is False
+  assert delta['epoch'] == full['epoch']
+  assert delta['generation'] == full['generation'] + 1
+  assert delta['samples'] == {'counter': 5}
+  assert delta['removed'] == ['label']
+
+  server.sample()
+  unchanged = server.get_json('since=%d&epoch=%d' % (delta['generation'], delta['epoch']))
+  assert (unchanged['full'], unchanged['samples'], unchanged['removed']) == (False, {}, [])
+
+
+def test_vars_json_resync_after_restart(metrics):
+  counter = metrics.register('counter')
+  server = VarsServer()
+  for value in range(5):
+    counter.write(value)
+    server.sample()
+  before = server.get_json('since=0')
+
+  # A restarted process starts counting generations again, in a new epoch.
+  restarted = VarsServer()
+  for since in (before['generation'], 1):
+    after = restarted.get_json('since=%d&epoch=%d' % (since, before['epoch']))
+    assert after['epoch'] != before['epoch']
+    assert after['full'] is True
+    assert after['samples'] == {'counter': 4}
+
+  # Generations from the future are not trusted either.
+  after = restarted.get_json('since=%d' % (before['generation'] + 1))
+  assert after['full'] is True
+
+
+def test_vars_bin_resync_after_restart(metrics):
+  metrics.register(Label('first', 'a'))
+  server = VarsServer()
+  names = {}
+  payload = compact.decode(server.get('/vars.bin'), names)
+  assert payload.full
+  assert payload.samples == {'first': 'a'}
+
+  # After a restart the same ids are assigned to different names, so the stale name table must be
+  # replaced rather than extended.
+  metrics.clear()
+  metrics.register(Label('second', 'b'))
+  metrics.register(Label('first', 'c'))
+  restarted = VarsServer()
+  query = 'since=%d&epoch=%d' % (payload.generation, payload.epoch)
+  payload = compact.decode(restarted.get('/vars.bin', query), names)
+  assert payload.full
+  assert payload.samples == {'first': 'c', 'second': 'b'}
+  assert sorted(names.values()) == ['first', 'second']
+
+  metrics.unregister('second')
+  restarted.sample()
+  query = 'since=%d&epoch=%d' % (payload.generation, payload.epoch)
+  payload = compact.decode(restarted.get('/vars.bin', query), names)
+  assert not payload.full
+  assert (payload.samples, payload.removed) == ({}, ['second'])
+
+
+def test_vars_bad_query(metrics):
+  server = VarsServer()
+  environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/vars.json', 'QUERY_STRING': 'since=x'}
+  wsgiref.util.setup_testing_defaults(environ)
+  statuses = []
+  server.server.app(environ, lambda status, headers: statuses.append(status))
+  assert statuses[0].startswith('400')
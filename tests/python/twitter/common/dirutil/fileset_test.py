@@ -20,7 +20,8 @@ import pytest
 from contextlib import contextmanager
 
 from twitter.common.contextutil import temporary_dir
-from twitter.common.dirutil import Fileset as RealFileset
+from twitter.common.dirutil import Fileset as RealFileset, touch
+from twitter.common.dirutil.fileset import WalkCache
 
 
 class Fileset(RealFileset):
@@ -164,3 +165,73 @@ def test_walk_altdir():
         fp.write('booyeah')
       files.append(filename)
     assert set(RealFileset.zglobs('*', root=td)) == set(os.path.basename(fn) for fn in files)
+
+
+def test_zglobs_many():
+  with Fileset.over(['a.txt', 'b.py', '.c.py', 'd/e.py', 'd/.f.txt', 'g.java']):
+    globspecs = ['%s%d.txt' % (prefix, k) for prefix in ('*', 'x') for k in range(200)]
+    assert leq(Fileset.zglobs(*globspecs))
+    assert leq(Fileset.zglobs(*globspecs + ['*.py', '**/*.py', 'd/.*']), 'b.py', 'd/e.py',
+               'd/.f.txt')
+    assert leq(Fileset.rglobs(*globspecs + ['*.py', '.*.py', 'd/?.py']), 'b.py', '.c.py',
+               'd/e.py')
+
+
+def populate(td):
+  for filename in ('a.txt', '.hidden', 'b/c.txt', 'b/d/e.txt', 'f/g.txt'):
+    touch(os.path.join(td, filename))
+  os.symlink('b', os.path.join(td, 'link_to_dir'))
+  os.symlink('a.txt', os.path.join(td, 'link_to_file'))
+  os.symlink('nonexistent', os.path.join(td, 'dangling'))
+
+
+def uncached_walk(root, **kw):
+  old, RealFileset.WALK_CACHE = RealFileset.WALK_CACHE, None
+  try:
+    return set(RealFileset.walk(root, **kw))
+  finally:
+    RealFileset.WALK_CACHE = old
+
+
+def test_walk_cache_matches_os_walk():
+  with temporary_dir() as td:
+    populate(td)
+    for kw in ({}, {'allow_dirs': True}, {'follow_links': True},
+               {'allow_dirs': True, 'follow_links': True}):
+      assert set(RealFileset.walk(td, **kw)) == uncached_walk(td, **kw)
+    assert set(RealFileset.zglobs('**/*.txt', root=td)) == set(
+        ['a.txt', 'b/c.txt', 'b/d/e.txt', 'f/g.txt'])
+
+
+class FakeClock(object):
+  def __init__(self, now):
+    self.now = now
+
+  def time(self):
+    return self.now
+
+
+def test_walk_cache_invalidation():
+  with temporary_dir() as td:
+    populate(td)
+    clock = FakeClock(0)
+    cache = WalkCache(clock=clock)
+
+    def walk():
+      return set(relative + filename for relative, _, files in cache.walk(td) for filename in files)
+
+    # Listings of recently modified directories are not kept.
+    expected = walk()
+    assert cache._listings == {}
+    clock.now = os.stat(td).st_mtime + WalkCache.RACY_INTERVAL
+    assert walk() == expected
+    assert len(cache._listings) == 4
+
+    # A new entry changes the mtime of its directory.
+    os.utime(os.path.join(td, 'b', 'd'), (0, 0))
+    assert walk() == expected
+    touch(os.path.join(td, 'b', 'd', 'h.txt'))
+    assert walk() == expected | set(['b/d/h.txt'])
+
+    cache.clear()
+    assert cache._listings == {}
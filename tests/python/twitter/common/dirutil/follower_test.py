@@ -0,0 +1,110 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import os
+
+from twitter.common.contextutil import temporary_dir
+from twitter.common.dirutil import FileFollower
+from twitter.common.dirutil.follower import Inotify
+
+import pytest
+
+
+class FakeClock(object):
+  def __init__(self):
+    self.now = 0
+
+  def time(self):
+    return self.now
+
+  def sleep(self, amount):
+    self.now += amount
+
+
+def append(filename, data):
+  with open(filename, 'a') as fp:
+    fp.write(data)
+
+
+def follower_modes():
+  yield FileFollower(use_inotify=False, clock=FakeClock())
+  if Inotify.available():
+    yield FileFollower(poll_interval=0.1)
+
+
+def test_follow_lines():
+  for follower in follower_modes():
+    with temporary_dir() as td:
+      first, second = os.path.join(td, 'first'), os.path.join(td, 'second')
+      append(first, 'old line\n')
+      follower.follow(first)
+      follower.follow(second, from_end=False)
+      assert follower.filenames() == set([first, second])
+      assert follower.poll(timeout=0) == {}
+
+      append(first, 'hello\nwor')
+      append(second, 'a\nb\n')
+      assert follower.poll(timeout=1) == {first: ['hello'], second: ['a', 'b']}
+      append(first, 'ld\n')
+      assert follower.poll(timeout=1) == {first: ['world']}
+      assert follower.poll(timeout=0) == {}
+
+      follower.unfollow(second)
+      append(second, 'c\n')
+      assert follower.poll(timeout=0) == {}
+      follower.close()
+
+
+def test_follow_rotation_and_truncation():
+  for follower in follower_modes():
+    with temporary_dir() as td:
+      filename = os.path.join(td, 'log')
+      follower.follow(filename)
+      assert follower.poll(timeout=0) == {}
+
+      append(filename, '1\n2\n')
+      assert follower.poll(timeout=1) == {filename: ['1', '2']}
+
+      append(filename, 'partial')
+      os.rename(filename, filename + '.1')
+      append(filename, 'three\n')
+      assert follower.poll(timeout=1) == {filename: ['partial', 'three']}
+
+      with open(filename, 'w') as fp:
+        fp.write('4\n')
+      assert follower.poll(timeout=1) == {filename: ['4']}
+
+      os.unlink(filename)
+      assert follower.poll(timeout=0) == {}
+      append(filename, '5\n')
+      assert follower.poll(timeout=1) == {filename: ['5']}
+      follower.close()
+
+
+@pytest.mark.skipif('not Inotify.available()')
+def test_follow_missing_directory():
+  with temporary_dir() as td:
+    filename = os.path.join(td, 'sandbox', 'stderr')
+    follower = FileFollower(poll_interval=0.01)
+    follower.follow(filename)
+    assert follower.poll(timeout=0) == {}
+    os.mkdir(os.path.dirname(filename))
+    append(filename, 'hello\n')
+    assert follower.poll(timeout=1) == {filename: ['hello']}
+    append(filename, 'world\n')
+    assert follower.poll(timeout=1) == {filename: ['world']}
+    assert follower._unwatched == set()
+    follower.close()
@@ -18,7 +18,7 @@ import os
 import stat
 
 from twitter.common.contextutil import temporary_file, temporary_dir
-from twitter.common.dirutil import safe_size, safe_bsize, du
+from twitter.common.dirutil import DiskUsage, du, safe_bsize, safe_mkdir, safe_rmtree, safe_size
 
 
 def create_files(tempdir, *filenames):
@@ -57,3 +57,80 @@ def test_size():
   safe_size(os.path.join(td, 'file3.txt'), on_error=on_error)
   assert errors == [os.path.join(td, 'file3.txt')]
 
+
+def walk_du(directory):
+  size = 0
+  for root, _, files in os.walk(directory):
+    size += sum(safe_bsize(os.path.join(root, filename)) for filename in files)
+  return size
+
+
+def populate(td):
+  for k in range(20):
+    subdir = os.path.join(td, *['d%d' % j for j in range(k % 5)])
+    safe_mkdir(subdir)
+    with open(os.path.join(subdir, 'file%d' % k), 'w') as fp:
+      fp.write('!' * (k * 1000))
+  os.symlink('d0', os.path.join(td, 'link_to_dir'))
+  os.symlink('d0/file1', os.path.join(td, 'link_to_file'))
+  os.symlink('nonexistent', os.path.join(td, 'dangling'))
+
+
+def test_disk_usage_matches_walk():
+  with temporary_dir() as td:
+    populate(td)
+    expected = walk_du(td)
+    assert expected > 0
+    assert du(td) == expected
+    for max_workers in (1, 2, 8):
+      assert DiskUsage(max_workers=max_workers).du(td) == expected
+    assert DiskUsage().du(os.path.join(td, 'nonexistent')) == 0
+
+
+def test_disk_usage_apparent():
+  with temporary_dir() as td:
+    create_files(td, 'file1.txt')
+    with open(os.path.join(td, 'file1.txt'), 'w') as fp:
+      fp.write('!' * 101)
+    assert DiskUsage(apparent=True).du(td) == 101
+
+
+class FakeClock(object):
+  def __init__(self):
+    self.now = 0
+
+  def time(self):
+    return self.now
+
+
+def test_disk_usage_cache():
+  with temporary_dir() as td:
+    populate(td)
+    clock = FakeClock()
+    usage = DiskUsage(cache=True, max_age=60, clock=clock)
+    expected = usage.du(td)
+    assert expected == walk_du(td)
+
+    # Growing a file in place does not change its directory's mtime, so the cached usage holds
+    # until the cache entry expires.
+    with open(os.path.join(td, 'd0', 'file1'), 'a') as fp:
+      fp.write('!' * 100000)
+    assert usage.du(td) == expected
+    clock.now = 61
+    assert usage.du(td) == walk_du(td)
+
+    # Adding a file changes its directory's mtime.
+    subdir = os.path.join(td, 'd0', 'd1')
+    with open(os.path.join(subdir, 'new'), 'w') as fp:
+      fp.write('!' * 100000)
+    os.utime(subdir, (0, 0))
+    assert usage.du(td) == walk_du(td)
+
+    # Removed directories are dropped from the cache.
+    safe_rmtree(subdir)
+    os.utime(os.path.join(td, 'd0'), (1, 1))
+    assert usage.du(td) == walk_du(td)
+    assert not [path for path in usage._cache if path.startswith(subdir)]
+
+    usage.invalidate()
+    assert usage._cache == {}
@@ -17,7 +17,7 @@
 import pkgutil
 import pytest
 import sys
-from twitter.common.java.class_file import ClassFile
+from twitter.common.java.class_file import ClassFile, LazyClassFile
 
 import unittest2 as unittest
 
@@ -56,3 +56,21 @@ class ClassFileParserTest(unittest.TestCase):
     assert access_flags.super_()
     assert not access_flags.interface()
     assert not access_flags.abstract()
+
+
+@pytest.mark.skipif('sys.version_info >= (3,0)')
+class LazyClassFileParserTest(ClassFileParserTest):
+  @classmethod
+  def setUpClass(cls):
+    cls._class_data = pkgutil.get_data('twitter.common.java', _EXAMPLE_RESOURCE)
+    assert cls._class_data is not None
+    cls._class_file = LazyClassFile(cls._class_data)
+
+  def test_matches_class_file(self):
+    class_file = ClassFile(self._class_data)
+    assert self._class_file._decoded_methods is None
+    assert self._class_file.external_references() == class_file.external_references()
+    assert self._class_file.linkage_signature() == class_file.linkage_signature()
+    assert self._class_file._decoded_methods is None
+    assert len(self._class_file.constants()) == len(class_file.constants())
+    assert str(self._class_file) == str(class_file)
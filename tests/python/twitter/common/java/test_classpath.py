@@ -0,0 +1,95 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import os
+import pkgutil
+from zipfile import ZipFile
+
+from twitter.common.contextutil import temporary_dir
+from twitter.common.java import classpath
+from twitter.common.java.class_file import ClassFile
+from twitter.common.java.classpath import ClasspathScanner
+
+import mock
+import pytest
+
+
+_EXAMPLE_RESOURCE = 'resources/example_class'
+
+
+def write_jar(path, class_data):
+  with ZipFile(path, 'w') as zf:
+    zf.writestr('com/google/protobuf/ByteString.class', class_data)
+    zf.writestr('com/google/protobuf/Copy.class', class_data)
+    zf.writestr('com/google/protobuf/Broken.class', 'not a class')
+    zf.writestr('META-INF/MANIFEST.MF', 'Manifest-Version: 1.0\n')
+
+
+@pytest.mark.skipif('sys.version_info >= (3,0)')
+def test_scan_and_cache():
+  class_data = pkgutil.get_data('twitter.common.java', _EXAMPLE_RESOURCE)
+  class_file = ClassFile(class_data)
+  with temporary_dir() as td:
+    jar = os.path.join(td, 'example.jar')
+    write_jar(jar, class_data)
+    classes_dir = os.path.join(td, 'classes', 'com', 'google', 'protobuf')
+    os.makedirs(classes_dir)
+    with open(os.path.join(classes_dir, 'ByteString.class'), 'wb') as fp:
+      fp.write(class_data)
+
+    scanner = ClasspathScanner(cache_dir=os.path.join(td, 'cache'), processes=False, batch_size=1)
+    results = scanner.scan(os.pathsep.join([jar, os.path.join(td, 'classes')]))
+    assert sorted(results[jar]) == [
+        'com/google/protobuf/ByteString.class', 'com/google/protobuf/Copy.class']
+    summary = results[jar]['com/google/protobuf/ByteString.class']
+    assert summary.linkage_signature == class_file.linkage_signature()
+    assert set(summary.external_references) == class_file.external_references()
+    assert results[os.path.join(td, 'classes')] == {
+        os.path.join('com', 'google', 'protobuf', 'ByteString.class'): summary}
+
+    # Unchanged entries, including those that failed to parse, come from the cache.
+    with mock.patch.object(classpath, '_analyze_entries') as analyze:
+      cached = scanner.scan([jar])
+      assert cached == {jar: results[jar]}
+      assert not analyze.called
+    # With the same types as a fresh scan.
+    for name, summary in cached[jar].items():
+      assert type(name) is str
+      assert type(summary.linkage_signature) is str
+      assert all(type(reference) is str for reference in summary.external_references)
+
+    # Only changed entries are reparsed.
+    with ZipFile(jar, 'a') as zf:
+      zf.writestr('com/google/protobuf/Other.class', class_data)
+    rescanned, analyze_entries = [], classpath._analyze_entries
+    def record_entries(path, names):
+      rescanned.extend(names)
+      return analyze_entries(path, names)
+    with mock.patch.object(classpath, '_analyze_entries', record_entries):
+      assert len(scanner.scan_jar(jar)) == 3
+    assert rescanned == ['com/google/protobuf/Other.class']
+
+
+@pytest.mark.skipif('sys.version_info >= (3,0)')
+def test_uncacheable_names():
+  with temporary_dir() as td:
+    jar = os.path.join(td, 'example.jar')
+    with ZipFile(jar, 'w') as zf:
+      zf.writestr('com/example/\xff.class', 'not a class')
+    cache_dir = os.path.join(td, 'cache')
+    scanner = ClasspathScanner(cache_dir=cache_dir, processes=False)
+    assert scanner.scan([jar]) == {jar: {}}
+    assert os.listdir(cache_dir) == []
@@ -14,10 +14,12 @@
 # limitations under the License.
 # ==================================================================================================
 
+import os
 import struct
 import pkgutil
 
-from twitter.common.java.perfdata import PerfData
+from twitter.common.contextutil import temporary_file
+from twitter.common.java.perfdata import MappedFileProvider, PerfData
 
 import mock
 import pytest
@@ -59,3 +61,45 @@ def test_empty_ish_perfdata():
   provider = lambda: PerfData.MAGIC
   with pytest.raises(ValueError):
     perfdata = PerfData.get(provider)
+
+
+def test_cached_layout():
+  data = pkgutil.get_data('twitter.common.java', _EXAMPLE_RESOURCE)
+  provider = lambda: data
+  perfdata = PerfData.get(provider)
+  perfdata.sample()
+  cached_perfdata = PerfData.get(provider, cache_layout=True)
+  cached_perfdata.sample()
+  assert dict(cached_perfdata) == dict(perfdata)
+  cached_perfdata.sample()
+  assert dict(cached_perfdata) == dict(perfdata)
+
+  # A buffer that no longer matches the cached layout is parsed afresh.
+  byte_order = '<' if data[4] == '\x01' else '>'
+  num_entries, = struct.unpack(byte_order + 'i', data[28:32])
+  truncated = data[:28] + struct.pack(byte_order + 'i', num_entries - 1) + data[32:]
+  truncated_perfdata = PerfData.get(lambda: truncated)
+  truncated_perfdata.sample()
+  cached_perfdata._provider = lambda: truncated
+  cached_perfdata.sample()
+  assert len(cached_perfdata) == len(perfdata) - 1
+  assert dict(cached_perfdata) == dict(truncated_perfdata)
+
+
+def test_mapped_file_provider():
+  data = pkgutil.get_data('twitter.common.java', _EXAMPLE_RESOURCE)
+  with temporary_file() as fp:
+    fp.write(data)
+    fp.flush()
+    provider = MappedFileProvider(fp.name)
+    perfdata = PerfData.get(provider, cache_layout=True)
+    perfdata.sample()
+    expected = PerfData.get(lambda: data)
+    expected.sample()
+    assert dict(perfdata) == dict(expected)
+    mapped = provider()
+    assert provider() is mapped
+    fp.write('\x00' * 16)
+    fp.flush()
+    assert provider() is not mapped
+    provider.close()
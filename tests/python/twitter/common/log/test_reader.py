@@ -14,10 +14,11 @@
 # limitations under the License.
 # ==================================================================================================
 
+from datetime import datetime
 import os
 
 from twitter.common.lang import Compatibility
-from twitter.common.log.parsers import GlogLine
+from twitter.common.log.parsers import GlogLine, Level, Line
 from twitter.common.log.reader import (
   Buffer,
   Stream,
@@ -128,3 +129,41 @@ def test_stream():
   write_and_rewind(writer, lines[2].raw)
   assert stream.next() == lines[1]
 
+
+def test_glog_line_parse():
+  line = GlogLine.parse('W1101 18:39:49.557605 14209 executor_base.py:43] Executor  [None]')
+  assert line.level == Level.WARNING
+  assert line.datetime == datetime(datetime.now().year, 11, 1, 18, 39, 49, 557605)
+  assert line._fields is None
+  assert line.pid == '14209'
+  assert line.source == 'executor_base.py:43]'
+  assert line.message == 'Executor  [None]'
+
+  # Consistent with the strptime-based parsing of the fields.
+  level, dt, rest = GlogLine.split_time(line.raw)
+  assert (level, dt) == (line.level, line.datetime)
+  assert line == GlogLine(line.raw, level, dt, rest[0], rest[1], ' '.join(rest[2:]))
+
+  # Shorter fractional seconds are not in the fixed layout, but still parse.
+  line = GlogLine.parse('I1101 18:39:49.5 14209 executor_base.py:43] Hello')
+  assert line.datetime == datetime(datetime.now().year, 11, 1, 18, 39, 49, 500000)
+  assert line.message == 'Hello'
+
+  for bad_line in ('', 'X1101 18:39:49.557605 14209 a.py:1] x', 'I1101 18:39:49.557605 14209',
+                   'I1301 18:39:49.557605 14209 a.py:1] x', 'I11a1 18:39:49.557605 14209 a.py:1] x',
+                   'I1101 18:39:49.5576a5 14209 a.py:1] x'):
+    assert Line.parse_order(bad_line, GlogLine) is None
+
+
+def test_muxer():
+  def glog(second, message):
+    return 'I1101 18:39:%02d.000000 14209 executor_base.py:43] %s' % (second, message)
+
+  first = Compatibility.StringIO('\n'.join([glog(1, 'a'), glog(3, 'c'), glog(3, 'd')]))
+  second = Compatibility.StringIO('\n'.join([glog(2, 'b'), glog(3, 'e'), glog(5, 'f')]))
+  muxer = StreamMuxer([(Stream(first, (GlogLine,)), 'first'),
+                       (Stream(second, (GlogLine,)), 'second')])
+  lines = read_all(muxer, terminator=Stream.EOF)
+  assert [(label, line.message) for label, line in lines] == [
+      ('first', 'a'), ('second', 'b'), ('first', 'c'), ('second', 'e'), ('first', 'd'),
+      ('second', 'f')]
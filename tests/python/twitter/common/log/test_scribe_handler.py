@@ -5,9 +5,10 @@ __author__ = "Chris Chen (cchen@twitter.com)"
 
 import mox
 import logging
+import threading
 import unittest2 as unittest
 
-from twitter.common.log.handlers import ScribeHandler
+from twitter.common.log.handlers import QueuedScribeHandler, ScribeHandler
 
 try:
   from scribe import scribe
@@ -250,5 +251,146 @@ class TestHandler(unittest.TestCase):
     logging.debug(_TEST_MSG)
     self.assertFalse(self.handler.messages_pending)
 
+
+class FakeTransport(object):
+  def __init__(self):
+    self.opened = 0
+    self._open = False
+
+  def isOpen(self):
+    return self._open
+
+  def open(self):
+    self.opened += 1
+    self._open = True
+
+  def close(self):
+    self._open = False
+
+
+class FakeClient(object):
+  def __init__(self, results=()):
+    self.batches = []
+    self.gate = threading.Event()
+    self.gate.set()
+    self._results = list(results)
+
+  def Log(self, messages):
+    self.gate.wait()
+    self.batches.append([message.message for message in messages])
+    return self._results.pop(0) if self._results else scribe.ResultCode.OK
+
+
+class TestQueuedHandler(unittest.TestCase):
+  def make_handler(self, client, **kwargs):
+    handler = QueuedScribeHandler(category=_CATEGORY, host=_HOST, port=_PORT, **kwargs)
+    handler._transport = FakeTransport()
+    handler._client = client
+    self.addCleanup(handler.close, timeout=1.0)
+    return handler
+
+  def emit(self, handler, *messages):
+    for message in messages:
+      handler.emit(logging.LogRecord('test', logging.INFO, __file__, 0, message, (), None))
+
+  @unittest.skipIf(_SCRIBE_PRESENT, "Scribe Modules Present")
+  def test_no_scribe(self):
+    with self.assertRaises(ScribeHandler.ScribeHandlerException):
+      QueuedScribeHandler(buffer=False, category=_CATEGORY, host=_HOST, port=_PORT)
+
+  @unittest.skipUnless(_SCRIBE_PRESENT, "Scribe Modules Not Present")
+  def test_invalid_arguments(self):
+    with self.assertRaises(ValueError):
+      QueuedScribeHandler(buffer=False, category=_CATEGORY, host=_HOST, port=_PORT,
+                          overflow='explode')
+    with self.assertRaises(ValueError):
+      QueuedScribeHandler(buffer=False, category=_CATEGORY, host=_HOST, port=_PORT, max_queue=0)
+
+  @unittest.skipUnless(_SCRIBE_PRESENT, "Scribe Modules Not Present")
+  def test_batches_over_persistent_connection(self):
+    client = FakeClient()
+    client.gate.clear()
+    handler = self.make_handler(client, buffer=False, batch_size=2)
+    self.emit(handler, 'a', 'b', 'c', 'd', 'e')
+    client.gate.set()
+    self.assertTrue(handler.flush())
+    self.assertEquals(sum(client.batches, []), ['a', 'b', 'c', 'd', 'e'])
+    self.assertTrue(all(len(batch) <= 2 for batch in client.batches))
+    self.assertEquals(handler._transport.opened, 1)
+    sample = handler.metrics.sample()
+    self.assertEquals(sample['enqueued'], 5)
+    self.assertEquals(sample['sent'], 5)
+    self.assertEquals(sample['dropped'], 0)
+    self.assertEquals(sample['queue_depth'], 0)
+
+  @unittest.skipUnless(_SCRIBE_PRESENT, "Scribe Modules Not Present")
+  def test_flush_waits_for_batch_in_flight(self):
+    client = FakeClient()
+    client.gate.clear()
+    handler = self.make_handler(client, buffer=False)
+    self.emit(handler, 'a')
+    while not handler._queue.empty():
+      pass
+    self.assertTrue(handler.messages_pending)
+    self.assertFalse(handler.flush(timeout=0.05))
+    client.gate.set()
+    self.assertTrue(handler.flush())
+    self.assertEquals(client.batches, [['a']])
+
+  @unittest.skipUnless(_SCRIBE_PRESENT, "Scribe Modules Not Present")
+  def test_overflow_drop_newest(self):
+    client = FakeClient()
+    client.gate.clear()
+    handler = self.make_handler(client, buffer=False, max_queue=2, batch_size=1)
+    self.emit(handler, 'a')
+    while not handler._queue.empty():  # Wait for 'a' to be taken for sending.
+      pass
+    self.emit(handler, 'b', 'c', 'd')
+    client.gate.set()
+    self.assertTrue(handler.flush())
+    self.assertEquals(sum(client.batches, []), ['a', 'b', 'c'])
+    self.assertEquals(handler.metrics.sample()['dropped'], 1)
+
+  @unittest.skipUnless(_SCRIBE_PRESENT, "Scribe Modules Not Present")
+  def test_overflow_drop_oldest(self):
+    client = FakeClient()
+    client.gate.clear()
+    handler = self.make_handler(client, buffer=False, max_queue=2, batch_size=1,
+                                overflow=QueuedScribeHandler.DROP_OLDEST)
+    self.emit(handler, 'a')
+    while not handler._queue.empty():  # Wait for 'a' to be taken for sending.
+      pass
+    self.emit(handler, 'b', 'c', 'd')
+    client.gate.set()
+    self.assertTrue(handler.flush())
+    self.assertEquals(sum(client.batches, []), ['a', 'c', 'd'])
+    self.assertEquals(handler.metrics.sample()['dropped'], 1)
+
+  @unittest.skipUnless(_SCRIBE_PRESENT, "Scribe Modules Not Present")
+  def test_failed_batch_dropped_without_buffer(self):
+    client = FakeClient(results=[scribe.ResultCode.TRY_LATER])
+    handler = self.make_handler(client, buffer=False)
+    self.emit(handler, 'a')
+    self.assertTrue(handler.flush())
+    self.emit(handler, 'b')
+    self.assertTrue(handler.flush())
+    sample = handler.metrics.sample()
+    self.assertEquals(sample['sent'], 1)
+    self.assertEquals(sample['dropped'], 1)
+    self.assertEquals(sample['send_failures'], 1)
+
+  @unittest.skipUnless(_SCRIBE_PRESENT, "Scribe Modules Not Present")
+  def test_failed_batch_retried_with_buffer(self):
+    client = FakeClient(results=[scribe.ResultCode.TRY_LATER])
+    handler = self.make_handler(client, buffer=True, retry_interval=0.01)
+    self.emit(handler, 'a')
+    self.assertTrue(handler.flush())
+    self.assertEquals(client.batches, [['a'], ['a']])
+    sample = handler.metrics.sample()
+    self.assertEquals(sample['sent'], 1)
+    self.assertEquals(sample['dropped'], 0)
+    self.assertEquals(sample['send_failures'], 1)
+
+
 if __name__ == "__main__":
   unittest.main()
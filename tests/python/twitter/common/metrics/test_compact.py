@@ -0,0 +1,78 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import pytest
+
+from twitter.common.metrics import Label
+from twitter.common.metrics.compact import decode, encode, DecodeError
+from twitter.common.metrics.metrics import Metrics
+from twitter.common.metrics.sampler import MetricSampler
+
+
+def test_roundtrip_values():
+  samples = {
+    'int': 23,
+    'negative': -(2**40),
+    'bigint': 2**70,
+    'float': 2.5,
+    'true': True,
+    'false': False,
+    'none': None,
+    'string': 'hello',
+    'list': [1, 2, '3'],
+    'dict': {'a': 'b'},
+  }
+  ids = dict((name, index) for index, name in enumerate(sorted(samples)))
+  payload = decode(encode(17, samples, ids, epoch=2**52, full=True))
+  assert (payload.epoch, payload.generation, payload.full) == (2**52, 17, True)
+  assert payload.samples == samples
+  assert payload.removed == []
+
+
+def test_delta_roundtrip():
+  metrics = Metrics()
+  counter = metrics.register('counter')
+  metrics.register(Label('label', 'value'))
+  sampler = MetricSampler(metrics)
+
+  def encode_delta(delta):
+    return encode(delta.generation, delta.samples, delta.ids, new_ids=delta.new_ids,
+                  removed=delta.removed, epoch=delta.epoch, full=delta.full)
+
+  names = {-1: 'stale'}
+  first = decode(encode_delta(sampler.delta(0)), names)
+  assert first.full
+  assert first.samples == {'counter': None, 'label': 'value'}
+  assert sorted(names.values()) == ['counter', 'label']
+
+  counter.write(5)
+  metrics.unregister('label')
+  sampler.iterate()
+  payload = encode_delta(sampler.delta(first.generation, first.epoch))
+  assert decode(payload, names) == (first.epoch, 2, False, {'counter': 5}, ['label'])
+
+  # Without the name table from the first payload, ids cannot be resolved.
+  with pytest.raises(DecodeError):
+    decode(payload)
+
+
+def test_bad_payloads():
+  with pytest.raises(DecodeError):
+    decode(b'')
+  with pytest.raises(DecodeError):
+    decode(b'XXXX' + encode(1, {}, {})[4:])
+  with pytest.raises(DecodeError):
+    decode(encode(1, {'a': 'hello'}, {'a': 0})[:-2])
@@ -0,0 +1,95 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import pytest
+
+from twitter.common.metrics import Histogram
+from twitter.common.metrics.metrics import Metrics
+
+
+def test_percentile_names():
+  assert Histogram.percentile_name(0.5) == 'p50'
+  assert Histogram.percentile_name(0.9) == 'p90'
+  assert Histogram.percentile_name(0.95) == 'p95'
+  assert Histogram.percentile_name(0.999) == 'p999'
+  assert Histogram.percentile_name(0.9999) == 'p9999'
+  with pytest.raises(ValueError):
+    Histogram.percentile_name(1)
+  with pytest.raises(ValueError):
+    Histogram.percentile_name(0)
+
+
+def test_empty():
+  hist = Histogram('latency', percentiles=(0.5, 0.99))
+  assert hist.sample() == {
+      'count': 0, 'sum': 0, 'avg': 0, 'min': 0, 'max': 0, 'p50': 0, 'p99': 0}
+
+
+def test_bad_values():
+  hist = Histogram('latency')
+  with pytest.raises(TypeError):
+    hist.add('hello')
+  with pytest.raises(TypeError):
+    hist.add(None)
+  with pytest.raises(ValueError):
+    hist.add(-1)
+
+
+def test_single_value():
+  hist = Histogram('latency')
+  hist.add(23)
+  sample = hist.sample()
+  assert sample['count'] == 1
+  assert sample['min'] == sample['max'] == 23
+  for percentile in Histogram.DEFAULT_PERCENTILES:
+    assert sample[Histogram.percentile_name(percentile)] == 23
+
+
+def test_percentiles_within_error():
+  hist = Histogram('latency', error=0.005)
+  for value in range(1, 100001):
+    hist.add(value)
+  sample = hist.sample()
+  assert sample['count'] == 100000
+  assert sample['sum'] == sum(range(1, 100001))
+  assert sample['min'] == 1
+  assert sample['max'] == 100000
+  for name, expected in (('p50', 50000), ('p90', 90000), ('p99', 99000), ('p999', 99900)):
+    assert abs(sample[name] - expected) <= expected * 0.005, name
+
+
+def test_clear():
+  hist = Histogram('latency')
+  hist.add(5)
+  hist.clear()
+  assert hist.sample()['count'] == 0
+  hist.add(7)
+  assert hist.sample()['p50'] == 7
+
+
+def test_metrics_expansion():
+  metrics = Metrics()
+  hist = metrics.scope('rpc').register(Histogram('latency_us', percentiles=(0.5, 0.999)))
+  hist.add(1000)
+  assert metrics.sample() == {
+    'rpc.latency_us.count': 1,
+    'rpc.latency_us.sum': 1000,
+    'rpc.latency_us.avg': 1000.0,
+    'rpc.latency_us.min': 1000,
+    'rpc.latency_us.max': 1000,
+    'rpc.latency_us.p50': 1000,
+    'rpc.latency_us.p999': 1000,
+  }
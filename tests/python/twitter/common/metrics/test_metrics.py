@@ -120,3 +120,32 @@ def test_observable():
   metrics = Metrics()
   metrics.register_observable('derpspace', Derp())
   assert metrics.sample() == {'derpspace.value': 'derp value'}
+
+
+def test_sample_tracks_registration_changes():
+  metrics = Metrics()
+  leaf = metrics.scope('a').scope('b')
+  leaf.register(Label('value', 1))
+  assert metrics.sample() == {'a.b.value': 1}
+  leaf.register(Label('other', 2))
+  assert metrics.sample() == {'a.b.value': 1, 'a.b.other': 2}
+  leaf.unregister('value')
+  assert metrics.sample() == {'a.b.other': 2}
+  metrics.scope('a').scope('c').register(Label('value', 3))
+  assert metrics.sample() == {'a.b.other': 2, 'a.c.value': 3}
+
+
+def test_shared_observable_invalidates_every_parent():
+  class Derp(Observable): pass
+  derp = Derp()
+  metrics1, metrics2 = Metrics(), Metrics()
+  metrics1.register_observable('derp', derp)
+  metrics2.scope('nested').register_observable('derp', derp)
+  assert metrics1.sample() == {}
+  assert metrics2.sample() == {}
+  derp.metrics.register(Label('value', 'derp value'))
+  assert metrics1.sample() == {'derp.value': 'derp value'}
+  assert metrics2.sample() == {'nested.derp.value': 'derp value'}
+  metrics1.unregister_observable('derp')
+  assert metrics1.sample() == {}
+  assert metrics2.sample() == {'nested.derp.value': 'derp value'}
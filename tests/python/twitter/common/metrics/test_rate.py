@@ -22,8 +22,10 @@ from twitter.common.metrics import (
   AtomicGauge,
   MutatorGauge,
   NamedGauge,
-  Rate
+  Rate,
+  WindowedRate,
 )
+from twitter.common.metrics.rate import SampleHistory
 
 class FakeGauge(NamedGauge):
   def __init__(self, name):
@@ -91,3 +93,62 @@ class TestRate(unittest.TestCase):
     assert rate.name() == 'holyguacamole_per_1secs'
     rate = Rate.of(gauge, name = 'holyguacamole', window = Amount(3, Time.HOURS))
     assert rate.name() == 'holyguacamole_per_3hrs'
+
+
+class TestWindowedRate(unittest.TestCase):
+  def test_empty(self):
+    clock = TestClock()
+    gauge = FakeGauge('test').supplies([100000])
+    rate = WindowedRate("foo", gauge, window=Amount(30, Time.SECONDS), clock=clock)
+    assert rate.read() == 0
+
+  def test_windowing(self):
+    TEN_SECONDS = Amount(10, Time.SECONDS).as_(Time.SECONDS)
+
+    clock = TestClock()
+    gauge = FakeGauge('test').supplies([100, 0, 50, 100, 150, 100, 50])
+    rate = WindowedRate("foo", gauge, window=Amount(30, Time.SECONDS), clock=clock)
+
+    assert rate.read() == 0
+
+    clock.advance(TEN_SECONDS)
+    assert -100.0 / 10 == rate.read()
+
+    clock.advance(TEN_SECONDS)
+    assert -50.0 / 20 == rate.read()
+
+    clock.advance(TEN_SECONDS)
+    assert 0 == rate.read()
+
+    clock.advance(TEN_SECONDS)
+    assert 150.0 / 30 == rate.read()
+
+    clock.advance(TEN_SECONDS)
+    assert 50.0 / 30 == rate.read()
+
+    clock.advance(TEN_SECONDS)
+    assert -50.0 / 30 == rate.read()
+
+  def test_bounded_history(self):
+    clock = TestClock()
+    gauge = FakeGauge('test').supplies(range(0, 100000, 10))
+    history = SampleHistory(gauge, horizon=10, resolution=1, clock=clock)
+    rate = WindowedRate("foo", history, window=Amount(10, Time.SECONDS), clock=clock)
+    for _ in range(10000):
+      clock.advance(0.25)
+      rate.read()
+    assert len(history._samples) <= 12
+    assert rate.read() == 40.0
+
+  def test_multiple_windows(self):
+    clock = TestClock()
+    gauge = FakeGauge('test').supplies(range(0, 1000000, 100))
+    rates = WindowedRate.of(gauge, windows=(Amount(1, Time.SECONDS), Amount(1, Time.MINUTES)),
+        clock=clock)
+    assert [rate.name() for rate in rates] == ['test_per_1secs', 'test_per_1mins']
+    assert [rate.read() for rate in rates] == [0, 0]
+    for _ in range(120):
+      clock.advance(1)
+      assert [rate.read() for rate in rates] == [100.0, 100.0]
+    # Both windows were served by one read of the gauge per tick.
+    assert len(gauge._supplies) == 10000 - 121
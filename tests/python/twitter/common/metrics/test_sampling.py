@@ -90,3 +90,116 @@ def test_metric_sample():
   assert sampler.sample() == {}
   sampler.iterate()
   assert sampler.sample() == {'herp': 'derp'}
+
+
+def test_metric_sample_delta():
+  metrics = Metrics()
+  herp = metrics.register('herp')
+  sampler = MetricSampler(metrics)
+  delta = sampler.delta()
+  assert (delta.generation, delta.full, delta.samples, delta.removed) == (
+      1, True, {'herp': None}, [])
+  assert delta.ids == delta.new_ids == {'herp': 0}
+  epoch = delta.epoch
+
+  metrics.register(Label('derp', 'value'))
+  sampler.iterate()
+  assert sampler.delta(1) == (epoch, 2, False, {'derp': 'value'}, [], {'derp': 1}, {'derp': 1})
+  sampler.iterate()
+  assert sampler.delta(2, epoch) == (epoch, 3, False, {}, [], {}, {})
+
+  herp.write(23)
+  metrics.unregister('derp')
+  sampler.iterate()
+  assert sampler.delta(3) == (
+      epoch, 4, False, {'herp': 23}, ['derp'], {'herp': 0, 'derp': 1}, {})
+  assert sampler.delta(0) == (epoch, 4, True, {'herp': 23}, [], {'herp': 0}, {'herp': 0})
+  # Reporting a removal does not forget it: other consumers may not have seen it yet.
+  assert sampler.delta(3).removed == ['derp']
+  assert sampler.ids() == {'herp': 0, 'derp': 1}
+
+
+def test_metric_sample_delta_resync():
+  metrics = Metrics()
+  herp = metrics.register('herp')
+  sampler = MetricSampler(metrics, removal_window=2)
+  epoch = sampler.epoch
+
+  # Generations of another epoch, or generations not reached yet, cannot be trusted.
+  assert sampler.delta(1, epoch + 1).full
+  assert sampler.delta(2, epoch).full
+  assert not sampler.delta(1, epoch).full
+
+  # Once a removal falls out of the removal window the name is forgotten, and consumers that have
+  # not seen the removal yet are resynchronized.
+  metrics.register(Label('derp', 'value'))
+  sampler.iterate()
+  metrics.unregister('derp')
+  sampler.iterate()
+  sampler.iterate()
+  assert sampler.delta(2).removed == ['derp']
+  assert sampler.ids() == {'herp': 0, 'derp': 1}
+  sampler.iterate()
+  assert sampler.ids() == {'herp': 0}
+  assert sampler.delta(2).full
+  assert sampler.delta(3) == (epoch, 5, False, {}, [], {}, {})
+
+  # Names that come back are assigned fresh ids.
+  metrics.register(Label('derp', 'again'))
+  sampler.iterate()
+  assert sampler.delta(5).new_ids == {'derp': 2}
+
+
+def test_metric_sample_delta_consumers():
+  metrics = Metrics()
+  metrics.register(Label('herp', 'value'))
+  metrics.register(Label('derp', 'value'))
+  sampler = MetricSampler(metrics, removal_window=3)
+  fast = slow = sampler.generation
+
+  # A consumer that polls right after the removal does not make it disappear for the others.
+  metrics.unregister('derp')
+  sampler.iterate()
+  delta = sampler.delta(fast)
+  assert (delta.full, delta.samples, delta.removed) == (False, {}, ['derp'])
+  fast = delta.generation
+
+  metrics.register(Label('herp', 'changed'))
+  sampler.iterate()
+  delta = sampler.delta(slow)
+  assert (delta.full, delta.samples, delta.removed) == (False, {'herp': 'changed'}, ['derp'])
+  assert delta.ids == {'herp': 0, 'derp': 1}
+  fast = slow = delta.generation
+
+  # Only consumers that fall behind the removal window are resynchronized.
+  metrics.unregister('herp')
+  sampler.iterate()
+  delta = sampler.delta(fast)
+  assert (delta.full, delta.removed) == (False, ['herp'])
+  fast = delta.generation
+  for _ in range(3):
+    sampler.iterate()
+  assert sampler.ids() == {}
+  assert not sampler.delta(fast).full
+  assert sampler.delta(slow).full
+
+
+def test_metric_sample_removed_names_are_bounded():
+  metrics = Metrics()
+  sampler = MetricSampler(metrics, removal_window=10)
+  for index in range(100):
+    metrics.register(Label('churn%d' % index, 'value'))
+    sampler.iterate()
+    metrics.unregister('churn%d' % index)
+    sampler.iterate()
+  assert len(sampler.ids()) <= 5
+  assert len(sampler._removed) <= 5
+  for _ in range(10):
+    sampler.iterate()
+  assert sampler.ids() == {}
+  assert sampler._removed == {}
+
+
+def test_metric_sampler_removal_window():
+  with pytest.raises(ValueError):
+    MetricSampler(Metrics(), removal_window=0)
@@ -0,0 +1,94 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import os
+import subprocess
+
+from twitter.common.process.process_handle import ProcessHandleParser
+from twitter.common.process.process_handle_procfs import ProcessHandleProcfs, ProcStatParser
+from twitter.common.process.process_provider_procfs import ProcessProvider_Procfs
+
+import pytest
+
+
+STAT_LINE = ('1234 (python) S 1 1234 1234 34817 1234 4202496 2053 0 0 0 12 3 0 0 20 0 1 0 '
+             '987654 254517248 2467 18446744073709551615 4194304 6975876 140736440210336 0 0 0 0 '
+             '16781312 2 0 0 0 17 3 0 0 0 0 0')
+
+requires_procfs = pytest.mark.skipif('not ProcessProvider_Procfs._platform_compatible()')
+
+
+def test_stat_parser_matches_scanf_parser():
+  args = (ProcessHandleProcfs.ATTRS, ProcessHandleProcfs.TYPE_MAP, {})
+  assert ProcStatParser(*args).parse(STAT_LINE) == ProcessHandleParser(*args).parse(STAT_LINE)
+
+
+def test_stat_parser_comm_with_spaces():
+  parser = ProcStatParser(ProcessHandleProcfs.ATTRS, ProcessHandleProcfs.TYPE_MAP)
+  attrs = parser.parse(STAT_LINE.replace('(python)', '(tmux: server (1))'))
+  assert attrs['comm'] == '(tmux: server (1))'
+  assert attrs['state'] == 'S'
+  assert attrs['ppid'] == 1
+  assert attrs['rss'] == 2467
+
+
+def test_stat_parser_malformed():
+  parser = ProcStatParser(ProcessHandleProcfs.ATTRS, ProcessHandleProcfs.TYPE_MAP)
+  assert parser.parse('') == {}
+  assert parser.parse('1234 (python) S 1') == {}
+  assert parser.parse(STAT_LINE.replace(' 1234 1234 ', ' x 1234 ', 1)) == {}
+
+
+def test_pid_pair():
+  provider = ProcessProvider_Procfs()
+  assert provider._translate_line_to_pid_pair(STAT_LINE) == (1234, 1)
+  assert provider._translate_line_to_pid_pair('garbage') == (None, None)
+
+
+@requires_procfs
+def test_update():
+  provider = ProcessProvider_Procfs()
+  provider.collect_all()
+  assert os.getpid() in provider.pids()
+
+  child = subprocess.Popen(['sleep', '60'])
+  try:
+    provider.update()
+    assert child.pid in provider.pids()
+    assert child.pid in provider.children_of(os.getpid())
+  finally:
+    child.kill()
+    child.wait()
+
+  provider.update()
+  assert child.pid not in provider.pids()
+  assert child.pid not in provider.children_of(os.getpid())
+
+
+@requires_procfs
+def test_collect_tree():
+  child = subprocess.Popen(['sh', '-c', 'sleep 60; true'])
+  try:
+    provider = ProcessProvider_Procfs()
+    provider.collect_tree(os.getpid())
+    assert child.pid in provider.pids()
+    assert child.pid in provider.children_of(os.getpid())
+    assert provider.get_handle(child.pid).ppid() == os.getpid()
+    if provider._children_supported():
+      assert 1 not in provider.pids()
+  finally:
+    child.kill()
+    child.wait()
@@ -0,0 +1,144 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import os
+
+from twitter.common.recordio import (
+    BlockRecordReader,
+    BlockRecordWriter,
+    CompressedCodec,
+    RecordIO,
+    RecordReader,
+    StringCodec)
+from twitter.common.recordio.block_recordio import BlockRecordIO
+
+import pytest
+
+from recordio_test_harness import EphemeralFile
+
+
+RECORDS = ['record %d' % k for k in range(1000)]
+
+
+def test_compressed_codec_roundtrip():
+  for compression in ('none', 'zlib', 'bz2'):
+    with EphemeralFile('r+') as fp:
+      writer = RecordIO.Writer(fp, CompressedCodec(StringCodec(), compression))
+      for record in RECORDS[:10]:
+        writer.write(record)
+      fp.seek(0)
+      assert list(RecordIO.Reader(fp, CompressedCodec(StringCodec(), compression))) == RECORDS[:10]
+
+
+def test_bad_compression():
+  with pytest.raises(RecordIO.InvalidArgument):
+    CompressedCodec(StringCodec(), 'lzma-ish')
+
+
+def test_block_roundtrip():
+  for compression in ('none', 'zlib', 'bz2'):
+    with EphemeralFile('r+') as fp:
+      writer = BlockRecordWriter(fp, StringCodec(), compression=compression, block_size=1024)
+      for record in RECORDS:
+        assert writer.write(record)
+      assert writer.flush()
+      fp.seek(0)
+      assert list(BlockRecordReader(fp, StringCodec())) == RECORDS
+      # More than one block was written, each of which is an ordinary frame.
+      fp.seek(0)
+      assert 1 < len(list(RecordReader(fp))) < len(RECORDS)
+
+
+def test_block_read_and_try_read():
+  with EphemeralFile('r+') as fp:
+    writer = BlockRecordWriter(fp, StringCodec(), block_size=64)
+    for record in RECORDS[:20]:
+      writer.write(record)
+    writer.flush()
+    fp.seek(0)
+    reader = BlockRecordReader(fp, StringCodec())
+    assert [reader.read() for _ in range(10)] == RECORDS[:10]
+    assert [reader.try_read() for _ in range(10)] == RECORDS[10:20]
+    assert reader.read() is None
+    assert reader.try_read() is None
+
+
+def test_block_compresses():
+  with EphemeralFile('r+') as fp:
+    writer = BlockRecordWriter(fp, StringCodec())
+    for record in RECORDS:
+      writer.write(record)
+    writer.flush()
+    assert os.path.getsize(fp.name) < sum(len(record) for record in RECORDS) / 2
+
+
+def test_corrupt_block():
+  codec = BlockRecordIO.BlockCodec(StringCodec())
+  block = codec.encode(RECORDS[:10])
+  assert codec.decode(block) == RECORDS[:10]
+  with pytest.raises(BlockRecordIO.CorruptBlock):
+    codec.decode(block[:-1])
+  with pytest.raises(BlockRecordIO.CorruptBlock):
+    codec.decode('XX' + block[2:])
+  uncompressed = BlockRecordIO.BlockCodec(StringCodec(), 'none')
+  block = uncompressed.encode(RECORDS[:10])
+  with pytest.raises(BlockRecordIO.CorruptBlock):
+    uncompressed.decode(block[:-1] + 'X')
+
+
+def test_close_flushes():
+  with EphemeralFile('w') as fp:
+    filename = fp.name
+    writer = BlockRecordWriter(fp, StringCodec())
+    writer.write('hello')
+    writer.close()
+    with open(filename) as fpr:
+      assert list(BlockRecordReader(fpr, StringCodec())) == ['hello']
+
+
+def test_failed_flush_is_retried(monkeypatch):
+  with EphemeralFile('r+') as fp:
+    writer = BlockRecordWriter(fp, StringCodec())
+    for record in RECORDS[:10]:
+      assert writer.write(record)
+
+    def fail(data):
+      raise IOError('No space left on device')
+    monkeypatch.setattr(writer._fp, 'write', fail)
+    assert not writer.flush()
+    monkeypatch.undo()
+    for record in RECORDS[10:20]:
+      assert writer.write(record)
+    assert writer.flush()
+    fp.seek(0)
+    assert list(BlockRecordReader(fp, StringCodec())) == RECORDS[:20]
+
+
+def test_blocks_fit_in_a_frame(monkeypatch):
+  monkeypatch.setattr(RecordIO, 'MAXIMUM_RECORD_SIZE', 1024)
+  with EphemeralFile('r+') as fp:
+    writer = BlockRecordWriter(fp, StringCodec(), compression='none', block_size=512)
+    records = ['a' * 500, 'b' * 300, 'c' * 400]
+    for record in records:
+      assert writer.write(record)
+    with pytest.raises(RecordIO.RecordSizeExceeded):
+      writer.write('d' * 600)
+    assert writer.flush()
+    fp.seek(0)
+    # The second record would have overflowed the block of the first, so each is in its own.
+    assert len(list(RecordReader(fp))) == 3
+    fp.seek(0)
+    assert list(BlockRecordReader(fp, StringCodec())) == records
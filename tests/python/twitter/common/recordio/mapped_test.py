@@ -0,0 +1,119 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import os
+import struct
+
+from twitter.common.recordio import MappedRecordReader, RecordIO, RecordWriter, StringCodec
+
+import pytest
+
+from recordio_test_harness import EphemeralFile
+
+
+def write_records(fp, records):
+  writer = RecordWriter(fp)
+  for record in records:
+    writer.write(record)
+  fp.flush()
+
+
+def remove_index(filename):
+  if os.path.exists(filename + MappedRecordReader.INDEX_SUFFIX):
+    os.remove(filename + MappedRecordReader.INDEX_SUFFIX)
+
+
+def test_empty_file():
+  with EphemeralFile('w') as fp:
+    with MappedRecordReader(fp.name, persist_index=False) as reader:
+      assert list(reader) == []
+      assert len(reader) == 0
+
+
+def test_iteration_yields_views():
+  records = ['hello', 'world', '', 'etc']
+  with EphemeralFile('w') as fp:
+    write_records(fp, records)
+    with MappedRecordReader(fp.name) as reader:
+      views = list(reader)
+      assert [bytes(view) for view in views] == records
+    with MappedRecordReader(fp.name, codec=StringCodec()) as reader:
+      assert list(reader) == records
+    remove_index(fp.name)
+
+
+def test_random_access_and_seek():
+  records = ['record %d' % k for k in range(100)]
+  with EphemeralFile('w') as fp:
+    write_records(fp, records)
+    with MappedRecordReader(fp.name, codec=StringCodec(), persist_index=False) as reader:
+      assert len(reader) == 100
+      assert reader[0] == 'record 0'
+      assert reader[57] == 'record 57'
+      assert reader[-1] == 'record 99'
+      with pytest.raises(IndexError):
+        reader[100]
+      assert list(reader.seek(97)) == ['record 97', 'record 98', 'record 99']
+      assert list(reader.seek(100)) == []
+    assert not os.path.exists(fp.name + MappedRecordReader.INDEX_SUFFIX)
+
+
+def test_bisect():
+  records = ['%05d' % k for k in range(0, 1000, 2)]
+  with EphemeralFile('w') as fp:
+    write_records(fp, records)
+    with MappedRecordReader(fp.name, codec=StringCodec(), persist_index=False) as reader:
+      assert reader.bisect(10, int) == 5
+      assert reader.bisect(11, int) == 6
+      assert reader.bisect(-1, int) == 0
+      assert reader.bisect(5000, int) == len(records)
+
+
+def test_persisted_index_is_reused_and_extended():
+  with EphemeralFile('w') as fp:
+    write_records(fp, ['hello', 'world'])
+    with MappedRecordReader(fp.name) as reader:
+      assert len(reader) == 2
+    assert os.path.exists(fp.name + MappedRecordReader.INDEX_SUFFIX)
+
+    write_records(fp, ['etc'])
+    with MappedRecordReader(fp.name, codec=StringCodec()) as reader:
+      assert reader._load_index()[0].tolist() == [0, 9]
+      assert len(reader) == 3
+      assert reader[2] == 'etc'
+    with MappedRecordReader(fp.name) as reader:
+      assert reader._load_index()[0].tolist() == [0, 9, 18]
+    remove_index(fp.name)
+
+
+def test_truncated_trailing_record_is_ignored():
+  with EphemeralFile('w') as fp:
+    write_records(fp, ['hello'])
+    fp.write(struct.pack('>L', 10))
+    fp.write('abc')
+    fp.flush()
+    with MappedRecordReader(fp.name, codec=StringCodec(), persist_index=False) as reader:
+      assert list(reader) == ['hello']
+      assert len(reader) == 1
+
+
+def test_record_too_large():
+  with EphemeralFile('w') as fp:
+    fp.write(struct.pack('>L', RecordIO.MAXIMUM_RECORD_SIZE + 1))
+    fp.flush()
+    with MappedRecordReader(fp.name, persist_index=False) as reader:
+      with pytest.raises(RecordIO.RecordSizeExceeded):
+        list(reader)
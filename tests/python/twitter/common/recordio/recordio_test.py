@@ -227,6 +227,90 @@ class RecordioTestBase(mox.MoxTestBase):
       rr = RecordReader(fp)
       assert rr.read() == test_string
 
+  def test_buffered_writer_coalesces_writes(self):
+    test_strings = ["hello", "world", "etc"]
+    with self.EphemeralFile('r+') as fp:
+      fpw = FileLike.get(fp)
+      self.mox.StubOutWithMock(fpw, 'write')
+      fpw.write(''.join(struct.pack('>L', len(string)) + string for string in test_strings))
+
+      self.mox.ReplayAll()
+
+      rw = RecordIO.BufferedWriter(fpw, StringCodec(), buffer_size=1024)
+      for string in test_strings:
+        assert rw.write(string)
+      assert rw.pending == sum(RecordIO.RECORD_HEADER_SIZE + len(s) for s in test_strings)
+      assert rw.flush()
+      assert rw.pending == 0
+
+  def test_buffered_writer_group_commit(self):
+    test_strings = ["hello", "world", "etc", "and", "so", "on"]
+    with self.EphemeralFile('r+') as fp:
+      fpw = FileLike.get(fp)
+      self.mox.StubOutWithMock(fpw, 'flush')
+      fpw.flush()
+      fpw.flush()
+
+      self.mox.ReplayAll()
+
+      rw = RecordIO.BufferedWriter(fpw, StringCodec(), sync=True, buffer_size=20)
+      for string in test_strings:
+        assert rw.write(string)
+      fp.seek(0)
+      assert list(RecordReader(fp)) == test_strings[:3]
+      rw.flush()
+      fp.seek(0)
+      assert list(RecordReader(fp)) == test_strings
+
+  def test_buffered_writer_flush_interval(self):
+    class FakeClock(object):
+      now = 0
+      def time(self):
+        return self.now
+    clock = FakeClock()
+    with self.EphemeralFile('r+') as fp:
+      rw = RecordIO.BufferedWriter(fp, StringCodec(), flush_interval=5, clock=clock)
+      rw.write("hello")
+      clock.now = 4
+      rw.write("world")
+      assert rw.pending > 0
+      clock.now = 5
+      rw.write("etc")
+      assert rw.pending == 0
+      fp.seek(0)
+      assert list(RecordReader(fp)) == ["hello", "world", "etc"]
+
+  def test_buffered_writer_write_fail(self):
+    fp = self.mox.CreateMock(FileLike)
+    fp.mode = 'w'
+    fp.name = 'FileLike'
+    fp.write(mox.IsA(str)).AndRaise(IOError)
+
+    self.mox.ReplayAll()
+
+    rw = RecordIO.BufferedWriter(fp, StringCodec())
+    assert rw.write("hello")
+    assert rw.flush() == False
+
+  def test_buffered_writer_retries_failed_write(self):
+    frame = lambda string: struct.pack('>L', len(string)) + string
+    fp = self.mox.CreateMock(FileLike)
+    fp.mode = 'w'
+    fp.name = 'FileLike'
+    fp.write(frame("hello")).AndRaise(IOError)
+    fp.write(frame("hello") + frame("world"))
+    fp.flush()
+
+    self.mox.ReplayAll()
+
+    rw = RecordIO.BufferedWriter(fp, StringCodec())
+    assert rw.write("hello")
+    assert rw.flush() == False
+    assert rw.pending == RecordIO.RECORD_HEADER_SIZE + len("hello")
+    assert rw.write("world")
+    assert rw.flush()
+    assert rw.pending == 0
+
 
 class TestRecordioBuiltin(RecordioTestBase):
   def test_recordwriter_framing(self):
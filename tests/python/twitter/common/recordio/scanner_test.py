@@ -0,0 +1,81 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import os
+
+from twitter.common.contextutil import temporary_dir
+from twitter.common.recordio import RecordIO, RecordScanner, RecordWriter, StringCodec
+
+import pytest
+
+
+def even_records(record):
+  return record.upper() if int(record.split()[-1]) % 2 == 0 else None
+
+
+def write_files(root, num_files, records_per_file):
+  filenames = []
+  for file_number in range(num_files):
+    filename = os.path.join(root, 'file%03d.recordio' % file_number)
+    with open(filename, 'w') as fp:
+      writer = RecordWriter(fp)
+      for record_number in range(records_per_file):
+        writer.write('file %d record %d' % (file_number, record_number))
+    filenames.append(filename)
+  return filenames
+
+
+def expected_records(num_files, records_per_file):
+  return ['file %d record %d' % (file_number, record_number)
+          for file_number in range(num_files) for record_number in range(records_per_file)]
+
+
+def test_ordered_scan():
+  with temporary_dir() as root:
+    filenames = write_files(root, 20, 10)
+    scanner = RecordScanner(StringCodec(), max_workers=4)
+    assert list(scanner.scan(filenames)) == expected_records(20, 10)
+    assert [filename for filename, _ in scanner.scan_files(filenames)] == filenames
+
+
+def test_unordered_scan():
+  with temporary_dir() as root:
+    filenames = write_files(root, 20, 10)
+    scanner = RecordScanner(StringCodec(), max_workers=4, max_pending=2)
+    assert sorted(scanner.scan(filenames, ordered=False)) == sorted(expected_records(20, 10))
+    for filename, records in scanner.scan_files(filenames, ordered=False):
+      file_number = filenames.index(filename)
+      assert records == ['file %d record %d' % (file_number, k) for k in range(10)]
+
+
+def test_transform_in_processes():
+  with temporary_dir() as root:
+    filenames = write_files(root, 5, 10)
+    scanner = RecordScanner(StringCodec(), transform=even_records, max_workers=2, processes=True)
+    assert list(scanner.scan(filenames)) == [
+        record.upper() for record in expected_records(5, 10) if int(record[-1]) % 2 == 0]
+
+
+def test_scan_errors():
+  with temporary_dir() as root:
+    filenames = write_files(root, 2, 1) + [os.path.join(root, 'does_not_exist')]
+    scanner = RecordScanner(StringCodec(), max_workers=2)
+    with pytest.raises(IOError):
+      list(scanner.scan(filenames))
+  with pytest.raises(RecordIO.InvalidCodec):
+    RecordScanner('not a codec')
+  with pytest.raises(RecordIO.InvalidArgument):
+    RecordScanner(StringCodec(), transform='not callable')
@@ -22,7 +22,7 @@ try:
   from Queue import Empty
 except ImportError:
   from queue import Empty
-from twitter.common.resourcepool import ResourcePool
+from twitter.common.resourcepool import ManagedResourcePool, ResourcePool
 from twitter.common.quantity import Amount, Time
 
 
@@ -74,3 +74,96 @@ class TestResourcePool(object):
     elapsed = time.time() - now
     assert elapsed >= 1.0
 
+
+
+class FakeClock(object):
+  def __init__(self):
+    self.now = 0
+
+  def time(self):
+    return self.now
+
+
+class TestManagedResourcePool(object):
+  def setup_method(self, method):
+    self.created, self.closed = [], []
+    self.clock = FakeClock()
+
+  def factory(self):
+    resource = MyResource(len(self.created))
+    self.created.append(resource)
+    return resource
+
+  def make_pool(self, **kw):
+    return ManagedResourcePool(self.factory, close=self.closed.append, clock=self.clock, **kw)
+
+  def test_creates_on_demand_and_reuses(self):
+    pool = self.make_pool(max_size=2)
+    with pool.acquire() as resource:
+      assert resource.id == 0
+      with pool.acquire() as other:
+        assert other.id == 1
+        assert pool.empty()
+        with pytest.raises(Empty):
+          pool.acquire(timeout=0)
+    # The most recently released resource is reused first.
+    with pool.acquire() as resource:
+      assert resource.id == 0
+    assert len(self.created) == 2
+    assert pool.metrics.sample() == {
+      'created': 2, 'closed': 0, 'failed_health_checks': 0, 'timeouts': 1, 'size': 2,
+      'idle': 2, 'in_use': 0}
+
+  def test_discard_on_error(self):
+    pool = self.make_pool(max_size=1)
+    with pytest.raises(ValueError):
+      with pool.acquire():
+        raise ValueError()
+    assert self.closed == [MyResource(0)]
+    with pool.acquire() as resource:
+      assert resource.id == 1
+
+  def test_factory_failure(self):
+    def factory():
+      raise IOError('connection refused')
+    pool = ManagedResourcePool(factory, max_size=1)
+    for _ in range(2):
+      with pytest.raises(IOError):
+        pool.acquire(timeout=0)
+    assert pool.in_use() == 0
+
+  def test_idle_eviction(self):
+    pool = self.make_pool(min_size=1, max_idle=Amount(10, Time.SECONDS))
+    first, second = pool.acquire(), pool.acquire()
+    first.release()
+    self.clock.now = 5
+    second.release()
+    self.clock.now = 11
+    with pool.acquire() as resource:
+      assert resource.id == 1
+    assert self.closed == [MyResource(0)]
+    self.clock.now = 100
+    with pool.acquire() as resource:
+      assert resource.id == 1
+    assert self.closed == [MyResource(0)]
+
+  def test_health_check(self):
+    unhealthy = set([0])
+    pool = self.make_pool(health_check=lambda resource: resource.id not in unhealthy)
+    pool.acquire().release()
+    with pool.acquire() as resource:
+      assert resource.id == 1
+    assert self.closed == [MyResource(0)]
+    assert pool.metrics.sample()['failed_health_checks'] == 1
+
+  def test_close(self):
+    pool = self.make_pool()
+    in_use = pool.acquire()
+    pool.acquire().release()
+    pool.close()
+    assert self.closed == [MyResource(1)]
+    # Resources in use when the pool is closed are closed when they are released.
+    in_use.release()
+    assert self.closed == [MyResource(1), MyResource(0)]
+    sample = pool.metrics.sample()
+    assert (sample['size'], sample['idle']) == (0, 0)
@@ -0,0 +1,145 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+from collections import namedtuple
+import socket
+import threading
+import time
+
+from twitter.common.rpc import Address, ClientPool
+
+import pytest
+
+
+# Stand-ins for twitter.common.zookeeper.serverset's Endpoint and ServiceInstance.
+Endpoint = namedtuple('Endpoint', ['host', 'port'])
+ServiceInstance = namedtuple('ServiceInstance', ['service_endpoint'])
+
+
+class FakeService(object):
+  # Shaped like a thrift generated service module (with new_style classes.)
+  class Iface(object):
+    pass
+
+  class Client(Iface):
+    def __init__(self, protocol):
+      self.protocol = protocol
+
+
+class Server(object):
+  def __init__(self):
+    self._socket = socket.socket()
+    self._socket.bind(('127.0.0.1', 0))
+    self._socket.listen(16)
+    self.port = self._socket.getsockname()[1]
+    self.connections = []
+    self._thread = threading.Thread(target=self._accept)
+    self._thread.daemon = True
+    self._thread.start()
+
+  def _accept(self):
+    while True:
+      try:
+        connection, _ = self._socket.accept()
+      except (socket.error, OSError):
+        return
+      self.connections.append(connection)
+
+  def wait_for(self, count):
+    deadline = time.time() + 5
+    while len(self.connections) < count and time.time() < deadline:
+      time.sleep(0.01)
+    return len(self.connections) == count
+
+  def close(self):
+    for connection in self.connections:
+      connection.close()
+    self._socket.close()
+
+
+def unused_port():
+  sock = socket.socket()
+  sock.bind(('127.0.0.1', 0))
+  port = sock.getsockname()[1]
+  sock.close()
+  return port
+
+
+def test_reuses_connections():
+  server = Server()
+  try:
+    pool = ClientPool(FakeService, [('127.0.0.1', server.port)])
+    for _ in range(5):
+      with pool.acquire() as client:
+        assert isinstance(client, FakeService.Client)
+    assert server.wait_for(1)
+    metrics = pool.metrics.sample()
+    assert metrics['endpoints'] == 1
+    assert metrics['127.0.0.1:%d.created' % server.port] == 1
+    assert metrics['127.0.0.1:%d.idle' % server.port] == 1
+    pool.close()
+  finally:
+    server.close()
+
+
+def test_reconnects_after_server_close():
+  server = Server()
+  try:
+    pool = ClientPool(FakeService, ['127.0.0.1:%d' % server.port])
+    with pool.acquire() as client:
+      first = client
+    assert server.wait_for(1)
+    server.connections[0].close()
+    time.sleep(0.1)
+    with pool.acquire() as client:
+      assert client is not first
+    assert pool.metrics.sample()['127.0.0.1:%d.failed_health_checks' % server.port] == 1
+  finally:
+    server.close()
+
+
+def test_balances_and_skips_failed_endpoints():
+  servers = [Server(), Server()]
+  try:
+    dead = unused_port()
+    pool = ClientPool(FakeService, [('127.0.0.1', server.port) for server in servers],
+                      retry_interval=60)
+    pool.add(ServiceInstance(Endpoint('127.0.0.1', dead)))
+    assert len(pool.endpoints()) == 3
+
+    clients = [pool.acquire() for _ in range(4)]
+    for server in servers:
+      assert server.wait_for(2)
+    assert pool.metrics.sample()['connect_failures'] <= 1
+    for client in clients:
+      client.release()
+
+    pool.remove(Address('127.0.0.1', dead))
+    pool.remove(('127.0.0.1', servers[0].port))
+    assert [address.port for address in pool.endpoints()] == [servers[1].port]
+    assert '127.0.0.1:%d.created' % servers[0].port not in pool.metrics.sample()
+  finally:
+    for server in servers:
+      server.close()
+
+
+def test_no_endpoints():
+  pool = ClientPool(FakeService)
+  with pytest.raises(ClientPool.NoEndpointsAvailable):
+    pool.acquire()
+  pool.add(('127.0.0.1', unused_port()))
+  with pytest.raises(ClientPool.NoEndpointsAvailable):
+    pool.acquire()
@@ -1,5 +1,7 @@
 import pytest
 import unittest
+from ctypes import c_char, c_float
+
 from twitter.common.string.scanf import ScanfParser
 
 def almost_equal(a, b, digits=7):
@@ -113,3 +115,38 @@ def test_extra_stuff():
   for extra in extra_stuff:
     for st in ('a', u'a', '123', u'123', 'a\x12\x23'):
       assert basic_scanf('%s', st+extra, extra=True) == st
+
+def test_conversions_match_ctypes():
+  values = ['0', '1', '-1', '+7', '2147483647', '2147483648', '-2147483649', '4294967296',
+            '18446744073709551616', '123456789012345678901234567890']
+  for conversion, (_, ctype) in ScanfParser.CONVERSIONS.items():
+    if ctype in (c_char, c_float):
+      continue
+    for value in values:
+      if conversion in ('u', 'lu', 'llu') and value[0] in '+-':
+        continue
+      expected = ctype(ScanfParser.PRECONVERSIONS.get(ctype, str)(value)).value
+      assert basic_scanf('%' + conversion, value) == expected
+  for value in ('3.4', '-0.1', '1e300', '-1e300', '1e-300'):
+    assert basic_scanf('%f', value) == c_float(float(value)).value
+
+def test_parse_many():
+  parser = ScanfParser('%(name)s %d %*d %(size)lu')
+  result = parser.parse_many(['a 1 2 3', 'b -1 5 18446744073709551615'])
+  assert result.groups() == {'name': ['a', 'b'], 'size': [3, 18446744073709551615]}
+  assert result.ungrouped() == [[1, -1]]
+
+  result = parser.parse_many([])
+  assert result.groups() == {'name': [], 'size': []}
+  assert result.ungrouped() == [[]]
+
+  assert parser.parse_many(['a 1 2 3 extra'], allow_extra=True).name == ['a']
+  with pytest.raises(ScanfParser.ParseError):
+    parser.parse_many(['a 1 2 3', 'a 1 2 3 extra'])
+  with pytest.raises(ScanfParser.ParseError):
+    parser.parse_many(['a 1 2 3', 'b x 2 3'])
+  with pytest.raises(TypeError):
+    parser.parse_many(['a 1 2 3', None])
+
+def test_compiled_format_is_cached():
+  assert ScanfParser('%s %d')._re is ScanfParser('%s %d')._re
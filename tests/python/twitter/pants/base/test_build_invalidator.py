@@ -21,14 +21,19 @@ import tempfile
 from contextlib import contextmanager
 
 from twitter.common.contextutil import temporary_dir
-from twitter.pants.base.build_invalidator import BuildInvalidator, CacheKeyGenerator
+from twitter.pants.base.build_invalidator import (
+    BuildInvalidator,
+    CacheKeyGenerator,
+    FingerprintStore,
+    SingleFileBuildInvalidator)
 
 
 TEST_CONTENT = 'muppet'
 
 
 def expected_hash(tf):
-  return hashlib.sha1(os.path.basename(tf.name) + TEST_CONTENT).hexdigest()
+  content_hash = hashlib.sha1(TEST_CONTENT).hexdigest()
+  return hashlib.sha1(os.path.basename(tf.name) + content_hash).hexdigest()
 
 
 @contextmanager
@@ -65,3 +70,142 @@ def test_needs_update_after_change():
     assert cache.needs_update(key)
     cache.update(key)
     assert not cache.needs_update(key)
+
+
+class FakeClock(object):
+  def __init__(self, now):
+    self.now = now
+
+  def time(self):
+    return self.now
+
+
+def test_fingerprint_store():
+  with temporary_dir() as d:
+    source = os.path.join(d, 'source')
+    with open(source, 'w') as fd:
+      fd.write(TEST_CONTENT)
+    os.utime(source, (1000, 1000))
+    store_path = os.path.join(d, 'fingerprints')
+    store = FingerprintStore(store_path, clock=FakeClock(2000))
+    keygen = CacheKeyGenerator(fingerprint_store=store)
+    key = keygen.key_for('test', [source])
+    assert key == CacheKeyGenerator().key_for('test', [source])
+    store.save()
+
+    # A fresh store reads digests back rather than rehashing.
+    store = FingerprintStore(store_path, clock=FakeClock(2000))
+    store._fingerprints = store._load()
+    store._fingerprints[source] = store._fingerprints[source][:3] + ('cached',)
+    assert store.digest(source) == 'cached'
+
+    # Any change to the stat of the file causes a rehash.
+    os.utime(source, (1001, 1001))
+    assert store.digest(source) == hashlib.sha1(TEST_CONTENT).hexdigest()
+
+
+def test_fingerprint_store_racy():
+  with temporary_dir() as d:
+    source = os.path.join(d, 'source')
+    with open(source, 'w') as fd:
+      fd.write(TEST_CONTENT)
+    os.utime(source, (1000, 1000))
+    store = FingerprintStore(os.path.join(d, 'fingerprints'), clock=FakeClock(1001))
+    store.digest(source)
+    # The file could still change within the same mtime, so its digest is not remembered.
+    assert source not in store._fingerprints
+    store.save()
+    assert not os.path.exists(os.path.join(d, 'fingerprints'))
+
+
+def test_parallel_file_digests():
+  with temporary_dir() as d:
+    sources = []
+    for index in range(20):
+      source = os.path.join(d, 'source%d' % index)
+      with open(source, 'w') as fd:
+        fd.write(TEST_CONTENT * index)
+      sources.append(source)
+    keygen = CacheKeyGenerator()
+    digests = keygen.file_digests([d], num_workers=4)
+    assert digests == keygen.file_digests([d])
+    assert digests[sources[3]] == hashlib.sha1(TEST_CONTENT * 3).hexdigest()
+
+    key = keygen.key_for('test', sources)
+    with keygen.precomputed_digests(sources, 4):
+      with open(sources[0], 'w') as fd:
+        fd.write('changed')
+      # Digests are taken up front, within the context.
+      assert keygen.key_for('test', sources) == key
+    assert keygen.key_for('test', sources) != key
+
+
+def test_single_file_invalidator():
+  with temporary_dir() as d:
+    invalidator = SingleFileBuildInvalidator(d)
+    keygen = CacheKeyGenerator()
+    key = keygen.key_for('test', [])
+    other_key = keygen.key_for('other', [])
+    assert invalidator.needs_update(key)
+    invalidator.update(key)
+    invalidator.update(other_key)
+    assert not invalidator.needs_update(key)
+    invalidator.force_invalidate(other_key)
+    assert invalidator.needs_update(other_key)
+
+    # Hashes are read back from the single log file.
+    assert os.listdir(invalidator._root) == [SingleFileBuildInvalidator.LOG_NAME]
+    reloaded = SingleFileBuildInvalidator(d)
+    assert reloaded.existing_hash('test') == key.hash
+    assert reloaded.existing_hash('other') is None
+
+    reloaded.force_invalidate_all()
+    assert reloaded.needs_update(key)
+    assert SingleFileBuildInvalidator(d).existing_hash('test') is None
+
+
+def test_single_file_invalidator_compaction():
+  with temporary_dir() as d:
+    invalidator = SingleFileBuildInvalidator(d)
+    invalidator.COMPACTION_MIN_ENTRIES = 10
+    keygen = CacheKeyGenerator()
+    for index in range(20):
+      invalidator.update(keygen.key_for('test', []))
+      invalidator.force_invalidate(keygen.key_for('test', []))
+      invalidator.update(keygen.key_for('test%d' % index, []))
+    # A partial trailing entry, as left by an interrupted append, is ignored.
+    with open(invalidator._log_path, 'ab') as fd:
+      fd.write('test')
+
+    reloaded = SingleFileBuildInvalidator(d)
+    reloaded.COMPACTION_MIN_ENTRIES = 10
+    assert reloaded.existing_hash('test') is None
+    assert reloaded.existing_hash('test19') == keygen.key_for('test19', []).hash
+    with open(reloaded._log_path, 'rb') as fd:
+      assert len(fd.readlines()) == 20
+
+
+def test_single_file_invalidator_append_after_partial_entry():
+  with temporary_dir() as d:
+    invalidator = SingleFileBuildInvalidator(d)
+    keygen = CacheKeyGenerator()
+    a, b, c = (keygen.key_for(id, []) for id in ('a', 'b', 'c'))
+    invalidator.update(a)
+    # Interrupted while appending the entry for b.
+    with open(invalidator._log_path, 'ab') as fd:
+      fd.write('b\t%s' % b.hash[:4])
+
+    reloaded = SingleFileBuildInvalidator(d)
+    assert reloaded.existing_hash('b') is None
+    reloaded.update(c)
+    with open(reloaded._log_path, 'rb') as fd:
+      assert fd.read() == 'a\t%s\nc\t%s\n' % (a.hash, c.hash)
+    reloaded = SingleFileBuildInvalidator(d)
+    assert reloaded.existing_hash('a') == a.hash
+    assert reloaded.existing_hash('b') is None
+    assert reloaded.existing_hash('c') == c.hash
+
+
+def test_single_file_invalidator_shared():
+  with temporary_dir() as d:
+    assert SingleFileBuildInvalidator.shared(d) is SingleFileBuildInvalidator.shared(d)
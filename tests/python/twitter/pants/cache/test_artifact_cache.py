@@ -1,6 +1,10 @@
 import SimpleHTTPServer
 import SocketServer
+import errno
 import os
+import socket
+import time
+from contextlib import contextmanager
 from threading import Thread
 import unittest
 
@@ -9,10 +13,15 @@ from twitter.common.dirutil import safe_mkdir
 from twitter.pants.base.build_invalidator import CacheKey
 from twitter.pants.cache import create_artifact_cache, select_best_url
 from twitter.pants.cache.combined_artifact_cache import CombinedArtifactCache
+from twitter.pants.cache.content_addressed_artifact_cache import (
+    BlobStore,
+    ContentAddressedArtifactCache)
 from twitter.pants.cache.local_artifact_cache import LocalArtifactCache
 from twitter.pants.cache.restful_artifact_cache import RESTfulArtifactCache
 from twitter.pants.testutils import MockLogger
 
+from mock import patch
+
 
 class MockPinger(object):
   def __init__(self, hosts_to_times):
@@ -39,6 +48,7 @@ class SimpleRESTHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
     with open(path, 'wb') as outfile:
       outfile.write(content)
     self.send_response(200)
+    self.send_header('Content-Length', '0')
     self.end_headers()
 
   def do_DELETE(self):
@@ -46,9 +56,27 @@ class SimpleRESTHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
     if os.path.exists(path):
       os.unlink(path)
       self.send_response(200)
+      self.send_header('Content-Length', '0')
+      self.end_headers()
     else:
       self.send_error(404, 'File not found')
-    self.end_headers()
+
+
+# Keeps connections open between requests.
+class KeepAliveRESTHandler(SimpleRESTHandler):
+  protocol_version = 'HTTP/1.1'
+
+
+class CountingServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+  daemon_threads = True
+
+  def __init__(self, *args, **kwargs):
+    SocketServer.TCPServer.__init__(self, *args, **kwargs)
+    self.connections = 0
+
+  def process_request(self, request, client_address):
+    self.connections += 1
+    SocketServer.ThreadingMixIn.process_request(self, request, client_address)
 
 
 TEST_CONTENT1 = 'muppet'
@@ -74,6 +102,13 @@ class TestArtifactCache(unittest.TestCase):
       check(LocalArtifactCache, cachedir)
       check(RESTfulArtifactCache, 'http://localhost/bar')
       check(CombinedArtifactCache, [cachedir, 'http://localhost/bar'])
+      self.assertTrue(isinstance(
+          create_artifact_cache(MockLogger(), artifact_root, cachedir, 'TestTask', 'testing',
+                                content_addressed=True),
+          ContentAddressedArtifactCache))
+      cache = create_artifact_cache(MockLogger(), artifact_root, [cachedir], 'TestTask', 'testing',
+                                    content_addressed=True, max_size=1024)
+      self.assertEquals(1024, cache._artifact_caches[0]._max_size)
 
 
   def test_local_cache(self):
@@ -83,26 +118,140 @@ class TestArtifactCache(unittest.TestCase):
         self.do_test_artifact_cache(artifact_cache)
 
 
-  def test_restful_cache(self):
+  def test_local_cache_prune(self):
+    with temporary_dir() as artifact_root:
+      with temporary_dir() as cache_root:
+        artifact_cache = LocalArtifactCache(None, artifact_root, cache_root)
+        key = CacheKey('muppet_key', 'fake_hash', 42, [])
+        with temporary_file(artifact_root) as f:
+          f.close()
+          artifact_cache.insert(key, [f.name])
+        artifact_cache.prune(age_hours=1)
+        self.assertTrue(artifact_cache.has(key))
+        tarfile = artifact_cache._cache_file_for_key(key)
+        os.utime(tarfile, (0, time.time() - 7200))
+        artifact_cache.prune(age_hours=1)
+        self.assertFalse(artifact_cache.has(key))
+
+  def test_local_caches_not_owned(self):
+    # In a cache shared by several users, files written by others can be read but not touched.
+    for cache_class in (LocalArtifactCache, ContentAddressedArtifactCache):
+      with temporary_dir() as artifact_root:
+        with temporary_dir() as cache_root:
+          real_utime = os.utime
+          def utime(path, times):
+            if path.startswith(cache_root):
+              raise OSError(errno.EACCES, 'Permission denied', path)
+            real_utime(path, times)
+
+          artifact_cache = cache_class(MockLogger(), artifact_root, cache_root)
+          key = CacheKey('muppet_key', 'fake_hash', 42, [])
+          with temporary_file(artifact_root) as f:
+            f.write(TEST_CONTENT1)
+            f.close()
+            artifact_cache.insert(key, [f.name])
+            with patch('os.utime', utime):
+              self.assertTrue(bool(artifact_cache.use_cached_files(key)))
+              # Inserting content already in the store reuses the other user's blob.
+              artifact_cache.insert(CacheKey('kermit_key', 'fake_hash', 42, []), [f.name])
+
+  def test_content_addressed_cache(self):
+    for link_mode in (BlobStore.REFLINK, BlobStore.HARDLINK, BlobStore.COPY):
+      with temporary_dir() as artifact_root:
+        with temporary_dir() as cache_root:
+          artifact_cache = ContentAddressedArtifactCache(MockLogger(), artifact_root, cache_root,
+                                                         link_mode=link_mode)
+          self.do_test_artifact_cache(artifact_cache)
+
+  def test_content_addressed_cache_dedup_and_prune(self):
+    with temporary_dir() as artifact_root:
+      with temporary_dir() as cache_root:
+        artifact_cache = ContentAddressedArtifactCache(MockLogger(), artifact_root, cache_root,
+                                                       link_mode=BlobStore.HARDLINK, max_size=15)
+        blobs = os.path.join(cache_root, 'blobs')
+        def num_blobs():
+          return len(list(BlobStore(blobs).blobs()))
+
+        keys = [CacheKey('key%d' % i, 'fake_hash', 1, []) for i in range(3)]
+        outdir = os.path.join(artifact_root, 'out')
+        safe_mkdir(outdir)
+        for i, key in enumerate(keys):
+          for name, content in (('same', TEST_CONTENT1), ('different', str(i) * 6)):
+            with open(os.path.join(outdir, name), 'w') as outfile:
+              outfile.write(content)
+          artifact_cache.insert(key, [outdir])
+        # One blob for the content common to all keys, and one for each key's own content.
+        self.assertEquals(4, num_blobs())
+
+        safe_mkdir(outdir, clean=True)
+        self.assertTrue(bool(artifact_cache.use_cached_files(keys[1])))
+        self.assertEquals(set(['same', 'different']), set(os.listdir(outdir)))
+        with open(os.path.join(outdir, 'different')) as infile:
+          self.assertEquals('111111', infile.read())
+        # Hard-linked to the blob store.
+        self.assertEquals(2, os.stat(os.path.join(outdir, 'same')).st_nlink)
+
+        # Make keys[0] the least recently used, and keys[2] too old.
+        manifest_root = os.path.join(cache_root, 'manifests')
+        os.utime(os.path.join(manifest_root, 'key0', 'fake_hash.json'), (0, time.time() - 60))
+        os.utime(os.path.join(manifest_root, 'key2', 'fake_hash.json'), (0, time.time() - 7200))
+
+        artifact_cache.prune(age_hours=1)
+        self.assertFalse(artifact_cache.has(keys[2]))
+        # That leaves 18 bytes of blobs, over max_size, so keys[0] is removed as well.
+        self.assertFalse(artifact_cache.has(keys[0]))
+        self.assertTrue(artifact_cache.has(keys[1]))
+        # The blob of keys[0] is removed to make room. That of keys[2] is kept for a while, as
+        # unreferenced blobs may belong to an insert in progress.
+        self.assertEquals(3, num_blobs())
+
+  @contextmanager
+  def restful_cache(self, server_class=SocketServer.TCPServer, handler_class=SimpleRESTHandler):
     httpd = None
     httpd_thread = None
     try:
       with temporary_dir() as cache_root:
         with pushd(cache_root):  # SimpleRESTHandler serves from the cwd.
-          httpd = SocketServer.TCPServer(('localhost', 0), SimpleRESTHandler)
+          httpd = server_class(('localhost', 0), handler_class)
           port = httpd.server_address[1]
           httpd_thread = Thread(target=httpd.serve_forever)
           httpd_thread.start()
           with temporary_dir() as artifact_root:
-            artifact_cache = RESTfulArtifactCache(MockLogger(), artifact_root,
-                                                  'http://localhost:%d' % port)
-            self.do_test_artifact_cache(artifact_cache)
+            yield httpd, RESTfulArtifactCache(MockLogger(), artifact_root,
+                                              'http://localhost:%d' % port)
     finally:
       if httpd:
         httpd.shutdown()
       if httpd_thread:
         httpd_thread.join()
 
+  def test_restful_cache(self):
+    with self.restful_cache() as (_, artifact_cache):
+      self.do_test_artifact_cache(artifact_cache)
+
+  def test_restful_cache_keep_alive(self):
+    with self.restful_cache(CountingServer, KeepAliveRESTHandler) as (httpd, artifact_cache):
+      self.do_test_artifact_cache(artifact_cache)
+
+      key = CacheKey('muppet_key', 'fake_hash', 42, [])
+      with temporary_file(artifact_cache.artifact_root) as f:
+        f.write(TEST_CONTENT1)
+        f.close()
+        artifact_cache.insert(key, [f.name])
+        connections = httpd.connections
+        for _ in range(5):
+          self.assertTrue(artifact_cache.has(key))
+          self.assertTrue(bool(artifact_cache.use_cached_files(key)))
+        # All on the one connection that inserted the artifact.
+        self.assertEquals(connections, httpd.connections)
+
+        # The server closing the connection between requests is recovered from.
+        artifact_cache._local.connection.sock.shutdown(socket.SHUT_RDWR)
+        self.assertTrue(artifact_cache.has(key))
+
+        missing_key = CacheKey('other_key', 'fake_hash', 42, [])
+        self.assertEquals([True, False, True], artifact_cache.has_many([key, missing_key, key]))
+
 
   def do_test_artifact_cache(self, artifact_cache):
     key = CacheKey('muppet_key', 'fake_hash', 42, [])
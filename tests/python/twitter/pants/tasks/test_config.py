@@ -30,6 +30,7 @@ class ConfigTest(unittest.TestCase):
 [DEFAULT]
 answer: 42
 scale: 1.2
+hours: 24 * 14
 path: /a/b/%(answer)s
 embed: %(path)s::foo
 disclaimer:
@@ -75,6 +76,14 @@ that.''',
     self.checkDefaults(self.config.get, 42.0)
 
 
+  def test_get_number(self):
+    self.assertEquals(336, self.config.get('a', 'hours', type=(int, float)))
+    self.assertEquals(1.2, self.config.get('a', 'scale', type=(int, float)))
+    self.assertRaises(Config.ConfigError, self.config.getfloat, 'a', 'hours')
+    self.assertRaises(Config.ConfigError, self.config.get, 'a', 'path', type=(int, float))
+    self.checkDefaults(self.config.get, 42)
+
+
   def test_getbool(self):
     self.assertTrue(self.config.getbool('a', 'fast'))
     self.assertFalse(self.config.getbool('b', 'preempt'))
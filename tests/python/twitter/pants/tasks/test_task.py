@@ -0,0 +1,53 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+from twitter.common.contextutil import temporary_dir
+from twitter.pants.base.context_utils import create_context
+from twitter.pants.tasks import Task
+
+import pytest
+
+
+class RecordingArtifactCache(object):
+  def __init__(self):
+    self.pruned = []
+
+  def prune(self, age_hours):
+    self.pruned.append(age_hours)
+
+
+def prune_with(config):
+  with temporary_dir() as workdir:
+    context = create_context(config='[DEFAULT]\npants_workdir: %s\n%s' % (workdir, config),
+                             options=dict(write_to_artifact_cache=True))
+    task = Task(context)
+    task.setup_artifact_cache(read_spec=[], write_spec=[workdir])
+    task._artifact_cache = RecordingArtifactCache()
+    task._prune_artifact_cache()
+    return task._artifact_cache.pruned
+
+
+@pytest.mark.parametrize('max_age', ['24 * 14', '336', '336.0'])
+def test_prune_artifact_cache_max_age(max_age):
+  assert prune_with('local_artifact_cache_max_age_hours: %s' % max_age) == [336.0]
+
+
+def test_prune_artifact_cache_max_size_only():
+  assert prune_with('local_artifact_cache_max_size: 10 * 1024 ** 3') == [float('inf')]
+
+
+def test_prune_artifact_cache_unbounded():
+  assert prune_with('') == []
@@ -0,0 +1,131 @@
+# ==================================================================================================
+# Copyright 2014 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import json
+import tempfile
+import threading
+import unittest
+
+from thrift.Thrift import TType
+from twitter.thrift.text import thrift_json_encoder
+from twitter.thrift.text.thrift_json_codec import ThriftJSONCodec, compile_decoder, compile_encoder
+from gen.twitter.thrift.text.testing import ttypes as structs_for_testing
+
+
+def make_struct():
+  x = structs_for_testing.TestStruct()
+  x.field1 = 42
+  x.field2 = False
+  x.field3 = u'"not default"'
+  x.field4 = [2, 4, 6, 8]
+  x.field5 = set([u'b', u'c', u'a'])
+  x.field6 = structs_for_testing.InnerTestStruct()
+  x.field6.foo = u'bar'
+  x.field6.color = structs_for_testing.Color.BLUE
+  x.field6.numbers = {1: u'one', 2: u'two'}
+  x.field7 = 1.2
+  return x
+
+
+class ThriftJsonCodecTest(unittest.TestCase):
+  def test_compiled_once(self):
+    assert compile_encoder(structs_for_testing.TestStruct) is compile_encoder(
+        structs_for_testing.TestStruct)
+    assert compile_decoder(structs_for_testing.TestStruct) is compile_decoder(
+        structs_for_testing.TestStruct)
+
+  def test_concurrent_compilation(self):
+    class Outer(object):
+      def __init__(self, inner=None, number=None):
+        self.inner, self.number = inner, number
+
+    class Inner(object):
+      def __init__(self, outer=None):
+        self.outer = outer
+
+    compiling, proceed = threading.Event(), threading.Event()
+
+    class BlockingSpec(object):
+      # Pauses the compilation of Outer after Inner, which refers back to Outer, is compiled.
+      def __iter__(self):
+        yield (1, TType.STRUCT, 'inner', (Inner, Inner.thrift_spec), None)
+        compiling.set()
+        proceed.wait()
+        yield (2, TType.I32, 'number', None, None)
+
+    Inner.thrift_spec = (None, (1, TType.STRUCT, 'outer', (Outer, None), None))
+    Outer.thrift_spec = BlockingSpec()
+
+    compiler = threading.Thread(target=compile_encoder, args=(Outer,))
+    compiler.start()
+    compiling.wait()
+    encoded = []
+    user = threading.Thread(
+        target=lambda: encoded.append(compile_encoder(Inner)(Inner(Outer(number=3)))))
+    user.start()
+    # Inner's codec, which uses the incomplete codec of Outer, must not be handed out yet.
+    user.join(0.1)
+    proceed.set()
+    compiler.join()
+    user.join()
+    assert encoded == [{'outer': {'number': 3}}]
+
+  def test_to_dict_omits_defaults(self):
+    codec = ThriftJSONCodec(structs_for_testing.TestStruct)
+    x = structs_for_testing.TestStruct()
+    x.field2 = True
+    assert codec.to_dict(x) == {'field2': True}
+
+    x = make_struct()
+    assert codec.to_dict(x) == {
+      'field1': 42,
+      'field2': False,
+      'field3': '"not default"',
+      'field4': [2, 4, 6, 8],
+      'field5': ['a', 'b', 'c'],
+      'field6': {'foo': 'bar', 'color': 3, 'numbers': {1: 'one', 2: 'two'}},
+      'field7': 1.2,
+    }
+
+  def test_roundtrip(self):
+    codec = ThriftJSONCodec(structs_for_testing.TestStruct, sort_keys=True)
+    x = make_struct()
+    json_str = codec.encode(x)
+    assert '\n' not in json_str
+    assert json.loads(json_str) == json.loads(thrift_json_encoder.thrift_to_json(x))
+    y = codec.decode(json_str)
+    assert y == x
+    assert y.field6.numbers == {1: 'one', 2: 'two'}
+    assert y.field5 == set(['a', 'b', 'c'])
+
+  def test_decode_ignores_unknown_fields(self):
+    codec = ThriftJSONCodec(structs_for_testing.TestStruct)
+    x = codec.decode('{"field1": 3, "field8": "unknown"}')
+    assert x.field1 == 3
+    assert not hasattr(x, 'field8')
+
+  def test_stream(self):
+    codec = ThriftJSONCodec(structs_for_testing.TestStruct)
+    structs = [make_struct() for _ in range(3)]
+    for index, x in enumerate(structs):
+      x.field1 = index
+    with tempfile.TemporaryFile('w+') as fp:
+      codec.dump_stream(structs, fp)
+      fp.write('\n')
+      fp.seek(0)
+      assert len(fp.read().splitlines()) == 4
+      fp.seek(0)
+      assert list(codec.load_stream(fp)) == structs